@@ -1,105 +1,383 @@
 # Import necessary libraries
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, current_app, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-import requests
+import atexit
 import logging
 import jwt
 import datetime
 import os
 from functools import wraps
 import json
-from pathlib import Path
+from concurrent.futures import as_completed
+import hashlib
+import hmac
+import threading
+import time
+import uuid
+from storage import create_storage, create_history_store, create_blob_store, referenced_blobs, HISTORY_LIMIT
+from historysink import WriteBehindQueue, create_history_table
+from cache import TTLCache
+from tokens import TokenIndex
+from concurrency import first_success, bounded_map, reset_executor as reset_fanout_executor
+from jobs import JobManager, JobLimitError
+from translation import translate_text, translate_detected, translate_batch, TranslationMemory, reset_executor as reset_translation_executor
+from upstream import configure as configure_upstreams, reset_clients as reset_upstream_clients, groq_complete, groq_complete_stream, upstream_available, breakers, UpstreamError, response_cache, single_flight, groq_scheduler, set_call_context
+from ratelimit import PRIORITY_BATCH
+from prompts import PROMPTS, WEBSITE_EXPLANATION, WEBSITE_EXPLANATION_LEAD, SectionParser, SectionParseError
+from plans import parse_plan, merge_sections, stitch_bundle
+from website import render_website
+from passwords import calibrate as calibrate_password_hashing, hash_password, verify_password, needs_rehash, reset_executor as reset_password_executor, start_executor as start_password_executor
+from compression import compress_response, matching_etag
+from metrics import timed, set_route, render as render_metrics, http_request_duration, combined_generations, log_payload
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
-# Allow CORS for frontend-backend communication
-CORS(app, origins=['https://local-lang-codes-1.vercel.app', 'http://localhost:5173'])
+# Routes are registered on a blueprint; create_app() builds the Flask app
+api = Blueprint('api', __name__)
 
 # Secret key for JWT (should be stored in environment variables in production)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-very-secret-key')
+SECRET_KEY = os.environ.get('SECRET_KEY', 'your-very-secret-key')
 TOKEN_EXPIRY = datetime.timedelta(hours=1)  # Token expires in 1 hour
 REFRESH_TOKEN_EXPIRY = datetime.timedelta(days=7)  # Refresh token expires in 7 days
 
-# User database file
-USERS_DB_FILE = Path('users.json')
-HISTORY_DB_FILE = Path('generation_history.json')
-
-# Initialize users database
-def init_users_db():
-    if not USERS_DB_FILE.exists():
-        with open(USERS_DB_FILE, 'w') as f:
-            json.dump({}, f)
+# User and history storage (SQLite by default, see storage.py)
+storage = create_storage()
+history_store = create_history_store(storage)
+# Full history bodies, stored compressed and deduplicated by content hash
+blob_store = create_blob_store()
+# Blobs of entries evicted past HISTORY_LIMIT are deleted every this many seconds (0 = never)
+HISTORY_BLOB_GC_INTERVAL = float(os.environ.get('HISTORY_BLOB_GC_INTERVAL', 3600))
+
+# History index rows keep only this much of each text field
+HISTORY_PREVIEW_CHARS = int(os.environ.get('HISTORY_PREVIEW_CHARS', 200))
+HISTORY_OUTPUT_FIELDS = ('codeOutput', 'websiteHtml', 'appPlanOutput')
+
+# Consumed refresh tokens and revoked token families (see tokens.py)
+token_index = TokenIndex(
+    os.environ.get('TOKEN_INDEX_DB_FILE', 'tokens.db'),
+    sync_interval=float(os.environ.get('TOKEN_REVOCATION_SYNC_INTERVAL', 5)),
+    reuse_grace=float(os.environ.get('REFRESH_TOKEN_REUSE_GRACE', 10))
+)
+
+# Verified-token and user-record caches used by token_required
+token_cache = TTLCache(
+    maxsize=int(os.environ.get('TOKEN_CACHE_SIZE', 10000)),
+    ttl=int(os.environ.get('TOKEN_CACHE_TTL', 300))
+)
+user_cache = TTLCache(
+    maxsize=int(os.environ.get('USER_CACHE_SIZE', 10000)),
+    ttl=int(os.environ.get('USER_CACHE_TTL', 60))
+)
 
 def load_users():
-    init_users_db()
-    with open(USERS_DB_FILE, 'r') as f:
-        return json.load(f)
+    return storage.load_users()
 
 def save_users(users):
-    with open(USERS_DB_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
-
-# Initialize history database
-def init_history_db():
-    if not HISTORY_DB_FILE.exists():
-        with open(HISTORY_DB_FILE, 'w') as f:
-            json.dump({}, f)
+    storage.save_users(users)
+    user_cache.clear()
+
+def get_user_record(email):
+    user = user_cache.get(email)
+    if user is None:
+        user = storage.get_user(email)
+        if user is not None:
+            user_cache.set(email, user)
+    return user
+
+def create_user(email, user):
+    created = storage.create_user(email, user)
+    user_cache.delete(email)
+    return created
+
+def update_user(email, user):
+    storage.update_user(email, user)
+    user_cache.delete(email)
+
+# Tune the scrypt cost to PASSWORD_HASH_TARGET_MS on this machine (see passwords.py)
+calibrate_password_hashing()
+
+# Verify a login password. Records still holding a plaintext password (legacy
+# users.json entries) or an outdated hash cost are rehashed on successful login.
+def check_password(email, user, password):
+    with timed('password_verify'):
+        if user is None:
+            verify_password(password, None)
+            return False
+        encoded = user.get('passwordHash')
+        if encoded is None:
+            valid = hmac.compare_digest(user.get('password', '').encode('utf-8'), password.encode('utf-8'))
+        else:
+            valid = verify_password(password, encoded)
+
+    if valid and (encoded is None or needs_rehash(encoded)):
+        with timed('password_rehash'):
+            user = {key: value for key, value in user.items() if key != 'password'}
+            user['passwordHash'] = hash_password(password)
+            update_user(email, user)
+        logger.info(f"Rehashed password for user {email}")
+    return valid
+
+# Tokens issued before rotation carry only email and exp, and keep working until they
+# expire. Unless legacy_type says otherwise, one with at most an access token's lifetime
+# left is taken as an access token; each gets an id and a family of its own from its hash.
+def with_token_type(data, digest, legacy_type=None):
+    if 'typ' in data:
+        return data
+    if legacy_type is None:
+        lifetime = data.get('exp', 0) - time.time()
+        legacy_type = 'access' if lifetime <= TOKEN_EXPIRY.total_seconds() else 'refresh'
+    return dict(data, typ=legacy_type, jti=f"legacy-{digest}", fam=f"legacy-{digest}")
+
+# Decode a JWT, reusing claims already verified for the same token
+def decode_token(token):
+    key = hashlib.sha256(token.encode()).hexdigest()
+    data = token_cache.get(key)
+    if data is None:
+        data = with_token_type(jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"]), key)
+        # Never keep claims past the token's own expiry
+        token_cache.set(key, data, ttl=data.get('exp', 0) - time.time())
+    return data
+
+# Issue an access/refresh token pair. Both carry a token type, a unique id and the
+# family id shared by every token descended from one login.
+def issue_tokens(email, family=None):
+    now = datetime.datetime.utcnow()
+    family = family or uuid.uuid4().hex
+    secret = current_app.config['SECRET_KEY']
+    token = jwt.encode({
+        'email': email,
+        'typ': 'access',
+        'jti': uuid.uuid4().hex,
+        'fam': family,
+        'exp': now + TOKEN_EXPIRY
+    }, secret)
+    refresh_token = jwt.encode({
+        'email': email,
+        'typ': 'refresh',
+        'jti': uuid.uuid4().hex,
+        'fam': family,
+        'exp': now + REFRESH_TOKEN_EXPIRY
+    }, secret)
+    return token, refresh_token
 
 def load_history():
-    init_history_db()
-    with open(HISTORY_DB_FILE, 'r') as f:
-        return json.load(f)
+    return history_store.load_history()
+
+def preview(text):
+    if not text or len(text) <= HISTORY_PREVIEW_CHARS:
+        return text
+    return text[:HISTORY_PREVIEW_CHARS] + '…'
+
+# Lightweight index row for a generation; the full body lives in the blob store
+def history_row(generation_data):
+    output = next((generation_data[field] for field in HISTORY_OUTPUT_FIELDS if generation_data.get(field)), None)
+    return {
+        'type': generation_data.get('type'),
+        'languageCode': generation_data.get('languageCode'),
+        'input': preview(generation_data.get('input')),
+        'explanation': preview(generation_data.get('explanation')),
+        'preview': preview(output)
+    }
 
-def save_history(history):
-    with open(HISTORY_DB_FILE, 'w') as f:
-        json.dump(history, f, indent=2)
+# Entries written before the blob store hold their full body inline; they get a stable id from their content
+def history_entry_id(entry):
+    return entry.get('id') or hashlib.sha256(json.dumps(entry, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+
+# Index rows for /history. Rows still queued for writing have no blob yet, so rows are
+# told from legacy inline entries by their preview; the blob hash is left out so a row
+# reads the same before and after it is flushed.
+def history_index(entries):
+    rows = []
+    for entry in entries:
+        if 'preview' in entry:
+            rows.append({key: value for key, value in entry.items() if key != 'blob'})
+        else:
+            row = history_row(entry)
+            row['id'] = history_entry_id(entry)
+            row['timestamp'] = entry.get('timestamp')
+            rows.append(row)
+    return rows
+
+# Queued history entries are written by write_history_batch on a background thread; set
+# HISTORY_WRITE_BEHIND=0 to write them inside the request instead
+HISTORY_WRITE_BEHIND = os.environ.get('HISTORY_WRITE_BEHIND', '1') == '1'
+
+# Mirror of history in the Supabase generation_history schema (None when HISTORY_SINK=off)
+history_table = create_history_table()
+
+# Row for the generation_history table, in GENERATION_HISTORY_COLUMNS order; the table
+# swaps the email for the account's auth user id. History timestamps are naive UTC, so
+# created_at carries the offset explicitly for timestamptz.
+def generation_history_row(item):
+    data = item['data']
+    output = next((data[field] for field in HISTORY_OUTPUT_FIELDS if data.get(field)), None)
+    created_at = datetime.datetime.fromisoformat(item['row']['timestamp']).replace(tzinfo=datetime.timezone.utc)
+    return (item['row']['id'], item['email'], data.get('type'), data.get('input') or '', output,
+            data.get('translatedPrompt'), data.get('explanation'), data.get('languageCode'), created_at.isoformat())
+
+# Give an account its auth user in the history table (the SQLite stand-in; Supabase Auth
+# owns auth.users). Failures are logged, since history mirroring must not block sign-in.
+def register_history_user(email):
+    if history_table is None:
+        return
+    try:
+        history_table.register_user(email)
+    except Exception as e:
+        logger.warning(f"Could not register history user {email}: {str(e)}")
+
+# Write a batch of queued entries. Each entry's local write happens once even if the batch
+# is retried; the table insert skips rows it already has.
+def write_history_batch(batch):
+    for item in batch:
+        if item.get('stored'):
+            continue
+        # Store the full body by content hash, and index it with a small row
+        row = dict(item['row'], blob=blob_store.put(item['data']))
+        # Prepend (most recent first) and keep only the last 10 generations
+        history_store.append_history(item['email'], row)
+        item['stored'] = True
+    if history_table is not None:
+        history_table.insert_many([generation_history_row(item) for item in batch])
+    schedule_blob_collection()
+
+def collect_blobs():
+    try:
+        removed = blob_store.collect(referenced_blobs(history_store))
+        logger.info(f"Removed {removed} unreferenced history blobs")
+    except Exception as e:
+        logger.error(f"History blob collection failed: {str(e)}")
+
+# Start a blob collection on its own thread when one is due; the marker file in the blob
+# directory makes sure only one worker runs it per interval
+def schedule_blob_collection():
+    if HISTORY_BLOB_GC_INTERVAL > 0 and blob_store.claim_collection(HISTORY_BLOB_GC_INTERVAL):
+        threading.Thread(target=collect_blobs, name='blob-gc', daemon=True).start()
+
+history_sink = WriteBehindQueue(
+    write_history_batch,
+    batch_size=int(os.environ.get('HISTORY_FLUSH_SIZE', 100)),
+    flush_interval=float(os.environ.get('HISTORY_FLUSH_INTERVAL', 1.0)),
+    max_pending=int(os.environ.get('HISTORY_MAX_PENDING', 10000)),
+    put_timeout=float(os.environ.get('HISTORY_PUT_TIMEOUT', 1.0))
+)
+# Drain on interpreter exit (gunicorn also drains in its worker_exit hook)
+atexit.register(history_sink.close)
+
+# Write-behind counters plus the table rows skipped for want of an auth user
+def history_sink_stats():
+    return dict(history_sink.stats(), unlinked=history_table.unlinked if history_table is not None else 0)
 
 def add_to_history(email, generation_data):
-    history = load_history()
-    if email not in history:
-        history[email] = []
-    
-    # Add timestamp to the generation data
-    generation_data['timestamp'] = datetime.datetime.utcnow().isoformat()
-    
-    # Add to the beginning of the list (most recent first)
-    history[email].insert(0, generation_data)
-    
-    # Keep only the last 10 generations
-    history[email] = history[email][:10]
-    
-    save_history(history)
+    with timed('history_write'):
+        item = {
+            'email': email,
+            'data': generation_data,
+            'row': dict(history_row(generation_data), id=uuid.uuid4().hex, timestamp=datetime.datetime.utcnow().isoformat())
+        }
+        if HISTORY_WRITE_BEHIND:
+            history_sink.put(item)
+        else:
+            write_history_batch([item])
+
+# A user's history, newest first, including entries still waiting to be written
+def user_history(email):
+    entries = history_store.get_history(email)
+    stored = {entry.get('id') for entry in entries}
+    pending = [item['row'] for item in reversed(history_sink.pending()) if item['email'] == email and item['row']['id'] not in stored]
+    return (pending + entries)[:HISTORY_LIMIT]
+
+# Resolve the request's bearer token to its user; returns (current_user, None), or
+# (None, error response) when the request isn't authenticated
+def authenticate():
+    token = request.headers.get('Authorization')
+    if not token:
+        return None, (jsonify({'error': 'Token is missing'}), 401)
+    try:
+        token = token.split(' ')[1]  # Remove 'Bearer ' prefix
+        with timed('auth_decode'):
+            data = decode_token(token)
+        # Only access tokens authenticate requests; refresh tokens go to /refresh-token
+        if data.get('typ') != 'access' or token_index.is_revoked(data['fam']):
+            return None, (jsonify({'error': 'Invalid token'}), 401)
+        with timed('user_load'):
+            user = get_user_record(data['email'])
+        if not user:
+            return None, (jsonify({'error': 'Invalid token'}), 401)
+
+        # Copy so the cached record is not mutated, then add email
+        current_user = dict(user)
+        current_user['email'] = data['email']
+        # Attribute upstream calls to this user for rate limiting; interactive by default
+        set_call_context(data['email'])
+    except jwt.ExpiredSignatureError:
+        return None, (jsonify({'error': 'Token has expired', 'code': 'TOKEN_EXPIRED'}), 401)
+    except:
+        return None, (jsonify({'error': 'Invalid token'}), 401)
+    return current_user, None
 
 # JWT token required decorator
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-        try:
-            token = token.split(' ')[1]  # Remove 'Bearer ' prefix
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-            users = load_users()
-            current_user = users.get(data['email'])
-            if not current_user:
-                return jsonify({'error': 'Invalid token'}), 401
-            
-            # Add email to the current_user object
-            current_user['email'] = data['email']
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired', 'code': 'TOKEN_EXPIRED'}), 401
-        except:
-            return jsonify({'error': 'Invalid token'}), 401
+        current_user, error = authenticate()
+        if error is not None:
+            return error
         return f(current_user, *args, **kwargs)
     return decorated
 
+# Request timing for /metrics
+@api.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    set_route(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@api.after_app_request
+def record_request_time(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_duration.observe(time.perf_counter() - started, route=route, method=request.method, status=response.status_code)
+    return response
+
+# Compress buffered responses for clients that accept gzip/brotli. After-request hooks run in
+# reverse order, so this runs before the timer above and its cost shows in request timings.
+@api.after_app_request
+def compress(response):
+    with timed('compress'):
+        return compress_response(response, request.accept_encodings)
+
+# Strong ETag for a JSON response (its body hash unless given), answering 304 when the client has it
+def conditional(response, etag=None):
+    etag = etag or hashlib.sha256(response.get_data()).hexdigest()
+    matched = matching_etag(request.if_none_match, etag)
+    if matched:
+        response = Response(status=304)
+        etag = matched
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Prometheus-style metrics for this worker process
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    body = render_metrics({
+        'token_cache': token_cache.stats(),
+        'token_index': token_index.stats(),
+        'user_cache': user_cache.stats(),
+        'response_cache': {key: value for key, value in response_cache.stats().items() if key != 'memory'},
+        'single_flight': single_flight.stats(),
+        'groq_scheduler': groq_scheduler.stats(),
+        'circuit_sarvam': breakers['sarvam'].stats(),
+        'circuit_groq': breakers['groq'].stats(),
+        'translation_memory': boilerplate.stats(),
+        'history_sink': history_sink_stats()
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 # Token refresh route
-@app.route('/refresh-token', methods=['POST'])
+@api.route('/refresh-token', methods=['POST'])
 def refresh_token():
     try:
         refresh_token = request.json.get('refresh_token')
@@ -108,30 +386,29 @@ def refresh_token():
             return jsonify({'error': 'Refresh token is missing'}), 400
 
         try:
-            # Verify the refresh token
-            logger.info("Attempting to decode refresh token")
-            data = jwt.decode(refresh_token, app.config['SECRET_KEY'], algorithms=["HS256"])
+            # Verify the refresh token; no user store read is needed
+            data = jwt.decode(refresh_token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+            # Clients only ever sent their refresh token here, whatever its age
+            data = with_token_type(data, hashlib.sha256(refresh_token.encode()).hexdigest(), 'refresh')
+            if data.get('typ') != 'refresh':
+                raise jwt.InvalidTokenError("Not a refresh token")
             email = data['email']
-            
-            # Check if user exists
-            users = load_users()
-            if email not in users:
-                logger.error(f"User {email} not found during token refresh")
+            family = data['fam']
+
+            if token_index.is_revoked(family):
+                logger.warning(f"Refresh with revoked token family for user {email}")
                 return jsonify({'error': 'Invalid refresh token'}), 401
 
-            # Generate new access token
-            logger.info(f"Generating new access token for user {email}")
-            new_token = jwt.encode({
-                'email': email,
-                'exp': datetime.datetime.utcnow() + TOKEN_EXPIRY
-            }, app.config['SECRET_KEY'])
+            # Each refresh token works once; a second use means it leaked, unless it
+            # is a concurrent refresh (e.g. another tab) within the reuse grace window,
+            # which gets its own fresh pair in the same family
+            if not token_index.consume(data['jti'], family, data['exp']):
+                token_index.revoke_family(family, time.time() + REFRESH_TOKEN_EXPIRY.total_seconds())
+                logger.warning(f"Refresh token reuse detected for user {email}; revoked its token family")
+                return jsonify({'error': 'Refresh token was already used', 'code': 'REFRESH_TOKEN_REUSED'}), 401
 
-            # Generate new refresh token
-            logger.info(f"Generating new refresh token for user {email}")
-            new_refresh_token = jwt.encode({
-                'email': email,
-                'exp': datetime.datetime.utcnow() + REFRESH_TOKEN_EXPIRY
-            }, app.config['SECRET_KEY'])
+            # Rotate: new access and refresh tokens in the same family
+            new_token, new_refresh_token = issue_tokens(email, family)
 
             logger.info(f"Token refresh successful for user {email}")
             return jsonify({
@@ -154,19 +431,66 @@ def refresh_token():
         return jsonify({'error': 'An error occurred during token refresh'}), 500
 
 # Get generation history route
-@app.route('/history', methods=['GET'])
+@api.route('/history', methods=['GET'])
 @token_required
 def get_history(current_user):
     try:
-        history = load_history()
-        user_history = history.get(current_user['email'], [])
-        return jsonify({'history': user_history})
+        return conditional(jsonify({'history': history_index(user_history(current_user['email']))}))
     except Exception as e:
         logger.error(f"Error fetching history: {str(e)}")
         return jsonify({'error': 'Failed to fetch history'}), 500
 
+# Get one full history entry; its ETag is the body's content hash
+@api.route('/history/<entry_id>', methods=['GET'])
+@token_required
+def get_history_entry(current_user, entry_id):
+    try:
+        entries = user_history(current_user['email'])
+        entry = next((entry for entry in entries if history_entry_id(entry) == entry_id), None)
+        if entry is None:
+            return jsonify({'error': 'History entry not found'}), 404
+
+        pending = next((item for item in history_sink.pending() if item['row']['id'] == entry_id), None)
+        if pending is not None:
+            # Not written yet: serve the queued body
+            body = dict(pending['data'], timestamp=entry.get('timestamp'))
+            etag = None
+        elif 'blob' not in entry:
+            body = dict(entry)
+            etag = entry_id
+        else:
+            etag = entry['blob']
+            if matching_etag(request.if_none_match, etag):
+                # Unchanged: answer without reading the blob
+                return conditional(Response(), etag)
+            body = blob_store.get(etag)
+            if body is None:
+                return jsonify({'error': 'History entry body is no longer available'}), 404
+            body['timestamp'] = entry.get('timestamp')
+        body['id'] = entry_id
+
+        return conditional(jsonify({'entry': body}), etag)
+    except Exception as e:
+        logger.error(f"Error fetching history entry: {str(e)}")
+        return jsonify({'error': 'Failed to fetch history entry'}), 500
+
+# Auth cache counters
+@api.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'token_cache': token_cache.stats(),
+        'token_index': token_index.stats(),
+        'user_cache': user_cache.stats(),
+        'response_cache': response_cache.stats(),
+        'single_flight': single_flight.stats(),
+        'groq_scheduler': groq_scheduler.stats(),
+        'circuit_breakers': {name: breaker.stats() for name, breaker in breakers.items()},
+        'translation_memory': boilerplate.stats(),
+        'history_sink': history_sink_stats()
+    })
+
 # Signup route
-@app.route('/signup', methods=['POST'])
+@api.route('/signup', methods=['POST'])
 def signup():
     try:
         data = request.json
@@ -177,30 +501,19 @@ def signup():
         if not all([name, email, password]):
             return jsonify({'error': 'Missing required fields'}), 400
 
-        users = load_users()
-        
-        # Check if user already exists
-        if email in users:
-            return jsonify({'error': 'Email already registered'}), 400
-
-        # Create new user (Note: In production, hash the password!)
-        users[email] = {
+        # Create new user; fails if the email is already registered
+        with timed('password_hash'):
+            password_hash = hash_password(password)
+        created = create_user(email, {
             'name': name,
-            'password': password  # Use bcrypt or similar for password hashing
-        }
-        save_users(users)
-
-        # Generate JWT token
-        token = jwt.encode({
-            'email': email,
-            'exp': datetime.datetime.utcnow() + TOKEN_EXPIRY
-        }, app.config['SECRET_KEY'])
+            'passwordHash': password_hash
+        })
+        if not created:
+            return jsonify({'error': 'Email already registered'}), 400
+        register_history_user(email)
 
-        # Generate refresh token
-        refresh_token = jwt.encode({
-            'email': email,
-            'exp': datetime.datetime.utcnow() + REFRESH_TOKEN_EXPIRY
-        }, app.config['SECRET_KEY'])
+        # Generate access and refresh tokens (a new token family)
+        token, refresh_token = issue_tokens(email)
 
         return jsonify({
             'token': token,
@@ -215,7 +528,7 @@ def signup():
         return jsonify({'error': 'An error occurred during signup'}), 500
 
 # Login route
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def login():
     try:
         data = request.json
@@ -225,23 +538,15 @@ def login():
         if not email or not password:
             return jsonify({'error': 'Missing email or password'}), 400
 
-        users = load_users()
-        user = users.get(email)
-        
-        if not user or user['password'] != password:  # In production, use proper password hashing!
+        user = get_user_record(email)
+
+        if not check_password(email, user, password):
             return jsonify({'error': 'Invalid email or password'}), 401
+        # Accounts created before the history table had auth users get one here
+        register_history_user(email)
 
-        # Generate JWT token
-        token = jwt.encode({
-            'email': email,
-            'exp': datetime.datetime.utcnow() + TOKEN_EXPIRY
-        }, app.config['SECRET_KEY'])
-
-        # Generate refresh token
-        refresh_token = jwt.encode({
-            'email': email,
-            'exp': datetime.datetime.utcnow() + REFRESH_TOKEN_EXPIRY
-        }, app.config['SECRET_KEY'])
+        # Generate access and refresh tokens (a new token family)
+        token, refresh_token = issue_tokens(email)
 
         return jsonify({
             'token': token,
@@ -256,16 +561,16 @@ def login():
         return jsonify({'error': 'An error occurred during login'}), 500
 
 # Get user data route
-@app.route('/user', methods=['GET'])
+@api.route('/user', methods=['GET'])
 @token_required
 def get_user(current_user):
     try:
-        return jsonify({
+        return conditional(jsonify({
             'user': {
                 'email': current_user['email'],
                 'name': current_user['name']
             }
-        })
+        }))
     except Exception as e:
         logger.error(f"Error fetching user data: {str(e)}")
         return jsonify({'error': 'Failed to fetch user data'}), 500
@@ -274,241 +579,255 @@ def get_user(current_user):
 SARVAM_API_KEY = os.environ.get('SARVAM_API_KEY', 'sk_vyr4ze68_kzjm76DIOxG0dOQmmDDN1QMK')
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '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')
 
+# Shared pooled clients for Sarvam and Groq (see upstream.py)
+configure_upstreams(sarvam_api_key=SARVAM_API_KEY, groq_api_key=GROQ_API_KEY)
+
+# Detect the prompt's script locally and only send Sarvam what needs translating (see detection.py)
+LANGUAGE_DETECTION = os.environ.get('LANGUAGE_DETECTION', '1') == '1'
+
 # Function: Translate using Sarvam
-def translate_to_english(user_input, source_language_code):
+def translate_to_english(user_input, source_language_code, use_cache=True):
     logger.info(f"Translating text: {user_input[:100]}... from {source_language_code}")
-    
-    # Check input length (Sarvam mayura:v1 limit is 1000 characters)
-    if len(user_input) > 1000:
-        logger.warning(f"Input text exceeds 1000 characters ({len(user_input)}). Truncating.")
-        user_input = user_input[:1000]
-
-    url = "https://api.sarvam.ai/translate"
-    headers = {
-        "api-subscription-key": SARVAM_API_KEY,
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "input": user_input,
-        "source_language_code": source_language_code,
-        "target_language_code": "en-IN"
-    }
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        response_json = response.json()
-        logger.info(f"Sarvam API Response: {response_json}")
 
-        if response.status_code == 200 and 'translated_text' in response_json:
-            return response_json['translated_text']
-        else:
-            logger.error(f"Translation failed: {response_json}")
-            return "Translation Failed!"
-    except Exception as e:
-        logger.error(f"Translation error: {str(e)}")
+    # Inputs over Sarvam's 1000-character limit are translated in sentence-aligned chunks
+    try:
+        if LANGUAGE_DETECTION:
+            return translate_detected(user_input, source_language_code, "en-IN", use_cache=use_cache)
+        return translate_text(user_input, source_language_code, "en-IN", use_cache=use_cache)
+    except UpstreamError as e:
+        logger.error(f"Translation failed: {str(e)}")
         return "Translation Failed!"
 
 # Function: Translate from English using Sarvam
-def translate_from_english(text, target_language_code):
+def translate_from_english(text, target_language_code, use_cache=True):
     logger.info(f"Translating text from English to {target_language_code}")
-    
-    # Check input length (Sarvam mayura:v1 limit is 1000 characters)
-    if len(text) > 1000:
-        logger.warning(f"Input text exceeds 1000 characters ({len(text)}). Truncating.")
-        text = text[:1000]
-
-    url = "https://api.sarvam.ai/translate"
-    headers = {
-        "api-subscription-key": SARVAM_API_KEY,
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "input": text,
-        "source_language_code": "en-IN",
-        "target_language_code": target_language_code
-    }
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        response_json = response.json()
-        logger.info(f"Sarvam API Translate from English Response: {response_json}")
 
-        if response.status_code == 200 and 'translated_text' in response_json:
-            return response_json['translated_text']
-        else:
-            logger.error(f"Translation from English failed: {response_json}")
-            return "Translation Failed!"
-    except Exception as e:
-        logger.error(f"Translation from English error: {str(e)}")
+    try:
+        return translate_text(text, "en-IN", target_language_code, use_cache=use_cache)
+    except UpstreamError as e:
+        logger.error(f"Translation from English failed: {str(e)}")
         return "Translation Failed!"
 
+# Degraded modes while an upstream's circuit breaker is open (see circuitbreaker.py):
+#   'translation'  Sarvam is down, so Groq gets the user's prompt untranslated
+#   'explanation'  Groq is failing, so the explanation step is skipped
+#   'cached_code'  Groq is failing, so the code last generated for the prompt is served
+#   'generation'   Groq is failing and no code is cached for the prompt; the request
+#                  fails with 503 (see generation_error_status)
+EXPLANATION_UNAVAILABLE = "Explanation is temporarily unavailable."
+
+# Split a combined code + explanation reply into (code, explanation); the explanation is
+# None when only the code came back, both are None when neither did. Raises
+# SectionParseError when the reply doesn't start with a section.
+def split_code_reply(reply):
+    parser = SectionParser()
+    parser.feed(reply)
+    parser.finish()
+    sections = parser.result()
+    code_output = sections['code'] or None
+    explanation = (sections['explanation'] or None) if code_output else None
+    return code_output, explanation
+
+# While Groq's circuit is open: the code (and explanation) last generated for this prompt,
+# from the response cache even if the client asked to bypass it; (None, None) when
+# neither the combined nor the code-only reply is cached
+def cached_code_with_explanation(prompt, target_language):
+    chat = PROMPTS['code_with_explanation'].render(prompt=prompt, target_language=target_language)
+    reply = response_cache.get(chat.cache_key)
+    if reply is not None:
+        try:
+            code_output, explanation = split_code_reply(reply)
+        except SectionParseError:
+            code_output = None
+        if code_output:
+            return code_output, explanation
+    return response_cache.get(PROMPTS['code'].render(prompt=prompt).cache_key), None
+
+# Translate the user's prompt to English, falling back to the untranslated prompt while
+# Sarvam's circuit is open; returns "Translation Failed!" on other failures
+def translate_prompt(user_input, user_language_code, degraded, use_cache=True):
+    translated_prompt = translate_to_english(user_input, user_language_code, use_cache=use_cache)
+    if translated_prompt == "Translation Failed!" and not upstream_available('sarvam'):
+        logger.warning("Sarvam circuit open; sending the prompt untranslated")
+        degraded.append('translation')
+        return user_input
+    return translated_prompt
+
+# Status for a failed generation: 503 while Groq's circuit is open, otherwise 500
+def generation_error_status():
+    return 500 if upstream_available('groq') else 503
+
 # Function: Generate code using Groq (LLaMA 3 - 70B)
-def generate_code(prompt):
+def generate_code(prompt, use_cache=True):
     logger.info(f"Starting code generation for prompt: {prompt[:100]}...")
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": "llama3-70b-8192",
-        "messages": [
-            {"role": "system", "content": "You are a helpful programming assistant. Generate clean, efficient, and well-documented code."},
-            {"role": "user", "content": f"Write a Python code for: {prompt}. Include comments explaining the code."}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 2000
-    }
     try:
-        logger.info("Sending request to Groq API...")
-        response = requests.post(url, headers=headers, json=data)
-        logger.info(f"Groq API Response Status: {response.status_code}")
-        
-        if response.status_code != 200:
-            logger.error(f"Groq API Error: {response.text}")
-            return f"Error: API returned status code {response.status_code}"
-            
-        response_json = response.json()
-        logger.info(f"Groq API Response: {response_json}")
-
-        if 'choices' in response_json and len(response_json['choices']) > 0:
-            code_output = response_json['choices'][0]['message']['content']
-            logger.info(f"Successfully generated code: {code_output[:100]}...")
-            return code_output
-        else:
-            logger.error(f"Unexpected API response format: {response_json}")
-            return f"Error: Unexpected API response format"
-    except Exception as e:
-        logger.error(f"Code generation error: {str(e)}", exc_info=True)
+        code_output = groq_complete(PROMPTS['code'].render(prompt=prompt), use_cache=use_cache)
+        logger.info(f"Successfully generated code: {code_output[:100]}...")
+        return code_output
+    except UpstreamError as e:
+        logger.error(f"Code generation error: {str(e)}")
         return f"Error: {str(e)}"
 
 # Function: Explain code in selected language
-def explain_code(code, target_language):
+def explain_code(code, target_language, use_cache=True):
     logger.info(f"Explaining code in {target_language}")
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": "llama3-70b-8192",
-        "messages": [
-            {"role": "system", "content": f"You are a helpful programming assistant. Provide a clear and concise explanation of the code in {target_language}."},
-            {"role": "user", "content": f"Explain the following code:\n{code}"}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 1000
-    }
     try:
-        response = requests.post(url, headers=headers, json=data)
-        response_json = response.json()
-        logger.info(f"Groq Explain API Response: {response_json}")
-
-        if 'choices' in response_json and len(response_json['choices']) > 0:
-            explanation = response_json['choices'][0]['message']['content']
-            return explanation
-        else:
-            logger.error(f"Explanation failed: {response_json}")
-            return f"Error: {response_json.get('error', {}).get('message', 'Unknown error')}"
-    except Exception as e:
+        return groq_complete(PROMPTS['explain'].render(code=code, target_language=target_language), use_cache=use_cache)
+    except UpstreamError as e:
         logger.error(f"Explanation error: {str(e)}")
         return f"Error: {str(e)}"
 
+# Ask Groq for the code and its explanation in one delimited reply instead of two calls
+COMBINED_GENERATION = os.environ.get('COMBINED_GENERATION', '1') == '1'
+
+# Function: Generate code and its explanation in one Groq call. Returns (code, explanation);
+# (error, None) when the call fails, (code, None) when only the code came back (the caller
+# then runs explain_code alone) and (None, None) when the reply can't be parsed, in which
+# case the caller falls back to generate_code + explain_code.
+def generate_code_with_explanation(prompt, target_language, use_cache=True):
+    logger.info(f"Starting combined code generation for prompt: {prompt[:100]}...")
+    chat = PROMPTS['code_with_explanation'].render(prompt=prompt, target_language=target_language)
+    try:
+        reply = groq_complete(chat, use_cache=use_cache)
+    except UpstreamError as e:
+        logger.error(f"Combined code generation error: {str(e)}")
+        return f"Error: {str(e)}", None
+    try:
+        # As in stream_code_with_explanation, a reply without the explanation still
+        # keeps its code, so only the explanation is generated separately
+        code_output, explanation = split_code_reply(reply)
+    except SectionParseError as e:
+        logger.warning(f"Combined code generation reply could not be parsed ({str(e)}); using separate calls")
+        combined_generations.inc(outcome='fallback')
+        return None, None
+    combined_generations.inc(outcome='parsed' if explanation else 'partial' if code_output else 'fallback')
+    return code_output, explanation
+
 # Function: Generate App Plan using Groq
-def generate_app_plan_from_prompt(prompt):
+def generate_app_plan_from_prompt(prompt, use_cache=True):
     logger.info(f"Starting app plan generation for prompt: {prompt[:100]}...")
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": "llama3-70b-8192",
-        "messages": [
-            {"role": "system", "content": "You are an AI assistant specialized in creating detailed application blueprints in markdown format. Provide a clear structure including sections like Introduction, Features, Technologies, Architecture, and rough steps for implementation. The plan should be comprehensive and easy to understand."},
-            {"role": "user", "content": f"Create an app plan for: {prompt}. Provide the output in markdown format."}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 2000
-    }
     try:
-        logger.info("Sending request to Groq API for app plan...")
-        response = requests.post(url, headers=headers, json=data)
-        logger.info(f"Groq API App Plan Response Status: {response.status_code}")
-
-        if response.status_code != 200:
-            logger.error(f"Groq API App Plan Error: {response.text}")
-            return f"Error: API returned status code {response.status_code} - {response.text}"
-
-        response_json = response.json()
-        logger.info(f"Groq API App Plan Response: {response_json}")
-
-        if 'choices' in response_json and len(response_json['choices']) > 0:
-            app_plan_output = response_json['choices'][0]['message']['content']
-            logger.info(f"Successfully generated app plan: {app_plan_output[:100]}...")
-            return app_plan_output
-        else:
-            logger.error(f"Unexpected API response format for app plan: {response_json}")
-            return "Error: Unexpected API response format for app plan"
-    except Exception as e:
-        logger.error(f"App plan generation error: {str(e)}", exc_info=True)
+        app_plan_output = groq_complete(PROMPTS['app_plan'].render(prompt=prompt), use_cache=use_cache)
+        logger.info(f"Successfully generated app plan: {app_plan_output[:100]}...")
+        return app_plan_output
+    except UpstreamError as e:
+        logger.error(f"App plan generation error: {str(e)}")
         return f"Error: {str(e)}"
 
 # Function: Generate Code from App Plan using Groq
-def generate_code_from_plan_text(app_plan_text):
+def generate_code_from_plan_text(app_plan_text, use_cache=True, sectioned=None):
+    sectioned = plan_sections(app_plan_text, sectioned)
+    if sectioned:
+        return generate_code_from_plan_sections(*sectioned, use_cache=use_cache)
+
     logger.info(f"Starting code generation from app plan")
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": "llama3-70b-8192",
-        "messages": [
-            {"role": "system", "content": "You are an AI assistant specialized in generating code based on a provided application plan. Write the code based on the detailed blueprint. Provide clear and concise code."},
-            {"role": "user", "content": f"Generate code based on the following app plan:\n\n{app_plan_text}"}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 4000
-    }
     try:
-        logger.info("Sending request to Groq API for code from plan...")
-        response = requests.post(url, headers=headers, json=data)
-        logger.info(f"Groq API Code from Plan Response Status: {response.status_code}")
-
-        if response.status_code != 200:
-            logger.error(f"Groq API Code from Plan Error: {response.text}")
-            return f"Error: API returned status code {response.status_code} - {response.text}", None
-
-        response_json = response.json()
-        logger.info(f"Groq API Code from Plan Response: {response_json}")
-
-        # Check for error in response
-        if 'error' in response_json:
-            error_message = response_json['error'].get('message', 'Unknown error')
-            logger.error(f"Groq API Error: {error_message}")
-            return f"Error: {error_message}", None
-
-        # Check for choices in response
-        if 'choices' not in response_json or not response_json['choices']:
-            logger.error(f"Unexpected API response format: {response_json}")
-            return "Error: No choices in API response", None
-
-        code_output = response_json['choices'][0]['message']['content']
+        code_output = groq_complete(PROMPTS['code_from_plan'].render(app_plan_text=app_plan_text), use_cache=use_cache)
         explanation = "Code generated based on the provided app plan."
         logger.info(f"Successfully generated code from plan: {code_output[:100]}...")
-        return code_output, explanation
-
-    except Exception as e:
-        logger.error(f"Code generation from plan error: {str(e)}", exc_info=True)
-        return f"Error: {str(e)}", None
+        return code_output, explanation, None
+    except UpstreamError as e:
+        logger.error(f"Code generation from plan error: {str(e)}")
+        return f"Error: {str(e)}", None, None
+
+# Generate code for plans with several parts one part per call, concurrently, instead of in
+# a single completion that is slow and gets cut off at max_tokens on large plans. Off by
+# default: a plan then costs up to PLAN_MAX_SECTIONS Groq calls and the response becomes
+# a stitched bundle with a `files` list, so clients opt in with {"sectioned": true}.
+PLAN_SECTIONED_GENERATION = os.environ.get('PLAN_SECTIONED_GENERATION', '0') == '1'
+PLAN_SECTION_PARALLELISM = int(os.environ.get('PLAN_SECTION_PARALLELISM', 4))
+PLAN_MAX_SECTIONS = int(os.environ.get('PLAN_MAX_SECTIONS', 8))
+
+# Function: Split an app plan into parts (see plans.py); returns (title, [(part title, chat
+# request)]) or None when the plan should be generated in one call. `sectioned` is the
+# request's choice; None falls back to PLAN_SECTIONED_GENERATION.
+def plan_sections(app_plan_text, sectioned=None):
+    if not (PLAN_SECTIONED_GENERATION if sectioned is None else sectioned):
+        return None
+    title, context, sections = parse_plan(app_plan_text)
+    if len(sections) < 2:
+        return None
+    sections = merge_sections(sections, PLAN_MAX_SECTIONS)
+    parts = ', '.join(section.title for section in sections)
+    return title, [(section.title, PROMPTS['code_for_plan_section'].render(
+        title=title or 'Application', context=context or 'None', parts=parts, section=section.render()
+    )) for section in sections]
+
+# Start generating every part, at most PLAN_SECTION_PARALLELISM at once; returns one
+# future per part resolving to its output, or None if the part failed. The parts run with
+# the caller's context, so each one takes a Groq slot charged to the requesting user at
+# batch priority, counting against their fair share like any other call.
+def submit_plan_sections(requests, use_cache=True):
+    def generate(request):
+        part, chat = request
+        try:
+            return groq_complete(chat, use_cache=use_cache)
+        except UpstreamError as e:
+            logger.error(f"Code generation for plan part '{part}' failed: {str(e)}")
+            return None
+
+    return bounded_map(generate, requests, PLAN_SECTION_PARALLELISM)
+
+# Stitch part outputs into the bundle; returns (code, explanation, files) like
+# generate_code_from_plan_text
+def plan_bundle(title, requests, outputs):
+    if all(output is None for output in outputs):
+        return "Error: Code generation failed for every part of the plan", None, None
+    code_output, files = stitch_bundle(title, [(part, output) for (part, _), output in zip(requests, outputs)])
+    explanation = f"Code generated based on the provided app plan, in {len(requests)} parts."
+    return code_output, explanation, files
+
+# Function: Generate code from a plan part by part and stitch the multi-file bundle
+def generate_code_from_plan_sections(title, requests, use_cache=True):
+    logger.info(f"Starting code generation from app plan in {len(requests)} parts")
+    futures = submit_plan_sections(requests, use_cache=use_cache)
+    return plan_bundle(title, requests, [future.result() for future in futures])
+
+# Boilerplate shown to users, translated once per language (see TranslationMemory)
+boilerplate = TranslationMemory()
+
+# Function: Build the website HTML and its explanation in the user's language. The
+# explanation is the translated boilerplate lead followed by the user's original input,
+# which is already in their language, so no per-request translation is needed.
+def build_website(user_input, translated_prompt, user_language_code):
+    website_html = render_website(translated_prompt)
+    explanation_english = WEBSITE_EXPLANATION.format(prompt=translated_prompt)
+    if user_language_code == 'en-US':
+        return website_html, explanation_english
 
-# Main API Route
-@app.route('/process', methods=['POST'])
-@token_required
-def process(current_user):
     try:
-        data = request.json
-        user_email = current_user.get('email', 'Unauthorized User')
-        logger.info(f"Incoming Request Data for user {user_email}: {data}")
+        lead = boilerplate.translate(WEBSITE_EXPLANATION_LEAD, user_language_code)
+    except UpstreamError as e:
+        logger.warning(f"Website explanation translation failed ({str(e)}). Using English.")
+        return website_html, explanation_english
+    return website_html, f"{lead}: {user_input}"
+
+# Background jobs for long generations (see jobs.py)
+jobs = JobManager(
+    db_file=os.environ.get('JOBS_DB_FILE', 'jobs.db'),
+    max_workers=int(os.environ.get('JOB_WORKERS', 4)),
+    per_user_limit=int(os.environ.get('JOB_PER_USER_LIMIT', 2)),
+    retention=int(os.environ.get('JOB_RETENTION', 3600)),
+    heartbeat_interval=float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 10))
+)
+
+# Run native and English explanation attempts concurrently instead of sequentially (costs an extra call)
+PARALLEL_EXPLANATION_FALLBACK = os.environ.get('PARALLEL_EXPLANATION_FALLBACK', '0') == '1'
+
+# Clients opt out of cached generations with {"no_cache": true} or Cache-Control: no-cache
+def cache_allowed(data):
+    return not data.get('no_cache') and 'no-cache' not in request.headers.get('Cache-Control', '')
+
+# Tell the client which steps were skipped or simplified, if any
+def with_degraded(body, degraded):
+    if degraded:
+        body['degraded'] = degraded
+    return body
+
+# Function: Run the /process pipeline; returns (response body, status code)
+def run_process(user_email, data, use_cache=True):
+    try:
+        log_payload(logger, f"Incoming Request Data for user {user_email}", data)
 
         user_input = data.get('user_input')
         user_language_code = data.get('user_language_code')
@@ -516,48 +835,79 @@ def process(current_user):
 
         if not user_input or not user_language_code or not choice:
             logger.error(f"Missing required fields in process request from {user_email}")
-            return jsonify({'error': 'Missing required input fields'}), 400
+            return {'error': 'Missing required input fields'}, 400
 
-        logger.info(f"Processing request for user {user_email}: Input='{user_input}', Lang='{user_language_code}', Choice='{choice}'")
+        logger.info(f"Processing request for user {user_email}: Lang='{user_language_code}', Choice='{choice}'")
+        degraded = []
 
         # Translate user input to English for Groq
-        translated_prompt = translate_to_english(user_input, user_language_code)
+        with timed('translation'):
+            translated_prompt = translate_prompt(user_input, user_language_code, degraded, use_cache=use_cache)
 
         if translated_prompt == "Translation Failed!":
             logger.error(f"Translation of input failed for user {user_email}")
-            return jsonify({
+            return {
                 'error': 'Input translation failed. Please try again.',
                 'translatedPrompt': translated_prompt,
                 'codeOutput': None,
                 'explanation': None
-            }), 500
+            }, 500
 
-        logger.info(f"Translated Prompt for user {user_email}: {translated_prompt}")
+        log_payload(logger, f"Translated Prompt for user {user_email}", translated_prompt)
 
         if choice == 'code':
-            code_output = generate_code(translated_prompt)
+            code_output = explanation = None
+            with timed('generation'):
+                if not upstream_available('groq'):
+                    code_output, explanation = cached_code_with_explanation(translated_prompt, user_language_code)
+                    if code_output is not None:
+                        logger.warning(f"Groq circuit open; serving cached code for user {user_email}")
+                        degraded.append('cached_code')
+                elif COMBINED_GENERATION:
+                    code_output, explanation = generate_code_with_explanation(translated_prompt, user_language_code, use_cache=use_cache)
+                if code_output is None:
+                    code_output = generate_code(translated_prompt, use_cache=use_cache)
 
             if code_output.startswith("Error:"):
                 logger.error(f"Code generation failed for user {user_email}: {code_output}")
-                return jsonify({
+                if not upstream_available('groq'):
+                    degraded.append('generation')
+                return with_degraded({
                     'error': f'Code generation failed: {code_output}',
                     'translatedPrompt': translated_prompt,
                     'codeOutput': None,
                     'explanation': None
-                }), 500
+                }, degraded), generation_error_status()
 
             logger.info(f"Code Output for user {user_email}: {code_output[:100]}...")
 
-            # Generate explanation in the user's native language
-            explanation = explain_code(code_output, user_language_code)
+            # Generate explanation in the user's native language, unless it came with the code
+            if explanation is None:
+                with timed('explanation'):
+                    if not upstream_available('groq'):
+                        explanation = f"Error: {EXPLANATION_UNAVAILABLE}"
+                    elif PARALLEL_EXPLANATION_FALLBACK:
+                        # Run the native and English attempts side by side, preferring the native one
+                        explanation = first_success([
+                            (explain_code, (code_output, user_language_code, use_cache)),
+                            (explain_code, (code_output, "English", use_cache))
+                        ], is_error=lambda result: result.startswith("Error:"))
+                    else:
+                        explanation = explain_code(code_output, user_language_code, use_cache=use_cache)
+
+                        if explanation.startswith("Error:") and upstream_available('groq'):
+                            logger.warning(f"Explanation generation failed for user {user_email}: {explanation}")
+                            # Fallback to English explanation
+                            explanation = explain_code(code_output, "English", use_cache=use_cache)
 
-            if explanation.startswith("Error:"):
-                logger.warning(f"Explanation generation failed for user {user_email}: {explanation}")
-                # Fallback to English explanation
-                explanation = explain_code(code_output, "English")
                 if explanation.startswith("Error:"):
-                    logger.warning(f"English explanation also failed for user {user_email}: {explanation}")
-                    explanation = "Unable to generate explanation due to an error."
+                    if upstream_available('groq'):
+                        logger.warning(f"English explanation also failed for user {user_email}: {explanation}")
+                        explanation = "Unable to generate explanation due to an error."
+                    else:
+                        logger.warning(f"Groq circuit open; skipping the explanation for user {user_email}")
+                        explanation = EXPLANATION_UNAVAILABLE
+                        degraded.append('explanation')
 
             logger.info(f"Final Explanation for user {user_email}: {explanation[:100] if explanation else 'No explanation'}...")
 
@@ -571,36 +921,15 @@ def process(current_user):
                 'languageCode': user_language_code
             })
 
-            return jsonify({
+            return with_degraded({
                 'translatedPrompt': translated_prompt,
                 'codeOutput': code_output,
                 'explanation': explanation
-            })
+            }, degraded), 200
 
         elif choice == 'website':
-            website_html = f"""
-            <html>
-              <head>
-                <title>Generated Website</title>
-                <meta charset='utf-8'>
-                <style>
-                  body {{ font-family: sans-serif; padding: 2rem; background: #f9f9f9; }}
-                  h1 {{ color: #2563eb; }}
-                </style>
-              </head>
-              <body>
-                <h1>Website generated for:</h1>
-                <p>{translated_prompt}</p>
-              </body>
-            </html>
-            """
-            # Translate explanation to user's language
-            explanation_english = f'This website was generated based on your description: {translated_prompt}'
-            explanation = translate_from_english(explanation_english, user_language_code) if user_language_code != 'en-US' else explanation_english
-
-            if explanation == "Translation Failed!":
-                logger.warning(f"Website explanation translation failed for user {user_email}. Using English.")
-                explanation = explanation_english
+            with timed('generation'):
+                website_html, explanation = build_website(user_input, translated_prompt, user_language_code)
 
             # Save to history
             add_to_history(user_email, {
@@ -612,58 +941,58 @@ def process(current_user):
                 'languageCode': user_language_code
             })
 
-            return jsonify({
+            return with_degraded({
                 'translatedPrompt': translated_prompt,
                 'websiteHtml': website_html,
                 'explanation': explanation
-            })
+            }, degraded), 200
 
         else:
             logger.error(f"Invalid choice received for user {user_email}: {choice}")
-            return jsonify({'error': 'Invalid choice provided'}), 400
+            return {'error': 'Invalid choice provided'}, 400
 
     except Exception as e:
         logger.error(f"Critical Process error for user {user_email}: {str(e)}", exc_info=True)
-        return jsonify({
+        return {
             'error': f'An internal server error occurred: {str(e)}'
-        }), 500
+        }, 500
 
-# Generate App Plan route
-@app.route('/generate_app_plan', methods=['POST'])
-@token_required
-def generate_app_plan_route(current_user):
+# Function: Run app plan generation; returns (response body, status code)
+def run_app_plan(user_email, data, use_cache=True):
     try:
-        data = request.json
         user_input = data.get('user_input')
         user_language_code = data.get('user_language_code')
 
         if not user_input or not user_language_code:
-            return jsonify({'error': 'Missing user_input or user_language_code'}), 400
+            return {'error': 'Missing user_input or user_language_code'}, 400
 
-        logger.info(f"Received request to generate app plan for user {current_user['email']}: Input='{user_input}', Lang='{user_language_code}'")
+        logger.info(f"Received request to generate app plan for user {user_email}: Lang='{user_language_code}'")
+        degraded = []
 
         # Translate input if not English
-        translated_prompt = translate_to_english(user_input, user_language_code) if user_language_code != 'en-US' else user_input
+        with timed('translation'):
+            translated_prompt = translate_prompt(user_input, user_language_code, degraded, use_cache=use_cache) if user_language_code != 'en-US' else user_input
 
         if translated_prompt == "Translation Failed!":
-            return jsonify({
+            return {
                 'error': 'Translation failed. Cannot generate app plan.',
                 'translatedPrompt': translated_prompt,
                 'appPlanOutput': None
-            }), 500
+            }, 500
 
-        app_plan_output = generate_app_plan_from_prompt(translated_prompt)
+        with timed('generation'):
+            app_plan_output = generate_app_plan_from_prompt(translated_prompt, use_cache=use_cache)
 
         if app_plan_output.startswith("Error:"):
-            logger.error(f"App plan generation failed for user {current_user['email']}: {app_plan_output}")
-            return jsonify({
+            logger.error(f"App plan generation failed for user {user_email}: {app_plan_output}")
+            return {
                 'error': f'App plan generation failed: {app_plan_output}',
                 'translatedPrompt': translated_prompt,
                 'appPlanOutput': None
-            }), 500
+            }, generation_error_status()
 
         # Save to history
-        add_to_history(current_user['email'], {
+        add_to_history(user_email, {
             'type': 'app_plan',
             'input': user_input,
             'translatedPrompt': translated_prompt,
@@ -671,54 +1000,446 @@ def generate_app_plan_route(current_user):
             'languageCode': user_language_code
         })
 
-        return jsonify({
+        return with_degraded({
             'translatedPrompt': translated_prompt,
             'appPlanOutput': app_plan_output
-        })
+        }, degraded), 200
     except Exception as e:
-        logger.error(f"Error in generate_app_plan_route for user {current_user['email']}: {str(e)}", exc_info=True)
-        return jsonify({'error': 'An internal error occurred during app plan generation'}), 500
+        logger.error(f"Error in generate_app_plan_route for user {user_email}: {str(e)}", exc_info=True)
+        return {'error': 'An internal error occurred during app plan generation'}, 500
 
-# Generate Code from App Plan route
-@app.route('/generate-code-from-plan', methods=['POST'])
-@token_required
-def generate_code_from_plan(current_user):
+# Function: Run code generation from an app plan; returns (response body, status code)
+def run_code_from_plan(user_email, data, use_cache=True):
     try:
-        data = request.json
         app_plan_text = data.get('app_plan_text')
 
         if not app_plan_text:
-            logger.error(f"Missing app_plan_text for user {current_user['email']}")
-            return jsonify({'error': 'App plan text is required'}), 400
+            logger.error(f"Missing app_plan_text for user {user_email}")
+            return {'error': 'App plan text is required'}, 400
 
-        logger.info(f"Generating code from app plan for user {current_user['email']}")
+        logger.info(f"Generating code from app plan for user {user_email}")
 
         # Generate code directly from app_plan_text (no translation)
-        code_output, explanation = generate_code_from_plan_text(app_plan_text)
+        with timed('generation'):
+            code_output, explanation, files = generate_code_from_plan_text(app_plan_text, use_cache=use_cache,
+                                                                           sectioned=data.get('sectioned'))
 
         if code_output.startswith("Error:"):
-            logger.error(f"Code generation from plan failed for user {current_user['email']}: {code_output}")
-            return jsonify({
+            logger.error(f"Code generation from plan failed for user {user_email}: {code_output}")
+            return {
                 'error': f'Code generation failed: {code_output}',
                 'codeOutput': None
-            }), 500
+            }, generation_error_status()
 
         # Save to history
-        add_to_history(current_user['email'], {
+        add_to_history(user_email, {
             'type': 'code_from_plan',
             'input': app_plan_text,
             'codeOutput': code_output,
             'explanation': explanation
         })
 
+        body = {'codeOutput': code_output}
+        if files is not None:
+            body['files'] = files
+        return body, 200
+
+    except Exception as e:
+        logger.error(f"Error in generate_code_from_plan for user {user_email}: {str(e)}", exc_info=True)
+        return {'error': f'An internal error occurred: {str(e)}'}, 500
+
+# Main API Route
+@api.route('/process', methods=['POST'])
+@token_required
+def process(current_user):
+    data = request.json
+    if data.get('async'):
+        return submit_job(current_user['email'], 'process', run_process, data)
+    body, status = run_process(current_user['email'], data, use_cache=cache_allowed(data))
+    return jsonify(body), status
+
+# Generate App Plan route
+@api.route('/generate_app_plan', methods=['POST'])
+@token_required
+def generate_app_plan_route(current_user):
+    data = request.json
+    if data.get('async'):
+        return submit_job(current_user['email'], 'app_plan', run_app_plan, data)
+    body, status = run_app_plan(current_user['email'], data, use_cache=cache_allowed(data))
+    return jsonify(body), status
+
+# Generate Code from App Plan route
+@api.route('/generate-code-from-plan', methods=['POST'])
+@token_required
+def generate_code_from_plan(current_user):
+    data = request.json
+    # Long plan-to-code generations queue behind interactive /process calls
+    set_call_context(current_user['email'], PRIORITY_BATCH)
+    if data.get('async'):
+        return submit_job(current_user['email'], 'code_from_plan', run_code_from_plan, data)
+    body, status = run_code_from_plan(current_user['email'], data, use_cache=cache_allowed(data))
+    return jsonify(body), status
+
+# Queue a generation as a background job (opt in with {"async": true})
+def submit_job(user_email, kind, fn, data):
+    try:
+        job = jobs.submit(user_email, kind, fn, user_email, data, cache_allowed(data))
+    except JobLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify({'jobId': job['id'], 'status': job['status']}), 202
+
+# Job status route
+@api.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    job = jobs.get(job_id, current_user['email'])
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    job.pop('result', None)
+    return jsonify({'job': job})
+
+# Job result route; 202 while the job is still queued or running
+@api.route('/jobs/<job_id>/result', methods=['GET'])
+@token_required
+def get_job_result(current_user, job_id):
+    job = jobs.get(job_id, current_user['email'])
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] in ('queued', 'running'):
+        return jsonify({'jobId': job_id, 'status': job['status']}), 202
+    if job['status'] == 'cancelled':
+        return jsonify({'error': 'Job was cancelled', 'status': 'cancelled'}), 410
+    return jsonify(job['result']), job['statusCode']
+
+# Job cancellation route; only queued jobs can be cancelled
+@api.route('/jobs/<job_id>', methods=['DELETE'])
+@token_required
+def cancel_job(current_user, job_id):
+    job = jobs.get(job_id, current_user['email'])
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if not jobs.cancel(job_id, current_user['email']):
+        return jsonify({'error': f"Job is already {job['status']}", 'status': job['status']}), 409
+    return jsonify({'jobId': job_id, 'status': 'cancelled'})
+
+# Maximum number of strings accepted by /translate/batch
+TRANSLATE_BATCH_LIMIT = int(os.environ.get('TRANSLATE_BATCH_LIMIT', 100))
+
+# Batch translation route
+@api.route('/translate/batch', methods=['POST'])
+@token_required
+def translate_batch_route(current_user):
+    try:
+        data = request.json or {}
+        texts = data.get('texts')
+        source_language_code = data.get('source_language_code')
+        target_language_code = data.get('target_language_code')
+
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': 'texts must be a list of strings'}), 400
+        if not source_language_code or not target_language_code:
+            return jsonify({'error': 'Missing source_language_code or target_language_code'}), 400
+        if len(texts) > TRANSLATE_BATCH_LIMIT:
+            return jsonify({'error': f'At most {TRANSLATE_BATCH_LIMIT} texts per batch'}), 400
+
+        if source_language_code == target_language_code:
+            translations = list(texts)
+        else:
+            translations = translate_batch(texts, source_language_code, target_language_code, use_cache=cache_allowed(data))
+
+        failed = [index for index, translation in enumerate(translations) if translation is None]
+        if failed:
+            logger.warning(f"Batch translation failed for {len(failed)} of {len(texts)} texts for user {current_user['email']}")
         return jsonify({
-            'codeOutput': code_output
+            'translations': translations,
+            'failed': failed
         })
-
     except Exception as e:
-        logger.error(f"Error in generate_code_from_plan for user {current_user['email']}: {str(e)}", exc_info=True)
-        return jsonify({'error': f'An internal error occurred: {str(e)}'}), 500
+        logger.error(f"Batch translation error for user {current_user['email']}: {str(e)}", exc_info=True)
+        return jsonify({'error': 'An internal error occurred during translation'}), 500
+
+# Format one server-sent event
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Forward a streamed Groq completion as SSE delta events; returns (text, error) via `yield from`
+def stream_completion(event_name, chat, use_cache=True):
+    parts = []
+    try:
+        for delta in groq_complete_stream(chat, use_cache=use_cache):
+            parts.append(delta)
+            yield sse_event(event_name, {'delta': delta})
+    except UpstreamError as e:
+        logger.error(f"Streaming {event_name} failed: {str(e)}")
+        return None, f"Error: {str(e)}"
+    return ''.join(parts), None
+
+# Stream a combined code + explanation reply, forwarding each section as its own delta
+# events; returns (code, explanation, error) via `yield from`. A section that is missing
+# from the reply comes back as None (with a reset event if any of it was sent) so the
+# caller can generate it separately.
+def stream_code_with_explanation(chat, use_cache=True):
+    parser = SectionParser()
+    stream = groq_complete_stream(chat, use_cache=use_cache)
+    try:
+        for delta in stream:
+            for section, text in parser.feed(delta):
+                yield sse_event(section, {'delta': text})
+        for section, text in parser.finish():
+            yield sse_event(section, {'delta': text})
+    except UpstreamError as e:
+        logger.error(f"Streaming combined code generation failed: {str(e)}")
+        return None, None, f"Error: {str(e)}"
+    except SectionParseError as e:
+        # Raised before any section started, so nothing has been forwarded yet
+        logger.warning(f"Combined code generation reply could not be parsed ({str(e)}); using separate calls")
+        combined_generations.inc(outcome='fallback')
+        return None, None, None
+    finally:
+        stream.close()
+
+    sections = parser.result()
+    code_output = sections['code'] or None
+    explanation = (sections['explanation'] or None) if code_output else None
+    for section, value in (('code', code_output), ('explanation', explanation)):
+        if value is None and parser.text[section]:
+            yield sse_event(f'{section}_reset', {})
+    combined_generations.inc(outcome='parsed' if explanation else 'partial' if code_output else 'fallback')
+    return code_output, explanation, None
+
+# Error event for a failed code generation, marked degraded when Groq's circuit is open
+def generation_failure(error, degraded):
+    if not upstream_available('groq'):
+        degraded = degraded + ['generation']
+    return with_degraded({'error': f'Code generation failed: {error}'}, degraded)
+
+# Streaming variant of /process
+@api.route('/process/stream', methods=['POST'])
+@token_required
+def process_stream(current_user):
+    data = request.json or {}
+    user_email = current_user['email']
+    user_input = data.get('user_input')
+    user_language_code = data.get('user_language_code')
+    choice = data.get('choice')
+    use_cache = cache_allowed(data)
+
+    if not user_input or not user_language_code or not choice:
+        return jsonify({'error': 'Missing required input fields'}), 400
+    if choice not in ('code', 'website'):
+        return jsonify({'error': 'Invalid choice provided'}), 400
+
+    def events():
+        degraded = []
+        with timed('translation'):
+            translated_prompt = translate_prompt(user_input, user_language_code, degraded, use_cache=use_cache)
+        if translated_prompt == "Translation Failed!":
+            yield sse_event('error', {'error': 'Input translation failed. Please try again.'})
+            return
+        yield sse_event('translation', {'translatedPrompt': translated_prompt})
+
+        if choice == 'website':
+            website_html, explanation = build_website(user_input, translated_prompt, user_language_code)
+            add_to_history(user_email, {
+                'type': 'website',
+                'input': user_input,
+                'translatedPrompt': translated_prompt,
+                'websiteHtml': website_html,
+                'explanation': explanation,
+                'languageCode': user_language_code
+            })
+            yield sse_event('done', with_degraded({
+                'translatedPrompt': translated_prompt,
+                'websiteHtml': website_html,
+                'explanation': explanation
+            }, degraded))
+            return
+
+        code_output = explanation = None
+        if not upstream_available('groq'):
+            code_output, explanation = cached_code_with_explanation(translated_prompt, user_language_code)
+            if code_output is not None:
+                logger.warning(f"Groq circuit open; serving cached code for user {user_email}")
+                degraded.append('cached_code')
+                yield sse_event('code', {'delta': code_output})
+                if explanation is not None:
+                    yield sse_event('explanation', {'delta': explanation})
+        elif COMBINED_GENERATION:
+            chat = PROMPTS['code_with_explanation'].render(prompt=translated_prompt, target_language=user_language_code)
+            code_output, explanation, error = yield from stream_code_with_explanation(chat, use_cache)
+            if error:
+                yield sse_event('error', generation_failure(error, degraded))
+                return
+        if code_output is None:
+            code_output, error = yield from stream_completion('code', PROMPTS['code'].render(prompt=translated_prompt), use_cache)
+            if error:
+                yield sse_event('error', generation_failure(error, degraded))
+                return
+
+        if explanation is not None:
+            error = None
+        elif upstream_available('groq'):
+            explanation, error = yield from stream_completion('explanation', PROMPTS['explain'].render(code=code_output, target_language=user_language_code), use_cache)
+        else:
+            explanation, error = None, EXPLANATION_UNAVAILABLE
+        if error and upstream_available('groq'):
+            # Fallback to English explanation; clients discard explanation deltas received so far
+            yield sse_event('explanation_reset', {})
+            explanation, error = yield from stream_completion('explanation', PROMPTS['explain'].render(code=code_output, target_language="English"), use_cache)
+        if error:
+            if upstream_available('groq'):
+                explanation = "Unable to generate explanation due to an error."
+            else:
+                explanation = EXPLANATION_UNAVAILABLE
+                degraded.append('explanation')
+
+        add_to_history(user_email, {
+            'type': 'code',
+            'input': user_input,
+            'translatedPrompt': translated_prompt,
+            'codeOutput': code_output,
+            'explanation': explanation,
+            'languageCode': user_language_code
+        })
+        yield sse_event('done', with_degraded({
+            'translatedPrompt': translated_prompt,
+            'codeOutput': code_output,
+            'explanation': explanation
+        }, degraded))
+
+    return sse_response(events())
 
-# Run server
+# Streaming variant of /generate_app_plan
+@api.route('/generate_app_plan/stream', methods=['POST'])
+@token_required
+def generate_app_plan_stream(current_user):
+    data = request.json or {}
+    user_email = current_user['email']
+    user_input = data.get('user_input')
+    user_language_code = data.get('user_language_code')
+    use_cache = cache_allowed(data)
+
+    if not user_input or not user_language_code:
+        return jsonify({'error': 'Missing user_input or user_language_code'}), 400
+
+    def events():
+        degraded = []
+        with timed('translation'):
+            translated_prompt = translate_prompt(user_input, user_language_code, degraded, use_cache=use_cache) if user_language_code != 'en-US' else user_input
+        if translated_prompt == "Translation Failed!":
+            yield sse_event('error', {'error': 'Translation failed. Cannot generate app plan.'})
+            return
+        yield sse_event('translation', {'translatedPrompt': translated_prompt})
+
+        app_plan_output, error = yield from stream_completion('app_plan', PROMPTS['app_plan'].render(prompt=translated_prompt), use_cache)
+        if error:
+            yield sse_event('error', {'error': f'App plan generation failed: {error}'})
+            return
+
+        add_to_history(user_email, {
+            'type': 'app_plan',
+            'input': user_input,
+            'translatedPrompt': translated_prompt,
+            'appPlanOutput': app_plan_output,
+            'languageCode': user_language_code
+        })
+        yield sse_event('done', with_degraded({
+            'translatedPrompt': translated_prompt,
+            'appPlanOutput': app_plan_output
+        }, degraded))
+
+    return sse_response(events())
+
+# Streaming variant of /generate-code-from-plan
+@api.route('/generate-code-from-plan/stream', methods=['POST'])
+@token_required
+def generate_code_from_plan_stream(current_user):
+    data = request.json or {}
+    set_call_context(current_user['email'], PRIORITY_BATCH)
+    user_email = current_user['email']
+    app_plan_text = data.get('app_plan_text')
+    use_cache = cache_allowed(data)
+
+    if not app_plan_text:
+        return jsonify({'error': 'App plan text is required'}), 400
+
+    def events():
+        sectioned = plan_sections(app_plan_text, data.get('sectioned'))
+        if sectioned:
+            # Report each part as it finishes, then the stitched bundle
+            title, requests = sectioned
+            yield sse_event('parts', {'parts': [part for part, _ in requests]})
+            futures = submit_plan_sections(requests, use_cache=use_cache)
+            indexes = {future: index for index, future in enumerate(futures)}
+            for future in as_completed(futures):
+                index = indexes[future]
+                yield sse_event('part', {'index': index, 'part': requests[index][0], 'ok': future.result() is not None})
+            code_output, explanation, files = plan_bundle(title, requests, [future.result() for future in futures])
+            if files is None:
+                yield sse_event('error', {'error': f'Code generation failed: {code_output}'})
+                return
+        else:
+            code_output, error = yield from stream_completion('code', PROMPTS['code_from_plan'].render(app_plan_text=app_plan_text), use_cache)
+            if error:
+                yield sse_event('error', {'error': f'Code generation failed: {error}'})
+                return
+            explanation, files = "Code generated based on the provided app plan.", None
+
+        add_to_history(user_email, {
+            'type': 'code_from_plan',
+            'input': app_plan_text,
+            'codeOutput': code_output,
+            'explanation': explanation
+        })
+        yield sse_event('done', {'codeOutput': code_output} if files is None else {'codeOutput': code_output, 'files': files})
+
+    return sse_response(events())
+
+# Drop per-process resources inherited from a preforking master (sockets, pools,
+# SQLite connections); each is recreated lazily in the worker
+def reset_after_fork():
+    reset_upstream_clients()
+    reset_fanout_executor()
+    reset_translation_executor()
+    reset_password_executor()
+    # Fork the hashing processes before this worker starts any threads
+    start_password_executor()
+    storage.reset()
+    if history_store is not storage:
+        history_store.reset()
+    blob_store.reset()
+    jobs.reset()
+    if response_cache.disk is not None:
+        response_cache.disk.reset()
+    groq_scheduler.buckets.reset()
+    token_index.reset()
+    token_cache.clear()
+    user_cache.clear()
+    history_sink.reset()
+    if history_table is not None:
+        history_table.reset()
+
+# Application factory
+def create_app():
+    app = Flask(__name__)
+    # Allow CORS for frontend-backend communication
+    CORS(app, origins=['https://local-lang-codes-1.vercel.app', 'http://localhost:5173'])
+    app.config['SECRET_KEY'] = SECRET_KEY
+    app.register_blueprint(api)
+    return app
+
+app = create_app()
+
+# Run server (development only; use gunicorn.conf.py in production)
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5007, debug=True)
\ No newline at end of file
+    debug = os.environ.get('FLASK_DEBUG', '1') == '1'
+    # Fork the hashing processes before the server starts threads (in the reloader's child only)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_password_executor()
+    app.run(host="0.0.0.0", port=int(os.environ.get('PORT', 5007)), debug=debug)
\ No newline at end of file
@@ -0,0 +1,336 @@
+# ASGI entry point: the async serving mode. /process runs on the event loop with async
+# upstream calls (see async_upstream.py), so a request waiting on Sarvam or Groq holds no
+# worker thread and one process keeps as many in flight as its connection pools allow.
+# Every other route, and {"async": true} job submissions, go to the Flask app unchanged,
+# on a pool of GUNICORN_THREADS threads as in the threaded mode. Routes and JSON bodies
+# are the same in both modes.
+#
+# Needs aiohttp and uvicorn (pip install aiohttp uvicorn):
+#   gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+#   uvicorn asgi:app --port 5007          # development
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.test import EnvironBuilder
+
+import async_upstream
+from app import (app as flask_app, authenticate, add_to_history, build_website, cache_allowed, cached_code_with_explanation,
+                 split_code_reply, with_degraded, generation_error_status, start_password_executor, COMBINED_GENERATION,
+                 EXPLANATION_UNAVAILABLE, LANGUAGE_DETECTION)
+from metrics import timed, set_route, http_request_duration, combined_generations, log_payload
+from prompts import PROMPTS, SectionParseError
+from upstream import UpstreamError, upstream_available
+
+logger = logging.getLogger(__name__)
+
+# Routes served by Flask hold a thread for the whole request, as under gthread
+flask_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('GUNICORN_THREADS', 8)), thread_name_prefix='flask')
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+    elif scope['method'] == 'POST' and scope['path'] == '/process':
+        await process(scope, await read_body(receive), send)
+    else:
+        await to_flask(scope, await read_body(receive), send)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Fork the hashing processes before the loop's executor starts any threads
+            start_password_executor()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_upstream.close_clients()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def to_flask(scope, body, send):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(flask_executor, run_wsgi, loop, wsgi_environ(scope, body), send)
+
+
+# Run the Flask app for one request on a pool thread, passing the response to the event
+# loop as it is produced (streamed routes send each chunk as it comes)
+def run_wsgi(loop, environ, send):
+    def send_message(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    status_headers = []
+
+    def start_response(status, headers, exc_info=None):
+        status_headers[:] = [int(status.split(' ', 1)[0]),
+                             [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]]
+
+    def start():
+        status, headers = status_headers
+        send_message({'type': 'http.response.start', 'status': status, 'headers': headers})
+
+    result = flask_app(environ, start_response)
+    started = False
+    try:
+        for chunk in result:
+            if not chunk:
+                continue
+            if not started:
+                start()
+                started = True
+            send_message({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    if not started:
+        start()
+    send_message({'type': 'http.response.body', 'body': b''})
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def send_response(send, response):
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()]
+    })
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+# The WSGI environ for an ASGI request whose body has been read
+def wsgi_environ(scope, body):
+    client = scope.get('client') or ('', 0)
+    return EnvironBuilder(
+        path=scope['path'],
+        query_string=scope.get('query_string', b'').decode('latin-1'),
+        method=scope['method'],
+        headers=[(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']],
+        data=body,
+        environ_overrides={'REMOTE_ADDR': client[0], 'wsgi.url_scheme': scope.get('scheme', 'http')}
+    ).get_environ()
+
+
+# Main API Route. Authentication and the response (CORS, compression) go through the Flask
+# app's own code in a request context; the pipeline runs outside it, on the event loop.
+async def process(scope, body, send):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or data.get('async'):
+        await to_flask(scope, body, send)
+        return
+
+    started = time.perf_counter()
+    set_route('/process')
+    environ = wsgi_environ(scope, body)
+    with flask_app.request_context(environ):
+        current_user, error = authenticate()
+        use_cache = cache_allowed(data)
+    if error is None:
+        result, status = await run_process(current_user['email'], data, use_cache=use_cache)
+    with flask_app.request_context(environ):
+        response = flask_app.process_response(flask_app.make_response(error if error is not None else (result, status)))
+    await send_response(send, response)
+    http_request_duration.observe(time.perf_counter() - started, route='/process', method='POST', status=response.status_code)
+
+
+# Translate the user's prompt to English, falling back to the untranslated prompt while
+# Sarvam's circuit is open; returns "Translation Failed!" on other failures
+async def translate_prompt(user_input, user_language_code, degraded, use_cache=True):
+    logger.info(f"Translating text: {user_input[:100]}... from {user_language_code}")
+    try:
+        if LANGUAGE_DETECTION:
+            return await async_upstream.translate_detected(user_input, user_language_code, "en-IN", use_cache)
+        return await async_upstream.translate_text(user_input, user_language_code, "en-IN", use_cache)
+    except UpstreamError as e:
+        logger.error(f"Translation failed: {str(e)}")
+    if not upstream_available('sarvam'):
+        logger.warning("Sarvam circuit open; sending the prompt untranslated")
+        degraded.append('translation')
+        return user_input
+    return "Translation Failed!"
+
+
+async def generate_code(prompt, use_cache=True):
+    logger.info(f"Starting code generation for prompt: {prompt[:100]}...")
+    try:
+        code_output = await async_upstream.groq_complete(PROMPTS['code'].render(prompt=prompt), use_cache)
+        logger.info(f"Successfully generated code: {code_output[:100]}...")
+        return code_output
+    except UpstreamError as e:
+        logger.error(f"Code generation error: {str(e)}")
+        return f"Error: {str(e)}"
+
+
+async def explain_code(code, target_language, use_cache=True):
+    logger.info(f"Explaining code in {target_language}")
+    try:
+        return await async_upstream.groq_complete(PROMPTS['explain'].render(code=code, target_language=target_language), use_cache)
+    except UpstreamError as e:
+        logger.error(f"Explanation error: {str(e)}")
+        return f"Error: {str(e)}"
+
+
+# Same contract as app.generate_code_with_explanation
+async def generate_code_with_explanation(prompt, target_language, use_cache=True):
+    logger.info(f"Starting combined code generation for prompt: {prompt[:100]}...")
+    chat = PROMPTS['code_with_explanation'].render(prompt=prompt, target_language=target_language)
+    try:
+        reply = await async_upstream.groq_complete(chat, use_cache)
+    except UpstreamError as e:
+        logger.error(f"Combined code generation error: {str(e)}")
+        return f"Error: {str(e)}", None
+    try:
+        code_output, explanation = split_code_reply(reply)
+    except SectionParseError as e:
+        logger.warning(f"Combined code generation reply could not be parsed ({str(e)}); using separate calls")
+        combined_generations.inc(outcome='fallback')
+        return None, None
+    combined_generations.inc(outcome='parsed' if explanation else 'partial' if code_output else 'fallback')
+    return code_output, explanation
+
+
+# The /process pipeline of app.run_process on the event loop; returns (response body,
+# status code). When the explanation needs a call of its own, the native-language and
+# English attempts run side by side and the native one wins if it succeeds, so a failed
+# native attempt costs no extra round trip (an English call is made, and cached, either way).
+async def run_process(user_email, data, use_cache=True):
+    try:
+        log_payload(logger, f"Incoming Request Data for user {user_email}", data)
+
+        user_input = data.get('user_input')
+        user_language_code = data.get('user_language_code')
+        choice = data.get('choice')
+
+        if not user_input or not user_language_code or not choice:
+            logger.error(f"Missing required fields in process request from {user_email}")
+            return {'error': 'Missing required input fields'}, 400
+
+        logger.info(f"Processing request for user {user_email}: Lang='{user_language_code}', Choice='{choice}'")
+        degraded = []
+
+        with timed('translation'):
+            translated_prompt = await translate_prompt(user_input, user_language_code, degraded, use_cache=use_cache)
+
+        if translated_prompt == "Translation Failed!":
+            logger.error(f"Translation of input failed for user {user_email}")
+            return {
+                'error': 'Input translation failed. Please try again.',
+                'translatedPrompt': translated_prompt,
+                'codeOutput': None,
+                'explanation': None
+            }, 500
+
+        log_payload(logger, f"Translated Prompt for user {user_email}", translated_prompt)
+
+        if choice == 'code':
+            code_output = explanation = None
+            with timed('generation'):
+                if not upstream_available('groq'):
+                    code_output, explanation = cached_code_with_explanation(translated_prompt, user_language_code)
+                    if code_output is not None:
+                        logger.warning(f"Groq circuit open; serving cached code for user {user_email}")
+                        degraded.append('cached_code')
+                elif COMBINED_GENERATION:
+                    code_output, explanation = await generate_code_with_explanation(translated_prompt, user_language_code, use_cache=use_cache)
+                if code_output is None:
+                    code_output = await generate_code(translated_prompt, use_cache=use_cache)
+
+            if code_output.startswith("Error:"):
+                logger.error(f"Code generation failed for user {user_email}: {code_output}")
+                if not upstream_available('groq'):
+                    degraded.append('generation')
+                return with_degraded({
+                    'error': f'Code generation failed: {code_output}',
+                    'translatedPrompt': translated_prompt,
+                    'codeOutput': None,
+                    'explanation': None
+                }, degraded), generation_error_status()
+
+            logger.info(f"Code Output for user {user_email}: {code_output[:100]}...")
+
+            if explanation is None:
+                with timed('explanation'):
+                    if not upstream_available('groq'):
+                        explanation = f"Error: {EXPLANATION_UNAVAILABLE}"
+                    else:
+                        explanation = await async_upstream.first_success([
+                            explain_code(code_output, user_language_code, use_cache),
+                            explain_code(code_output, "English", use_cache)
+                        ], is_error=lambda result: result.startswith("Error:"))
+
+                if explanation.startswith("Error:"):
+                    if upstream_available('groq'):
+                        logger.warning(f"Explanation generation failed for user {user_email}: {explanation}")
+                        explanation = "Unable to generate explanation due to an error."
+                    else:
+                        logger.warning(f"Groq circuit open; skipping the explanation for user {user_email}")
+                        explanation = EXPLANATION_UNAVAILABLE
+                        degraded.append('explanation')
+
+            logger.info(f"Final Explanation for user {user_email}: {explanation[:100] if explanation else 'No explanation'}...")
+
+            add_to_history(user_email, {
+                'type': 'code',
+                'input': user_input,
+                'translatedPrompt': translated_prompt,
+                'codeOutput': code_output,
+                'explanation': explanation,
+                'languageCode': user_language_code
+            })
+
+            return with_degraded({
+                'translatedPrompt': translated_prompt,
+                'codeOutput': code_output,
+                'explanation': explanation
+            }, degraded), 200
+
+        elif choice == 'website':
+            # The boilerplate lead is translated once per language and then kept in memory;
+            # the first request for a language waits for it on the loop's executor
+            with timed('generation'):
+                website_html, explanation = await asyncio.to_thread(build_website, user_input, translated_prompt, user_language_code)
+
+            add_to_history(user_email, {
+                'type': 'website',
+                'input': user_input,
+                'translatedPrompt': translated_prompt,
+                'websiteHtml': website_html,
+                'explanation': explanation,
+                'languageCode': user_language_code
+            })
+
+            return with_degraded({
+                'translatedPrompt': translated_prompt,
+                'websiteHtml': website_html,
+                'explanation': explanation
+            }, degraded), 200
+
+        else:
+            logger.error(f"Invalid choice received for user {user_email}: {choice}")
+            return {'error': 'Invalid choice provided'}, 400
+
+    except Exception as e:
+        logger.error(f"Critical Process error for user {user_email}: {str(e)}", exc_info=True)
+        return {
+            'error': f'An internal server error occurred: {str(e)}'
+        }, 500
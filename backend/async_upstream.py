@@ -0,0 +1,240 @@
+# Async Sarvam and Groq calls for the ASGI serving mode (see asgi.py). Requests go out
+# over an aiohttp session, so a request waiting on an upstream holds no thread; circuit
+# breakers, retries, the response cache and the Groq rate limiter are the ones
+# upstream.py uses, so both serving modes share one view of each upstream.
+import asyncio
+import logging
+import os
+import time
+
+import aiohttp
+
+from cache import ResponseCache
+from detection import plan_translation
+from metrics import log_payload, translation_plans
+from translation import TRANSLATION_PARALLELISM, split_text, strip_piece, join_pieces, detected_pieces, join_detected
+from upstream import (BaseProviderClient, CircuitOpenError, UpstreamError, RETRY_STATUSES, SINGLE_FLIGHT_TIMEOUT,
+                      acquire_groq_slot, breakers, groq_scheduler, provider_config, response_cache)
+
+logger = logging.getLogger(__name__)
+
+# Connections per upstream; an event loop keeps many more requests in flight than a
+# thread pool, so this is well above UPSTREAM_POOL_MAXSIZE
+ASYNC_POOL_MAXSIZE = int(os.environ.get('UPSTREAM_ASYNC_POOL_MAXSIZE', 256))
+
+# Clients are bound to the event loop that created them; one set per serving process
+_clients = {}
+
+# Upstream calls in flight in this process, by cache key (the async single flight)
+_inflight = {}
+
+
+class AsyncProviderClient(BaseProviderClient):
+    def __init__(self, name, base_url, headers, breaker=None, pool_maxsize=ASYNC_POOL_MAXSIZE, **kwargs):
+        super().__init__(name, base_url, breaker, **kwargs)
+        connect_timeout, read_timeout = self.timeout
+        self.session = aiohttp.ClientSession(
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+            connector=aiohttp.TCPConnector(limit=pool_maxsize)
+        )
+
+    # Async counterpart of ProviderClient._send; acquire is a coroutine function. The
+    # response comes back with its body read and its connection back in the pool.
+    async def _send(self, path, payload, acquire=None):
+        url = f"{self.base_url}{path}"
+        body = {'data': payload} if isinstance(payload, bytes) else {'json': payload}
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            if self.breaker is not None and not self.breaker.allow():
+                raise CircuitOpenError(self.name)
+            if acquire is not None:
+                await acquire()
+            started = time.perf_counter()
+            try:
+                async with self.session.post(url, **body) as response:
+                    await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self._record(started, 'error', failed=True)
+                if last_attempt:
+                    raise UpstreamError(f"{self.name} request failed: {e}")
+                delay = self._backoff(attempt)
+                logger.warning(f"{self.name} request error ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            self._record(started, response.status, failed=response.status in RETRY_STATUSES)
+
+            if response.status in RETRY_STATUSES and not last_attempt:
+                delay = self._backoff(attempt, response)
+                logger.warning(f"{self.name} returned {response.status}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status != 200:
+                logger.error(f"{self.name} API Error {response.status}: {(await response.text())[:500]}")
+                raise UpstreamError(f"API returned status code {response.status}", response.status)
+            return response
+
+    async def post_json(self, path, payload, acquire=None):
+        response = await self._send(path, payload, acquire=acquire)
+        try:
+            return await response.json(content_type=None)
+        except ValueError:
+            raise UpstreamError(f"{self.name} returned a non-JSON response", response.status)
+
+    async def close(self):
+        await self.session.close()
+
+
+def get_client(name):
+    client = _clients.get(name)
+    if client is None:
+        display_name, base_url, headers = provider_config(name)
+        client = AsyncProviderClient(display_name, base_url, headers, breakers[name])
+        _clients[name] = client
+    return client
+
+
+async def close_clients():
+    for client in _clients.values():
+        await client.close()
+    _clients.clear()
+
+
+# Wait for a Groq rate limit slot. The scheduler is shared with the threaded mode and
+# blocks, so the wait runs on the loop's default executor (with this task's context,
+# which carries the user and priority).
+async def acquire_groq_slot_async(estimated_tokens):
+    if groq_scheduler.buckets.enabled:
+        await asyncio.to_thread(acquire_groq_slot, estimated_tokens)
+
+
+# Share one upstream call among concurrent identical requests, as upstream.coalesce does
+# for threads. The call runs as its own task, so it finishes for the followers even if
+# the request that started it goes away. While the upstream's circuit is open, a cached
+# result is served even if the caller asked to bypass the cache.
+async def coalesce(key, fetch):
+    try:
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            _inflight[key] = task
+            task.add_done_callback(lambda done: _fetch_done(key, done))
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), SINGLE_FLIGHT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise UpstreamError(f"Timed out after {SINGLE_FLIGHT_TIMEOUT}s waiting for an identical request")
+    except CircuitOpenError:
+        cached = response_cache.get(key)
+        if cached is None:
+            raise
+        logger.warning("Upstream circuit open; serving a cached response")
+        return cached
+
+
+def _fetch_done(key, task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # Retrieve the exception so a call whose callers all went away doesn't log it as unhandled
+    if not task.cancelled():
+        task.exception()
+
+
+# Translate text with Sarvam; returns the translated text or raises UpstreamError
+async def sarvam_translate(text, source_language_code, target_language_code, use_cache=True):
+    cache_key = ResponseCache.make_key('translate', text, source_language_code, target_language_code)
+    if use_cache:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    async def fetch():
+        response_json = await get_client('sarvam').post_json('/translate', {
+            "input": text,
+            "source_language_code": source_language_code,
+            "target_language_code": target_language_code
+        })
+        log_payload(logger, "Sarvam API Response", response_json)
+        if 'translated_text' not in response_json:
+            raise UpstreamError(f"Unexpected API response format: {response_json}")
+        response_cache.set(cache_key, response_json['translated_text'])
+        return response_json['translated_text']
+
+    return await coalesce(cache_key, fetch)
+
+
+# Run a prepared ChatRequest; returns the message content or raises UpstreamError
+async def groq_complete(chat, use_cache=True):
+    if use_cache:
+        cached = response_cache.get(chat.cache_key)
+        if cached is not None:
+            return cached
+
+    async def fetch():
+        response_json = await get_client('groq').post_json('/chat/completions', chat.body,
+                                                           acquire=lambda: acquire_groq_slot_async(chat.estimated_tokens))
+        log_payload(logger, "Groq API Response", response_json)
+        if 'error' in response_json:
+            raise UpstreamError(response_json['error'].get('message', 'Unknown error'))
+        if not response_json.get('choices'):
+            raise UpstreamError("Unexpected API response format")
+        content = response_json['choices'][0]['message']['content']
+        response_cache.set(chat.cache_key, content)
+        return content
+
+    return await coalesce(chat.cache_key, fetch)
+
+
+# Translate pieces concurrently, at most TRANSLATION_PARALLELISM in flight. Returns one
+# entry per piece: the translation or the UpstreamError raised for it.
+async def _translate_pieces(pieces, source_language_code, target_language_code, use_cache=True):
+    slots = asyncio.Semaphore(TRANSLATION_PARALLELISM)
+
+    async def translate_piece(piece):
+        leading, body, trailing = strip_piece(piece)
+        if not body:
+            return piece
+        async with slots:
+            try:
+                translated = await sarvam_translate(body, source_language_code, target_language_code, use_cache)
+            except UpstreamError as e:
+                return e
+        return f"{leading}{translated}{trailing}"
+
+    return await asyncio.gather(*(translate_piece(piece) for piece in pieces))
+
+
+# Translate text of any length; raises UpstreamError if any chunk fails
+async def translate_text(text, source_language_code, target_language_code, use_cache=True):
+    return join_pieces(await _translate_pieces(split_text(text), source_language_code, target_language_code, use_cache))
+
+
+# Async counterpart of translation.translate_detected
+async def translate_detected(text, source_language_code, target_language_code, use_cache=True):
+    plan = plan_translation(text, source_language_code)
+    translation_plans.inc(decision=plan.decision)
+    if plan.decision == 'skip':
+        return text
+    if plan.decision == 'full':
+        return await translate_text(text, plan.source_language, target_language_code, use_cache)
+
+    results = await _translate_pieces(detected_pieces(plan), plan.source_language, target_language_code, use_cache)
+    return join_detected(plan, results)
+
+
+# Start every call at once and return the first successful result in preference order,
+# cancelling the calls after it; as concurrency.first_success, but each call is a
+# coroutine. If every call fails, the last result is returned.
+async def first_success(calls, is_error):
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    result = None
+    try:
+        for task in tasks:
+            result = await task
+            if not is_error(result):
+                return result
+        return result
+    finally:
+        for task in tasks:
+            task.cancel()
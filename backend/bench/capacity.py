@@ -0,0 +1,74 @@
+# Concurrent-request capacity of one serving process: a single gunicorn worker runs
+# /process against a stub Groq with a fixed completion latency while the number of
+# concurrent clients rises. Under the threaded worker (wsgi.py), latency stays near the
+# upstream latency up to the worker's thread count (GUNICORN_THREADS); past it requests
+# queue for a thread, because each in-flight request holds one for its whole upstream
+# wait. Under the async worker (asgi.py) an in-flight request holds no thread, so
+# latency stays flat well past that.
+#
+# Usage (from backend/):
+#   python bench/capacity.py [--server gunicorn|asgi|both] [--threads 8] [--levels 4,8,16,32,64]
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loadtest import _free_port, _session, login, percentile, start_app
+from stubs import StubConfig, start_stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-request capacity of one worker process")
+    parser.add_argument('--server', choices=('gunicorn', 'asgi', 'both'), default='both',
+                        help="threaded worker, async worker, or one after the other")
+    parser.add_argument('--threads', type=int, default=8, help="GUNICORN_THREADS for the threaded worker")
+    parser.add_argument('--levels', default='4,8,16,32,64', help="comma-separated client concurrency levels")
+    parser.add_argument('--requests', type=int, default=4, help="requests per client at each level")
+    parser.add_argument('--latency', type=float, default=0.5, help="stub upstream latency in seconds")
+    args = parser.parse_args()
+
+    stub, _ = start_stub(StubConfig(latency=args.latency, jitter=args.latency / 20))
+    try:
+        for server in ('gunicorn', 'asgi') if args.server == 'both' else (args.server,):
+            run_server(server, stub, args)
+    finally:
+        stub.shutdown()
+
+
+def run_server(server, stub, args):
+    process, base_url = start_app(f"http://127.0.0.1:{stub.server_address[1]}", _free_port(), {
+        'WEB_CONCURRENCY': '1', 'GUNICORN_THREADS': str(args.threads), 'PASSWORD_HASH_TARGET_MS': '10'
+    }, server=server)
+
+    try:
+        headers = {'Authorization': f"Bearer {login(base_url)}"}
+        worker = f"{args.threads} threads" if server == 'gunicorn' else "async"
+        print(f"1 worker ({worker}), upstream latency {args.latency * 1000:.0f}ms")
+        for level in (int(value) for value in args.levels.split(',')):
+            latencies = []
+            lock = threading.Lock()
+
+            def client(index):
+                for step in range(args.requests):
+                    started = time.perf_counter()
+                    response = _session().post(f"{base_url}/process", headers=headers, json={
+                        'user_input': f"write a function that sorts list {server}-{level}-{index}-{step}",
+                        'user_language_code': 'en-IN', 'choice': 'code', 'no_cache': True
+                    })
+                    response.raise_for_status()
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as executor:
+                list(executor.map(client, range(level)))
+            elapsed = time.perf_counter() - started
+            latencies.sort()
+            print(f"clients {level:>3}  throughput {len(latencies) / elapsed:>6.1f} req/s  "
+                  f"p50 {percentile(latencies, 0.5) * 1000:>7.1f}ms  p95 {percentile(latencies, 0.95) * 1000:>7.1f}ms")
+    finally:
+        process.terminate()
+        process.wait(timeout=40)
+
+if __name__ == "__main__":
+    main()
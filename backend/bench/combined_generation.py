@@ -0,0 +1,56 @@
+# Combined vs two-call code generation for /process (choice=code): end-to-end latency,
+# Groq calls and token usage per request, with the app started once per mode against
+# the same stub. The stub charges token_interval per completion token so generation
+# time scales with reply length like a real model.
+#
+# Usage (from backend/):
+#   python bench/combined_generation.py
+#   python bench/combined_generation.py --malformed-rate 0.2   # some replies lack markers
+import argparse
+
+from loadtest import (_free_port, login, run_scenario, scenario_process_code, scenario_process_stream,
+                      start_app)
+from stubs import StubConfig, start_stub
+
+MODES = {'two-call': '0', 'combined': '1'}
+SCENARIOS = {'process_code': scenario_process_code, 'process_stream': scenario_process_stream}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare combined and two-call code generation")
+    parser.add_argument('--requests', type=int, default=40, help="requests per scenario and mode")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.2, help="stub time to first token in seconds")
+    parser.add_argument('--token-interval', type=float, default=0.0005, help="stub seconds per completion token")
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StubConfig(latency=args.latency, jitter=args.latency / 10, token_interval=args.token_interval,
+                        malformed_rate=args.malformed_rate)
+    stub, stub_stats = start_stub(config)
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    for mode, flag in MODES.items():
+        process, base_url = start_app(stub_url, _free_port(), {
+            'COMBINED_GENERATION': flag, 'PASSWORD_HASH_TARGET_MS': '10'
+        })
+        try:
+            headers = {'Authorization': f"Bearer {login(base_url)}"}
+            for name, fn in SCENARIOS.items():
+                calls_before = stub_stats.snapshot().get('/chat/completions', 0)
+                tokens_before = stub_stats.token_snapshot()
+                result = run_scenario(fn, base_url, headers, args.requests, args.concurrency)
+                calls = stub_stats.snapshot().get('/chat/completions', 0) - calls_before
+                tokens = {key: value - tokens_before[key] for key, value in stub_stats.token_snapshot().items()}
+                print(f"{mode:<9} {name:<15} p50 {result['p50_ms']:>8.1f}ms  p95 {result['p95_ms']:>8.1f}ms  "
+                      f"errors {result['errors']}  groq calls/req {calls / args.requests:.2f}  "
+                      f"prompt tokens/req {tokens['prompt'] / args.requests:>6.0f}  "
+                      f"completion tokens/req {tokens['completion'] / args.requests:>6.0f}")
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
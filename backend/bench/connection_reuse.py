@@ -0,0 +1,80 @@
+# Connection reuse against the stub Sarvam: p50/p95 latency and connections opened for
+# a bare requests.post per call (the old helpers) and for the pooled ProviderClient.
+# The stub charges --handshake per new connection, standing in for the TCP + TLS round
+# trips to a remote host that a reused connection skips. Exits non-zero if the pooled
+# client's p50 is not lower.
+#
+# Usage (from backend/):
+#   python bench/connection_reuse.py [--calls 200] [--concurrency 8] [--handshake 0.03]
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loadtest import percentile
+from stubs import StubConfig, start_stub
+
+PAYLOAD = {'input': "ஒரு நிரல் எழுது", 'source_language_code': 'ta-IN', 'target_language_code': 'en-IN'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call connections with the pooled upstream client")
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.02, help="stub processing time in seconds")
+    parser.add_argument('--handshake', type=float, default=0.03, help="stub setup time per new connection in seconds")
+    args = parser.parse_args()
+
+    # upstream.py opens its rate-limit database in the working directory
+    os.chdir(tempfile.mkdtemp(prefix='llc-pool-'))
+    from upstream import ProviderClient
+
+    stub, stub_stats = start_stub(StubConfig(latency=args.latency, jitter=args.latency / 10,
+                                             handshake_latency=args.handshake))
+    base_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    pooled = ProviderClient('Sarvam', base_url, {'Content-Type': 'application/json'})
+
+    def fresh_call():
+        response = requests.post(f"{base_url}/translate", json=PAYLOAD, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def pooled_call():
+        return pooled.post_json('/translate', PAYLOAD)
+
+    p50s = {}
+    for name, call in (('fresh', fresh_call), ('pooled', pooled_call)):
+        latencies = []
+        lock = threading.Lock()
+
+        def one(_):
+            started = time.perf_counter()
+            call()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+        connections_before = stub_stats.connections
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(one, range(args.calls)))
+        latencies.sort()
+        p50s[name] = percentile(latencies, 0.5)
+        print(f"{name:<7} p50 {p50s[name] * 1000:>7.1f}ms  p95 {percentile(latencies, 0.95) * 1000:>7.1f}ms  "
+              f"connections {stub_stats.connections - connections_before}/{args.calls} calls")
+
+    pooled.close()
+    stub.shutdown()
+    if p50s['pooled'] >= p50s['fresh']:
+        print("FAIL: the pooled client was not faster")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# History append and read latency as the total history on disk grows: the per-user
+# sharded log (HISTORY_BACKEND=log) against the legacy whole-file JSON history. Entries
+# are appended round-robin over enough users to reach --max-mb; latency is sampled at
+# each checkpoint on random users. JSON is only sampled up to --json-max-mb, since
+# each of its appends rewrites the whole file.
+#
+# Usage (from backend/):
+#   python bench/history_growth.py [--checkpoints 10,100,1000] [--entry-kb 8]
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import HISTORY_LIMIT, JSONStorage, ShardedLogHistory
+
+# Entries kept per user between compactions average about twice the cap
+ENTRIES_PER_USER = HISTORY_LIMIT * 2
+
+
+def make_entry(index, entry_bytes):
+    return {'type': 'code', 'input': f"sort a list of numbers {index}", 'codeOutput': 'x' * entry_bytes,
+            'languageCode': 'en-IN', 'timestamp': '2025-07-18T15:38:20'}
+
+
+def tree_bytes(root):
+    total = 0
+    for directory, _, files in os.walk(root):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total
+
+
+# Median seconds of fn(email) over `ops` random users
+def median_op(fn, users, ops):
+    timings = []
+    for _ in range(ops):
+        email = f"user{random.randrange(users)}@example.com"
+        started = time.perf_counter()
+        fn(email)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History latency as the stored history grows")
+    parser.add_argument('--checkpoints', default='10,100,1000', help="comma-separated total sizes in MB")
+    parser.add_argument('--entry-kb', type=int, default=8, help="size of each generated output in KB")
+    parser.add_argument('--json-max-mb', type=int, default=50, help="largest size to sample the JSON store at")
+    parser.add_argument('--ops', type=int, default=200, help="operations timed per measurement")
+    args = parser.parse_args()
+
+    checkpoints = [int(value) for value in args.checkpoints.split(',')]
+    entry_bytes = args.entry_kb * 1024
+    users = max(1, checkpoints[-1] * 1024 * 1024 // (entry_bytes * ENTRIES_PER_USER))
+    workdir = Path(tempfile.mkdtemp(prefix='llc-history-'))
+    log = ShardedLogHistory(workdir / 'history_log')
+    legacy = JSONStorage(workdir / 'users.json', workdir / 'generation_history.json')
+    sample = make_entry(0, entry_bytes)
+
+    print(f"{users} users, {args.entry_kb}KB entries")
+    print(f"{'store':<6}{'size':>9}  {'append':>10}  {'get_history':>11}")
+    appended = 0
+    started = time.perf_counter()
+    try:
+        for target_mb in checkpoints:
+            while tree_bytes(log.root_dir) < target_mb * 1024 * 1024:
+                # Fill in rounds so every user's shard grows (and compacts) evenly
+                for index in range(users):
+                    log.append_history(f"user{index}@example.com", make_entry(appended, entry_bytes))
+                    appended += 1
+            size_mb = tree_bytes(log.root_dir) / 1024 / 1024
+            append = median_op(lambda email: log.append_history(email, sample), users, args.ops)
+            read = median_op(log.get_history, users, args.ops)
+            print(f"{'log':<6}{size_mb:>7.0f}MB  {append * 1000:>8.3f}ms  {read * 1000:>9.3f}ms")
+
+            if target_mb <= args.json_max_mb:
+                legacy._write(legacy.history_file, log.load_history())
+                size_mb = legacy.history_file.stat().st_size / 1024 / 1024
+                ops = max(5, args.ops // 20)
+                append = median_op(lambda email: legacy.append_history(email, sample), users, ops)
+                read = median_op(legacy.get_history, users, ops)
+                print(f"{'json':<6}{size_mb:>7.0f}MB  {append * 1000:>8.3f}ms  {read * 1000:>9.3f}ms")
+        print(f"filled with {appended} appends in {time.perf_counter() - started:.0f}s")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# History persistence in the request vs behind it: /process latency and the time the
+# request spends in the history_write stage, with HISTORY_WRITE_BEHIND off and on. Each
+# run then stops the app and checks that every entry reached the generation_history
+# stand-in table (SQLite), i.e. that shutdown drains the queue. The drain runs use a
+# flush interval longer than the run, so nothing is written before shutdown. Finally the
+# stand-in's user_id foreign key is checked: rows of accounts without an auth user are
+# skipped, and a row with an unknown user_id is rejected.
+#
+# Usage (from backend/):
+#   python bench/history_sink.py [--requests 200] [--server gunicorn]
+import argparse
+import re
+import shutil
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from historysink import GENERATION_HISTORY_COLUMNS, SQLiteHistoryTable
+from loadtest import _free_port, _session, login, percentile, start_app
+from stubs import StubConfig, start_stub
+
+MODES = [
+    ('inline', {'HISTORY_WRITE_BEHIND': '0'}),
+    ('behind', {'HISTORY_WRITE_BEHIND': '1'}),
+    ('drain', {'HISTORY_WRITE_BEHIND': '1', 'HISTORY_FLUSH_INTERVAL': '3600', 'HISTORY_FLUSH_SIZE': '100000'}),
+]
+
+
+def stage_mean(metrics_text, stage):
+    labels = f'route="/process",stage="{stage}"'
+    total = re.search(rf'stage_duration_seconds_sum\{{{labels}\}} ([\d.]+)', metrics_text)
+    count = re.search(rf'stage_duration_seconds_count\{{{labels}\}} (\d+)', metrics_text)
+    if not total or not count or not int(count.group(1)):
+        return 0.0
+    return float(total.group(1)) / int(count.group(1))
+
+
+# Rows of a registered and an unregistered account, then one with a made-up user_id
+def check_foreign_key():
+    workdir = Path(tempfile.mkdtemp(prefix='llc-history-'))
+    table = SQLiteHistoryTable(workdir / 'generation_history.db')
+    table.register_user('known@example.com')
+    table.insert_many([
+        (f"row{index}", email, 'code', 'sort a list', 'print(1)', None, None, 'en-IN', '2025-07-18T15:38:20+00:00')
+        for index, email in enumerate(('known@example.com', 'Known@Example.com', 'unknown@example.com'))
+    ])
+    try:
+        table._db.connect().execute(
+            f"INSERT INTO generation_history ({', '.join(GENERATION_HISTORY_COLUMNS)}) "
+            f"VALUES ('row9', 'not-a-user', 'code', 'x', NULL, NULL, NULL, NULL, NULL)"
+        )
+        rejected = False
+    except sqlite3.IntegrityError:
+        rejected = True
+    print(f"foreign key: rows written {table.count()}/3 (expected 2), skipped without an auth user {table.unlinked} "
+          f"(expected 1), unknown user_id rejected {rejected}")
+    shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline vs write-behind history persistence")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.05, help="stub latency in seconds")
+    parser.add_argument('--server', choices=('dev', 'gunicorn'), default='dev')
+    args = parser.parse_args()
+
+    stub, _ = start_stub(StubConfig(latency=args.latency, jitter=args.latency / 10))
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    for mode, env in MODES:
+        db_file = Path(tempfile.mkdtemp(prefix='llc-history-')) / 'generation_history.db'
+        process, base_url = start_app(stub_url, _free_port(), dict(env, HISTORY_SINK='sqlite', HISTORY_SINK_DB_FILE=str(db_file),
+                                                                    PASSWORD_HASH_TARGET_MS='10'), server=args.server)
+        latencies = []
+        lock = threading.Lock()
+
+        def one(index):
+            started = time.perf_counter()
+            response = _session().post(f"{base_url}/process", headers=headers, json={
+                'user_input': f"write a function that sorts list {index}", 'user_language_code': 'en-IN',
+                'choice': 'code', 'no_cache': True
+            })
+            response.raise_for_status()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+        try:
+            headers = {'Authorization': f"Bearer {login(base_url)}"}
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                list(executor.map(one, range(args.requests)))
+            # One-off connections, so no idle keep-alive holds up gunicorn's graceful shutdown
+            history_write = stage_mean(requests.get(f"{base_url}/metrics").text, 'history_write')
+            history = requests.get(f"{base_url}/history", headers=headers).json()['history']
+        finally:
+            # SIGINT lets the dev server exit through atexit; gunicorn drains in worker_exit on SIGTERM
+            process.send_signal(signal.SIGINT if args.server == 'dev' else signal.SIGTERM)
+            process.wait(timeout=30)
+        rows = SQLiteHistoryTable(db_file).count()
+        latencies.sort()
+        print(f"{mode:<7} p50 {percentile(latencies, 0.5) * 1000:>7.1f}ms  p95 {percentile(latencies, 0.95) * 1000:>7.1f}ms  "
+              f"history_write {history_write * 1000:>6.3f}ms  /history {len(history):>2}  "
+              f"rows after shutdown {rows}/{args.requests}")
+        shutil.rmtree(db_file.parent)
+    stub.shutdown()
+    check_foreign_key()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Background jobs under a burst of submissions: many users submit async
+# /generate-code-from-plan jobs at once. Reports submit latency, how many submissions
+# past JOB_PER_USER_LIMIT were refused with 429, and job throughput against the
+# JOB_WORKERS pool. While the pool is still busy, one more user queues two jobs,
+# cancels the queued one (200), then tries to cancel the running one (409).
+#
+# Usage (from backend/):
+#   python bench/job_burst.py [--users 20] [--workers 4] [--latency 0.3]
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from loadtest import _free_port, _session, percentile, start_app
+from stubs import StubConfig, start_stub
+
+TERMINAL = ('succeeded', 'failed', 'cancelled')
+
+
+def sign_in(base_url, email):
+    requests.post(f"{base_url}/signup", json={'name': 'Burst', 'email': email, 'password': 'burst-password'})
+    response = requests.post(f"{base_url}/login", json={'email': email, 'password': 'burst-password'})
+    response.raise_for_status()
+    return {'Authorization': f"Bearer {response.json()['token']}"}
+
+
+def submit(base_url, headers, index):
+    return _session().post(f"{base_url}/generate-code-from-plan", headers=headers, json={
+        'app_plan_text': f"A todo app {index} with tasks, reminders and a Flask API", 'async': True, 'no_cache': True
+    })
+
+
+def job_status(base_url, headers, job_id):
+    return _session().get(f"{base_url}/jobs/{job_id}", headers=headers).json()['job']['status']
+
+
+def wait_for(base_url, headers, job_id, statuses, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = job_status(base_url, headers, job_id)
+        if status in statuses:
+            return status
+        time.sleep(0.02)
+    raise RuntimeError(f"Job {job_id} did not reach {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Job throughput, limits and cancellation under a submission burst")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--per-user', type=int, default=3, help="submissions per user (the limit is 2)")
+    parser.add_argument('--workers', type=int, default=4, help="JOB_WORKERS for the app")
+    parser.add_argument('--latency', type=float, default=0.3, help="stub Groq latency in seconds")
+    args = parser.parse_args()
+
+    stub, _ = start_stub(StubConfig(latency=args.latency, jitter=args.latency / 20))
+    process, base_url = start_app(f"http://127.0.0.1:{stub.server_address[1]}", _free_port(), {
+        'JOB_WORKERS': str(args.workers), 'JOB_PER_USER_LIMIT': '2', 'PASSWORD_HASH_TARGET_MS': '10',
+        'PLAN_SECTIONED_GENERATION': '0'
+    })
+    try:
+        users = [sign_in(base_url, f"burst{index}@example.com") for index in range(args.users)]
+        canceller = sign_in(base_url, 'canceller@example.com')
+
+        submit_latencies = []
+        accepted = []
+        refused = 0
+        lock = threading.Lock()
+
+        def one(index):
+            nonlocal refused
+            headers = users[index % args.users]
+            started = time.perf_counter()
+            response = submit(base_url, headers, index)
+            with lock:
+                submit_latencies.append(time.perf_counter() - started)
+                if response.status_code == 202:
+                    accepted.append((headers, response.json()['jobId']))
+                elif response.status_code == 429:
+                    refused += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            list(executor.map(one, range(args.users * args.per_user)))
+
+        # The pool is busy with the burst, so both of these jobs start out queued
+        first = submit(base_url, canceller, 'cancel-1').json()['jobId']
+        second = submit(base_url, canceller, 'cancel-2').json()['jobId']
+        queued_cancel = _session().delete(f"{base_url}/jobs/{second}", headers=canceller).status_code
+        wait_for(base_url, canceller, first, ('running',) + TERMINAL)
+        running_cancel = _session().delete(f"{base_url}/jobs/{first}", headers=canceller).status_code
+
+        statuses = [wait_for(base_url, headers, job_id, TERMINAL) for headers, job_id in accepted]
+        elapsed = time.perf_counter() - started
+        wait_for(base_url, canceller, first, TERMINAL)
+        submit_latencies.sort()
+        print(f"submissions {len(submit_latencies)}: accepted {len(accepted)}, refused with 429 {refused} "
+              f"(expected {args.users * max(0, args.per_user - 2)})")
+        print(f"submit p50 {percentile(submit_latencies, 0.5) * 1000:.1f}ms  p95 {percentile(submit_latencies, 0.95) * 1000:.1f}ms")
+        print(f"jobs succeeded {statuses.count('succeeded')}/{len(statuses)} in {elapsed:.2f}s: "
+              f"{len(statuses) / elapsed:.1f} jobs/s with {args.workers} workers "
+              f"(ceiling {args.workers / args.latency:.1f}/s)")
+        print(f"cancel queued job -> {queued_cancel} (expected 200), cancel running job -> {running_cancel} (expected 409)")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Local language detection on a labeled corpus of prompts: decision accuracy, Sarvam
+# calls saved, detection cost, and translation latency against the stub Sarvam with and
+# without detection.
+#
+# Usage (from backend/):
+#   python bench/language_detection.py [--latency 0.15] [--verbose]
+import argparse
+import os
+import sys
+import time
+import timeit
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from stubs import StubConfig, start_stub
+
+# (prompt, client language code, expected decision)
+CORPUS = [
+    # English, as typed by users who picked an Indic language in the UI
+    ("write a program that reverses a linked list", 'ta-IN', 'skip'),
+    ("Create a snake game in pygame", 'hi-IN', 'skip'),
+    ("Build a REST API for a library management system", 'kn-IN', 'skip'),
+    ("make a responsive landing page for a bakery", 'te-IN', 'skip'),
+    ("How do I connect to a PostgreSQL database in Python?", 'ml-IN', 'skip'),
+    ("generate fibonacci numbers up to n using recursion", 'bn-IN', 'skip'),
+    ("A weather dashboard that shows temperature and humidity for five cities", 'mr-IN', 'skip'),
+    ("explain binary search with an example", 'gu-IN', 'skip'),
+    ("Write unit tests for a function that validates email addresses", 'pa-IN', 'skip'),
+    ("portfolio website with dark mode and a contact form", 'od-IN', 'skip'),
+    ("count vowels in a sentence", 'ta-IN', 'skip'),
+    ("Implement a stack using two queues", 'hi-IN', 'skip'),
+    ("todo app with login and reminders", 'ta-IN', 'skip'),
+    ("scrape product prices from an e-commerce site and store them in sqlite", 'te-IN', 'skip'),
+    # English with code
+    ("fix `df.groupby('city').mean()` so it ignores missing values", 'hi-IN', 'skip'),
+    ("why does my_list.append(x) return None", 'ta-IN', 'skip'),
+    ("convert this to async: requests.get(url).json()", 'kn-IN', 'skip'),
+    ("use useEffect to fetch data when the page loads", 'ml-IN', 'skip'),
+    ("```python\nfor i in range(10):\n    print(i)\n```\nmake this print only even numbers", 'bn-IN', 'skip'),
+    ("Hello world in Java", 'en-US', 'skip'),
+    # Native script
+    ("எண்களை வரிசைப்படுத்தும் நிரல் எழுதுக", 'ta-IN', 'full'),
+    ("ஒரு உணவகத்திற்கான இணையதளம் உருவாக்கு", 'ta-IN', 'full'),
+    ("संख्याओं को क्रमबद्ध करने वाला प्रोग्राम लिखें", 'hi-IN', 'full'),
+    ("एक कैलकुलेटर ऐप बनाओ", 'hi-IN', 'full'),
+    ("సంఖ్యలను క్రమబద్ధీకరించే ప్రోగ్రామ్ రాయండి", 'te-IN', 'full'),
+    ("ಸಂಖ್ಯೆಗಳನ್ನು ವಿಂಗಡಿಸುವ ಪ್ರೋಗ್ರಾಂ ಬರೆಯಿರಿ", 'kn-IN', 'full'),
+    ("സംഖ്യകൾ ക്രമീകരിക്കുന്ന ഒരു പ്രോഗ്രാം എഴുതുക", 'ml-IN', 'full'),
+    ("সংখ্যা সাজানোর একটি প্রোগ্রাম লিখুন", 'bn-IN', 'full'),
+    ("સંખ્યાઓને ગોઠવતો પ્રોગ્રામ લખો", 'gu-IN', 'full'),
+    ("ਨੰਬਰਾਂ ਨੂੰ ਕ੍ਰਮਬੱਧ ਕਰਨ ਵਾਲਾ ਪ੍ਰੋਗਰਾਮ ਲਿਖੋ", 'pa-IN', 'full'),
+    ("ସଂଖ୍ୟା ସଜାଇବା ପାଇଁ ଏକ ପ୍ରୋଗ୍ରାମ ଲେଖ", 'od-IN', 'full'),
+    ("संख्या क्रमाने लावणारा प्रोग्राम लिहा", 'mr-IN', 'full'),
+    # Native script with a few English loanwords
+    ("Python இல் ஒரு sorting program எழுது", 'ta-IN', 'full'),
+    ("मुझे एक calculator app चाहिए", 'hi-IN', 'full'),
+    ("ఒక chat app తయారు చేయండి", 'te-IN', 'full'),
+    ("ಒಂದು login page ಮಾಡಿ", 'kn-IN', 'full'),
+    # Romanized Indic
+    ("mujhe ek calculator banana hai", 'hi-IN', 'full'),
+    ("ek snake game banao jisme score dikhe", 'hi-IN', 'full'),
+    ("enakku oru calculator venum", 'ta-IN', 'full'),
+    ("oru todo app seiyungal", 'ta-IN', 'full'),
+    ("naaku oka chat app kavali", 'te-IN', 'full'),
+    ("amar jonno ekta quiz app banao", 'bn-IN', 'full'),
+    ("yeh code kaam nahi kar raha hai", 'hi-IN', 'full'),
+    # Mixed: code or long English runs stay, Indic spans are translated
+    ("`list.sort()` பயன்படுத்தி எண்களை வரிசைப்படுத்து", 'ta-IN', 'partial'),
+    ("Create a Flask app with a /users endpoint that returns JSON. பயனர் பெயர்களை தமிழில் காட்டவும்", 'ta-IN', 'partial'),
+    ("requests.get() का उपयोग करके वेबसाइट से डेटा लाओ", 'hi-IN', 'partial'),
+    ("इस कोड को ठीक करो:\n```python\nprint('hello'\n```", 'hi-IN', 'partial'),
+    ("my_function ஏன் None திருப்புகிறது", 'ta-IN', 'partial'),
+    ("Build a React dashboard with charts and filters. ఇది మొబైల్‌లో కూడా పనిచేయాలి", 'te-IN', 'partial'),
+    # Script contradicts the client's language code
+    ("संख्याओं को जोड़ने वाला प्रोग्राम", 'ta-IN', 'full'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and savings of local language detection")
+    parser.add_argument('--latency', type=float, default=0.15, help="stub Sarvam latency in seconds")
+    parser.add_argument('--verbose', action='store_true', help="print every misclassified prompt")
+    args = parser.parse_args()
+
+    stub, stub_stats = start_stub(StubConfig(latency=args.latency, jitter=args.latency / 10))
+    os.environ['SARVAM_BASE_URL'] = f"http://127.0.0.1:{stub.server_address[1]}"
+    from detection import plan_translation
+    from translation import split_text, translate_detected, translate_text
+
+    correct = 0
+    confusion = Counter()
+    calls_always = calls_detected = 0
+    for text, language_code, expected in CORPUS:
+        plan = plan_translation(text, language_code)
+        confusion[(expected, plan.decision)] += 1
+        if plan.decision == expected:
+            correct += 1
+        elif args.verbose:
+            print(f"  expected {expected:<7} got {plan.decision:<7} {language_code} {text[:70]!r}")
+        calls_always += len(split_text(text))
+        calls_detected += sum(len(split_text(span)) for span in plan.spans)
+
+    print(f"accuracy {correct}/{len(CORPUS)} ({correct / len(CORPUS):.0%})")
+    for (expected, got), count in sorted(confusion.items()):
+        print(f"  expected {expected:<7} -> {got:<7} {count}")
+    print(f"Sarvam calls: always {calls_always}, with detection {calls_detected} "
+          f"({1 - calls_detected / calls_always:.0%} saved)")
+
+    number = 200
+    seconds = timeit.timeit(lambda: [plan_translation(text, code) for text, code, _ in CORPUS], number=number)
+    print(f"detection cost {seconds / number / len(CORPUS) * 1e6:.1f}us per prompt")
+
+    for name, fn in (('always', translate_text), ('detected', translate_detected)):
+        calls_before = stub_stats.snapshot().get('/translate', 0)
+        started = time.perf_counter()
+        for text, language_code, _ in CORPUS:
+            fn(text, language_code, 'en-IN', use_cache=False)
+        elapsed = time.perf_counter() - started
+        calls = stub_stats.snapshot().get('/translate', 0) - calls_before
+        print(f"translate {name:<9} {elapsed / len(CORPUS) * 1000:>7.1f}ms per prompt  stub calls {calls}")
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
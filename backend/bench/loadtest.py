@@ -0,0 +1,314 @@
+# Load test: runs the app against stub upstreams and drives each route at a fixed concurrency.
+#
+# Usage (from backend/):
+#   python bench/loadtest.py                      # run and print results
+#   python bench/loadtest.py --save-baseline      # store results in bench/baseline.json
+#   python bench/loadtest.py --compare            # fail if results regress against the baseline
+#   python bench/loadtest.py --app-url http://127.0.0.1:5007   # drive an already running app
+#   python bench/loadtest.py --server gunicorn    # run under gunicorn.conf.py instead of the dev server
+#   python bench/loadtest.py --server asgi        # gunicorn with uvicorn workers serving asgi.py
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from stubs import StubConfig, start_stub
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).resolve().parent / 'baseline.json'
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_PASSWORD = 'bench-password'
+
+_local = threading.local()
+
+
+def _session():
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Start the app in a subprocess pointed at the stubs, with its data files in a temp dir.
+# server is 'dev' (Flask's built-in server), 'gunicorn' (gunicorn.conf.py) or 'asgi'
+# (gunicorn.conf.py with uvicorn workers serving asgi.py, the async mode); backend_dir
+# can point at another checkout (e.g. a git worktree of the previous commit) to compare.
+def start_app(stub_url, port, extra_env=None, server='dev', backend_dir=BACKEND_DIR):
+    workdir = tempfile.mkdtemp(prefix='llc-bench-')
+    env = dict(os.environ)
+    env.update({
+        'SARVAM_BASE_URL': stub_url,
+        'GROQ_BASE_URL': stub_url,
+        'PORT': str(port),
+        'FLASK_DEBUG': '0',
+        'LOG_PAYLOADS': 'off',
+        'GROQ_RPM_LIMIT': '0',
+        'GROQ_TPM_LIMIT': '0'
+    })
+    env.update(extra_env or {})
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', str(Path(backend_dir) / 'gunicorn.conf.py'),
+                   '--pythonpath', str(backend_dir), 'wsgi:app']
+    elif server == 'asgi':
+        command = [sys.executable, '-m', 'gunicorn', '-c', str(Path(backend_dir) / 'gunicorn.conf.py'),
+                   '--pythonpath', str(backend_dir), '-k', 'uvicorn.workers.UvicornWorker', 'asgi:app']
+    else:
+        command = [sys.executable, str(Path(backend_dir) / 'app.py')]
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base_url}/metrics", timeout=1)
+            print(f"App ({server}) ready in {time.perf_counter() - started:.2f}s")
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("App did not start within 30 seconds")
+
+
+def login(base_url):
+    requests.post(f"{base_url}/signup", json={'name': 'Bench', 'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+    response = requests.post(f"{base_url}/login", json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()['token']
+
+
+# Bytes on the wire: Content-Length is the compressed size when the app compressed the body
+def _result(response):
+    return response.status_code, int(response.headers.get('Content-Length', len(response.content)))
+
+
+# CPU seconds used so far by a process and its direct children (Linux /proc only)
+def cpu_seconds(pid):
+    ticks = 0
+    for stat_path in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            fields = stat_path.read_text().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        # fields[1] is the parent pid; fields[11] and fields[12] are utime and stime
+        if stat_path.parent.name == str(pid) or fields[1] == str(pid):
+            ticks += int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+# Scenarios: each takes (base_url, headers, index) and returns (HTTP status code, response bytes).
+# Prompts include the index so every request misses the response cache.
+def scenario_login(base_url, headers, index):
+    return _result(_session().post(f"{base_url}/login", json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}))
+
+
+def scenario_process_code(base_url, headers, index):
+    return _result(_session().post(f"{base_url}/process", headers=headers, json={
+        'user_input': f"வரிசையை வரிசைப்படுத்தும் நிரல் {index}", 'user_language_code': 'ta-IN', 'choice': 'code'
+    }))
+
+
+def scenario_process_website(base_url, headers, index):
+    return _result(_session().post(f"{base_url}/process", headers=headers, json={
+        'user_input': f"ஒரு உணவகத்திற்கான இணையதளம் {index}", 'user_language_code': 'ta-IN', 'choice': 'website'
+    }))
+
+
+def scenario_process_stream(base_url, headers, index):
+    response = _session().post(f"{base_url}/process/stream", headers=headers, stream=True, json={
+        'user_input': f"எண்களைக் கூட்டும் நிரல் {index}", 'user_language_code': 'ta-IN', 'choice': 'code'
+    })
+    size = 0
+    for chunk in response.iter_content(chunk_size=None):
+        size += len(chunk)
+    return response.status_code, size
+
+
+def scenario_app_plan(base_url, headers, index):
+    return _result(_session().post(f"{base_url}/generate_app_plan", headers=headers, json={
+        'user_input': f"A todo app with reminders {index}", 'user_language_code': 'en-US'
+    }))
+
+
+def scenario_code_from_plan(base_url, headers, index):
+    plan = f"# Todo App {index}\n## Features\n- Add tasks\n- Reminders\n## Architecture\n- Flask API\n- React UI\n"
+    return _result(_session().post(f"{base_url}/generate-code-from-plan", headers=headers, json={'app_plan_text': plan}))
+
+
+# Each thread rotates its own refresh token chain; the first call logs in to start one
+def scenario_refresh(base_url, headers, index):
+    session = _session()
+    refresh_token = getattr(_local, 'refresh_token', None)
+    if refresh_token is None:
+        response = session.post(f"{base_url}/login", json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+        refresh_token = response.json()['refresh_token']
+    response = session.post(f"{base_url}/refresh-token", json={'refresh_token': refresh_token})
+    if response.status_code == 200:
+        _local.refresh_token = response.json()['refresh_token']
+    return _result(response)
+
+
+def scenario_history(base_url, headers, index):
+    return _result(_session().get(f"{base_url}/history", headers=headers))
+
+
+SCENARIOS = {
+    'login': scenario_login,
+    'process_code': scenario_process_code,
+    'process_website': scenario_process_website,
+    'process_stream': scenario_process_stream,
+    'app_plan': scenario_app_plan,
+    'code_from_plan': scenario_code_from_plan,
+    'history': scenario_history,
+    'refresh': scenario_refresh
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(fn, base_url, headers, total, concurrency, pid=None):
+    latencies = []
+    sizes = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(index):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            status, size = fn(base_url, headers, index)
+        except requests.RequestException:
+            status, size = None, 0
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            sizes.append(size)
+            if status is None or status >= 400:
+                errors += 1
+
+    cpu_before = cpu_seconds(pid) if pid else None
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    wall = time.perf_counter() - started
+    cpu_ms = round((cpu_seconds(pid) - cpu_before) * 1000 / total, 2) if pid else None
+
+    latencies.sort()
+    return {
+        'requests': total,
+        'errors': errors,
+        'throughput': round(total / wall, 2),
+        'avg_bytes': round(sum(sizes) / len(sizes)) if sizes else 0,
+        'cpu_ms': cpu_ms,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2)
+    }
+
+
+# Compare against the stored baseline; returns a list of regression messages
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if result['p95_ms'] > reference['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']}ms vs baseline {reference['p95_ms']}ms")
+        if result['throughput'] < reference['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput']}/s vs baseline {reference['throughput']}/s")
+        if result['errors'] > reference['errors']:
+            regressions.append(f"{name}: {result['errors']} errors vs baseline {reference['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend against stub upstreams")
+    parser.add_argument('--requests', type=int, default=200, help="requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma-separated scenario names")
+    parser.add_argument('--latency', type=float, default=0.05, help="mean stub latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--app-url', help="drive an already running app instead of starting one")
+    parser.add_argument('--server', choices=('dev', 'gunicorn', 'asgi'), default='dev', help="server to start the app under")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    stub, stub_stats = start_stub(StubConfig(args.latency, args.jitter, args.error_rate))
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    process = None
+    if args.app_url:
+        base_url = args.app_url.rstrip('/')
+    else:
+        process, base_url = start_app(stub_url, _free_port(), server=args.server)
+
+    try:
+        headers = {'Authorization': f"Bearer {login(base_url)}"}
+        results = {}
+        for name in args.scenarios.split(','):
+            results[name] = run_scenario(SCENARIOS[name], base_url, headers, args.requests, args.concurrency,
+                                         process.pid if process else None)
+            result = results[name]
+            print(f"{name:<18} {result['throughput']:>8}/s  p50 {result['p50_ms']:>8}ms  "
+                  f"p95 {result['p95_ms']:>8}ms  p99 {result['p99_ms']:>8}ms  {result['avg_bytes']:>8}B  cpu {result['cpu_ms']}ms/req  errors {result['errors']}")
+        print(f"Upstream calls: {stub_stats.snapshot()}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        stub.shutdown()
+
+    config = {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'error_rate': args.error_rate,
+        'server': args.server
+    }
+    if args.save_baseline:
+        BASELINE_FILE.write_text(json.dumps({'config': config, 'scenarios': results}, indent=2) + '\n')
+        print(f"Saved baseline to {BASELINE_FILE}")
+
+    if args.compare:
+        if not BASELINE_FILE.exists():
+            print("No baseline stored; run with --save-baseline first")
+            sys.exit(1)
+        baseline = json.loads(BASELINE_FILE.read_text())
+        if baseline['config'] != config:
+            print(f"Warning: baseline was recorded with {baseline['config']}")
+        regressions = compare(results, baseline['scenarios'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Login burst: fires many concurrent logins while probing a cheap route, to check
+# that password hashing queues on its process pool instead of stalling request threads.
+#
+# Usage (from backend/):
+#   python bench/login_burst.py
+#   python bench/login_burst.py --hash-workers 0     # hash inline for comparison
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from loadtest import _free_port, _session, percentile, start_app
+from stubs import StubConfig, start_stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure login latency and app responsiveness during a login burst")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--hash-workers', type=int, help="PASSWORD_HASH_WORKERS for the app")
+    parser.add_argument('--target-ms', type=float, default=100, help="PASSWORD_HASH_TARGET_MS for the app")
+    parser.add_argument('--server', choices=('dev', 'gunicorn'), default='dev')
+    args = parser.parse_args()
+
+    stub, _ = start_stub(StubConfig(0.0, 0.0, 0.0))
+    env = {'PASSWORD_HASH_TARGET_MS': str(args.target_ms)}
+    if args.hash_workers is not None:
+        env['PASSWORD_HASH_WORKERS'] = str(args.hash_workers)
+    process, base_url = start_app(f"http://127.0.0.1:{stub.server_address[1]}", _free_port(), env, args.server)
+
+    try:
+        accounts = [(f"burst{index}@example.com", f"password-{index}") for index in range(args.users)]
+        for email, password in accounts:
+            requests.post(f"{base_url}/signup", json={'name': 'Burst', 'email': email, 'password': password})
+
+        login_latencies = []
+        probe_latencies = []
+        errors = 0
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def one(index):
+            nonlocal errors
+            email, password = accounts[index % len(accounts)]
+            started = time.perf_counter()
+            status = _session().post(f"{base_url}/login", json={'email': email, 'password': password}).status_code
+            with lock:
+                login_latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors += 1
+
+        def probe():
+            session = requests.Session()
+            while not done.is_set():
+                started = time.perf_counter()
+                session.get(f"{base_url}/metrics")
+                probe_latencies.append(time.perf_counter() - started)
+                time.sleep(0.01)
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(one, range(args.logins)))
+        wall = time.perf_counter() - started
+        done.set()
+        prober.join()
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        stub.shutdown()
+
+    login_latencies.sort()
+    probe_latencies.sort()
+    print(f"logins   {args.logins / wall:>8.2f}/s  p50 {percentile(login_latencies, 0.5) * 1000:>8.2f}ms  "
+          f"p95 {percentile(login_latencies, 0.95) * 1000:>8.2f}ms  errors {errors}")
+    print(f"probe    {len(probe_latencies):>8} reqs  p50 {percentile(probe_latencies, 0.5) * 1000:>8.2f}ms  "
+          f"p95 {percentile(probe_latencies, 0.95) * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
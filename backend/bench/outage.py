@@ -0,0 +1,122 @@
+# Outage drill: drives /process while the stub upstreams go down and recover, to check
+# that circuit breakers fail fast, degrade (untranslated prompt, cached code, skipped
+# explanation) and close again after a half-open probe. During a Groq outage new
+# prompts fail with a `degraded` body and repeats of the healthy phase's prompts are
+# served from the cache; the drill exits non-zero if either doesn't happen.
+#
+# Usage (from backend/):
+#   python bench/outage.py --upstream groq          # Groq returns 503s during the outage
+#   python bench/outage.py --upstream sarvam        # Sarvam down: prompts go untranslated
+#   python bench/outage.py --mode slow              # upstream hangs past the read timeout
+#   python bench/outage.py --no-breaker             # same drill with breakers effectively off
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from loadtest import _free_port, _session, login, percentile, start_app
+from stubs import StubConfig, start_stub
+
+OPEN_SECONDS = 3
+READ_TIMEOUT = 1
+FAIL_PATHS = {'groq': ['/chat/completions'], 'sarvam': ['/translate'], 'both': None}
+
+
+def run_phase(name, base_url, headers, total, concurrency, offset, stub_stats):
+    latencies = []
+    statuses = Counter()
+    degraded = Counter()
+    lock = threading.Lock()
+    calls_before = sum(stub_stats.snapshot().values())
+
+    def one(index):
+        started = time.perf_counter()
+        try:
+            response = _session().post(f"{base_url}/process", headers=headers, json={
+                'user_input': f"வரிசையை வரிசைப்படுத்தும் நிரல் {offset + index}",
+                'user_language_code': 'ta-IN',
+                'choice': 'code',
+                'no_cache': True
+            })
+            status = response.status_code
+            body = response.json()
+        except requests.RequestException:
+            status, body = 'error', {}
+        with lock:
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+            for step in body.get('degraded', []):
+                degraded[step] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+
+    latencies.sort()
+    calls = sum(stub_stats.snapshot().values()) - calls_before
+    print(f"{name:<10} p50 {percentile(latencies, 0.5) * 1000:>8.1f}ms  p95 {percentile(latencies, 0.95) * 1000:>8.1f}ms  "
+          f"upstream calls {calls:>5}  statuses {dict(statuses)}  degraded {dict(degraded)}")
+    return statuses, degraded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate an upstream outage against the running app")
+    parser.add_argument('--upstream', choices=sorted(FAIL_PATHS), default='groq')
+    parser.add_argument('--mode', choices=('errors', 'slow'), default='errors')
+    parser.add_argument('--requests', type=int, default=60, help="requests per phase")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--no-breaker', action='store_true', help="raise the breaker's minimum call count out of reach")
+    args = parser.parse_args()
+
+    config = StubConfig(latency=0.02, jitter=0.005, fail_paths=FAIL_PATHS[args.upstream])
+    stub, stub_stats = start_stub(config)
+    env = {
+        'CIRCUIT_MIN_CALLS': '1000000000' if args.no_breaker else '5',
+        'CIRCUIT_OPEN_SECONDS': str(OPEN_SECONDS),
+        'UPSTREAM_READ_TIMEOUT': str(READ_TIMEOUT),
+        'UPSTREAM_BACKOFF_BASE': '0.2',
+        'PASSWORD_HASH_TARGET_MS': '10'
+    }
+    process, base_url = start_app(f"http://127.0.0.1:{stub.server_address[1]}", _free_port(), env)
+
+    try:
+        headers = {'Authorization': f"Bearer {login(base_url)}"}
+        run_phase('healthy', base_url, headers, args.requests, args.concurrency, 0, stub_stats)
+
+        if args.mode == 'slow':
+            # Slow-path stub applies to every path; keep it just past the read timeout
+            config.latency = READ_TIMEOUT + 0.5
+        else:
+            config.error_rate = 1.0
+        _, outage_degraded = run_phase('outage', base_url, headers, args.requests, args.concurrency,
+                                       args.requests, stub_stats)
+        # The healthy phase's prompts again: their code is in the response cache
+        _, repeat_degraded = run_phase('repeat', base_url, headers, args.requests, args.concurrency, 0, stub_stats)
+
+        config.error_rate = 0.0
+        config.latency = 0.02
+        time.sleep(OPEN_SECONDS + 0.5)
+        run_phase('recovered', base_url, headers, args.requests, args.concurrency, 2 * args.requests, stub_stats)
+        print(requests.get(f"{base_url}/cache-stats").json().get('circuit_breakers'))
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        stub.shutdown()
+
+    failures = []
+    if args.upstream in ('groq', 'both') and not args.no_breaker:
+        if not outage_degraded:
+            failures.append("no degraded responses during the Groq outage")
+        if args.upstream == 'groq' and not repeat_degraded['cached_code']:
+            failures.append("no cached code served for repeated prompts during the Groq outage")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
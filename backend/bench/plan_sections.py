@@ -0,0 +1,82 @@
+# Sectioned vs single-call /generate-code-from-plan: wall-clock latency and completeness
+# (share of the plan's features and components that come back as complete files) for
+# plans of growing size. The stub writes one file per plan heading it is shown, charges
+# token_interval per completion token and cuts replies off at max_tokens.
+#
+# Usage (from backend/):
+#   python bench/plan_sections.py [--parts 4,8,16] [--file-words 300]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loadtest import _free_port, _session, login, percentile, start_app
+from plans import parse_files
+from stubs import StubConfig, start_stub
+
+MODES = {'single': '0', 'sectioned': '1'}
+
+
+# A plan shaped like generate_app_plan_from_prompt's output with `parts` features and components
+def make_plan(parts, index):
+    features = '\n\n'.join(f"### Feature {n}\n- Users can manage item set {n} ({index})" for n in range(1, parts // 2 + 1))
+    components = '\n\n'.join(f"### Component {n}\nService {n} with its own routes and tables."
+                             for n in range(1, parts - parts // 2 + 1))
+    return (f"# Inventory App {index}\n\n## Introduction\nTracks stock across warehouses.\n\n"
+            f"## Technologies\n- Flask\n- React\n- PostgreSQL\n\n## Features\n{features}\n\n"
+            f"## Architecture\nA Flask API with a React client.\n\n{components}\n\n## Conclusion\nShip it.\n")
+
+
+def completeness(code_output, parts):
+    paths = [path for path, _, _ in parse_files(code_output)[0]]
+    expected = [f"feature_{n}" for n in range(1, parts // 2 + 1)]
+    expected += [f"component_{n}" for n in range(1, parts - parts // 2 + 1)]
+    return sum(1 for name in expected if any(path.endswith(f"{name}.py") for path in paths)) / len(expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sectioned and single-call code-from-plan generation")
+    parser.add_argument('--parts', default='4,8,16', help="comma-separated plan sizes (features + components)")
+    parser.add_argument('--requests', type=int, default=5, help="sequential requests per size and mode")
+    parser.add_argument('--file-words', type=int, default=300, help="stub completion tokens per file")
+    parser.add_argument('--latency', type=float, default=0.2, help="stub time to first token in seconds")
+    parser.add_argument('--token-interval', type=float, default=0.0005, help="stub seconds per completion token")
+    args = parser.parse_args()
+
+    config = StubConfig(latency=args.latency, jitter=args.latency / 10, token_interval=args.token_interval,
+                        file_words=args.file_words)
+    stub, stub_stats = start_stub(config)
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    for mode, flag in MODES.items():
+        process, base_url = start_app(stub_url, _free_port(), {
+            'PLAN_SECTIONED_GENERATION': flag, 'PASSWORD_HASH_TARGET_MS': '10'
+        })
+        try:
+            headers = {'Authorization': f"Bearer {login(base_url)}"}
+            for parts in (int(value) for value in args.parts.split(',')):
+                latencies = []
+                complete = []
+                calls_before = stub_stats.snapshot().get('/chat/completions', 0)
+                for index in range(args.requests):
+                    started = time.perf_counter()
+                    response = _session().post(f"{base_url}/generate-code-from-plan", headers=headers, json={
+                        'app_plan_text': make_plan(parts, f"{mode}-{parts}-{index}"), 'no_cache': True
+                    })
+                    latencies.append(time.perf_counter() - started)
+                    complete.append(completeness(response.json().get('codeOutput') or '', parts))
+                latencies.sort()
+                calls = stub_stats.snapshot().get('/chat/completions', 0) - calls_before
+                print(f"{mode:<9} parts {parts:>3}  p50 {percentile(latencies, 0.5) * 1000:>8.1f}ms  "
+                      f"max {latencies[-1] * 1000:>8.1f}ms  complete {sum(complete) / len(complete):>5.0%}  "
+                      f"groq calls/req {calls / args.requests:.1f}")
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
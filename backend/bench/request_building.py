@@ -0,0 +1,68 @@
+# Microbenchmark: cost of building a Groq request body per call.
+#
+#   legacy    messages list + body dict + stdlib json.dumps (what requests' json= did),
+#             plus the old cache key over the messages
+#   generic   upstream.chat_request() from a messages list
+#   template  prompts.PROMPTS[...].render() splicing fields into pre-encoded bytes
+#
+# Usage (from backend/):
+#   python bench/request_building.py [--number 20000]
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cache import ResponseCache
+from prompts import PROMPTS
+from upstream import GROQ_MODEL, chat_request, orjson
+
+CASES = {
+    'code': {'prompt': "a program that sorts a list of numbers and prints the median"},
+    'explain': {'code': "def median(values):\n    values = sorted(values)\n    return values[len(values) // 2]\n" * 20,
+                'target_language': 'ta-IN'},
+    'app_plan': {'prompt': "A todo app with reminders, shared lists and offline support"},
+    'code_from_plan': {'app_plan_text': "# Todo App\n## Features\n- Add tasks\n- Reminders\n## Architecture\n- Flask API\n" * 30}
+}
+
+
+def legacy(template, fields):
+    messages = template.messages(**fields)
+    body = json.dumps({
+        "model": GROQ_MODEL,
+        "messages": messages,
+        "temperature": template.temperature,
+        "max_tokens": template.max_tokens
+    }).encode('utf-8')
+    ResponseCache.make_key('chat/completions', GROQ_MODEL, messages, template.temperature, template.max_tokens)
+    return body
+
+
+def generic(template, fields):
+    return chat_request(template.messages(**fields), template.max_tokens, template.temperature)
+
+
+def render(template, fields):
+    return template.render(**fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time request-body construction for each prompt")
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"JSON codec: {'orjson' if orjson is not None else 'stdlib json'}")
+    for name, fields in CASES.items():
+        template = PROMPTS[name]
+        timings = []
+        for fn in (legacy, generic, render):
+            seconds = min(timeit.repeat(lambda: fn(template, fields), number=args.number, repeat=3))
+            timings.append(seconds / args.number * 1e6)
+        print(f"{name:<16} legacy {timings[0]:>7.2f}us  generic {timings[1]:>7.2f}us  "
+              f"template {timings[2]:>7.2f}us  ({timings[0] / timings[2]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# Simulation of the Groq scheduler: several worker processes, each with its own
+# Scheduler over one shared SQLite bucket file, receive a mix of calls offered at about
+# twice the provider's request budget:
+#
+#   light      three users with occasional interactive calls
+#   heavy      one user firing interactive calls back to back
+#   batch      plan-to-code calls (PRIORITY_BATCH)
+#
+# Without the scheduler every call goes straight out and the provider (modelled as the
+# same token bucket) rejects the excess with 429. With it, the budget across all
+# processes holds, interactive calls go ahead of batch ones, light users are served
+# ahead of the heavy one, and calls that cannot get a slot within --max-wait fail
+# locally instead. The bucket starts empty, as in steady state under load.
+#
+# Usage (from backend/):
+#   python bench/scheduler_sim.py [--processes 2] [--rpm 120] [--duration 30]
+import argparse
+import multiprocessing
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ratelimit import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimitTimeout, Scheduler, SQLiteBuckets
+
+# class -> (priority, users, calls per second per user in each process)
+WORKLOAD = {
+    'light': (PRIORITY_INTERACTIVE, ['light-a', 'light-b', 'light-c'], 0.25),
+    'heavy': (PRIORITY_INTERACTIVE, ['heavy'], 0.75),
+    'batch': (PRIORITY_BATCH, ['batch'], 0.5),
+}
+
+
+# Arrival times (seconds from start) of every call one process receives, as (time, class, user)
+def arrivals(duration, seed):
+    rng = random.Random(seed)
+    calls = []
+    for name, (_, users, rate) in WORKLOAD.items():
+        for user in users:
+            at = rng.expovariate(rate)
+            while at < duration:
+                calls.append((at, name, user))
+                at += rng.expovariate(rate)
+    return sorted(calls)
+
+
+def worker(db_file, limits, max_wait, calls, start_at, results):
+    scheduler = Scheduler(SQLiteBuckets(db_file, limits), max_wait=max_wait)
+    outcomes = []
+    lock = threading.Lock()
+
+    def call(at, name, user):
+        time.sleep(max(0.0, start_at + at - time.time()))
+        try:
+            scheduler.acquire(0, WORKLOAD[name][0], user)
+            granted = time.time() - start_at
+        except RateLimitTimeout:
+            granted = None
+        with lock:
+            outcomes.append((at, name, granted))
+
+    threads = [threading.Thread(target=call, args=arrival) for arrival in calls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(outcomes)
+
+
+# Which calls a provider enforcing `rpm` as a token bucket (starting empty) would reject
+def provider_rejections(times, rpm):
+    tokens, last = 0.0, 0.0
+    rejected = []
+    for at in times:
+        tokens = min(rpm, tokens + (at - last) * rpm / 60)
+        last = at
+        if tokens >= 1:
+            tokens -= 1
+            rejected.append(False)
+        else:
+            rejected.append(True)
+    return rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the Groq scheduler across worker processes")
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--rpm', type=int, default=120, help="provider requests per minute")
+    parser.add_argument('--duration', type=float, default=30, help="seconds of arrivals")
+    parser.add_argument('--max-wait', type=float, default=10, help="RATE_LIMIT_MAX_WAIT")
+    args = parser.parse_args()
+
+    workloads = [arrivals(args.duration, seed) for seed in range(args.processes)]
+    offered = sorted(call for calls in workloads for call in calls)
+    print(f"{args.processes} processes, budget {args.rpm}/min, {len(offered)} calls offered in {args.duration:.0f}s "
+          f"({len(offered) / args.duration * 60:.0f}/min)")
+
+    # Unscheduled: every call goes out on arrival
+    rejected = provider_rejections([at for at, _, _ in offered], args.rpm)
+    print("\nwithout the scheduler")
+    for name in WORKLOAD:
+        flags = [flag for (_, call_class, _), flag in zip(offered, rejected) if call_class == name]
+        print(f"  {name:<6} offered {len(flags):>4}  provider 429s {sum(flags):>4}")
+
+    # Scheduled: processes share one bucket file, drained at the start
+    db_file = Path(tempfile.mkdtemp(prefix='llc-scheduler-')) / 'ratelimit.db'
+    limits = {'requests': args.rpm}
+    SQLiteBuckets(db_file, limits)
+    start_at = time.time() + 1.0
+    with sqlite3.connect(db_file) as conn:
+        conn.execute('INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)',
+                     ('requests', 0.0, start_at))
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(db_file, limits, args.max_wait, calls, start_at, results))
+                 for calls in workloads]
+    for process in processes:
+        process.start()
+    outcomes = [outcome for _ in processes for outcome in results.get()]
+    for process in processes:
+        process.join()
+
+    grants = sorted(granted for _, _, granted in outcomes if granted is not None)
+    budget = args.rpm / 60 * (grants[-1] if grants else 0)
+    print(f"\nwith the scheduler: {len(grants)} calls granted, budget for that span {budget:.0f}, "
+          f"provider 429s {sum(provider_rejections(grants, args.rpm))}")
+    for name in WORKLOAD:
+        mine = [(at, granted) for at, call_class, granted in outcomes if call_class == name]
+        waits = sorted(granted - at for at, granted in mine if granted is not None)
+        p50 = waits[len(waits) // 2] if waits else 0.0
+        print(f"  {name:<6} offered {len(mine):>4}  granted {len(waits):>4}  "
+              f"timed out {len(mine) - len(waits):>4}  p50 wait {p50:>5.2f}s")
+
+
+if __name__ == "__main__":
+    main()
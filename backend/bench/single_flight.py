@@ -0,0 +1,119 @@
+# Request coalescing check: N parallel identical requests must reach each upstream
+# exactly once, counted by the stub.
+#
+#   process   N identical /process calls (cache bypassed) -> 1 Sarvam + 1 Groq call
+#   error     N identical translations while Sarvam rejects the call -> 1 call, and
+#             every caller gets the leader's error
+#   timeout   followers with a short timeout give up on a slow leader with
+#             SingleFlightTimeout while the leader still gets its result
+#
+# Exits non-zero if any check fails.
+#
+# Usage (from backend/):
+#   python bench/single_flight.py [--callers 20]
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loadtest import _free_port, _session, login, start_app
+from singleflight import SingleFlight, SingleFlightTimeout
+from stubs import StubConfig, start_stub
+
+
+# Run fn(index) for `callers` threads released together; returns results or exceptions
+def all_at_once(fn, callers):
+    barrier = threading.Barrier(callers)
+
+    def one(index):
+        barrier.wait()
+        try:
+            return fn(index)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        return list(executor.map(one, range(callers)))
+
+
+def check(name, ok, detail):
+    print(f"{'ok  ' if ok else 'FAIL'} {name:<8} {detail}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that identical concurrent requests share one upstream call")
+    parser.add_argument('--callers', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.5, help="stub latency in seconds")
+    args = parser.parse_args()
+    passed = True
+
+    # N identical /process requests through the app
+    stub, stub_stats = start_stub(StubConfig(latency=args.latency, jitter=0.0))
+    process, base_url = start_app(f"http://127.0.0.1:{stub.server_address[1]}", _free_port(),
+                                  {'PASSWORD_HASH_TARGET_MS': '10'})
+    try:
+        headers = {'Authorization': f"Bearer {login(base_url)}"}
+        before = stub_stats.snapshot()
+        responses = all_at_once(lambda index: _session().post(f"{base_url}/process", headers=headers, json={
+            'user_input': "எண்களை வரிசைப்படுத்தும் நிரல் எழுதுக", 'user_language_code': 'ta-IN',
+            'choice': 'code', 'no_cache': True
+        }), args.callers)
+        after = stub_stats.snapshot()
+        calls = {path: after.get(path, 0) - before.get(path, 0) for path in ('/translate', '/chat/completions')}
+        bodies = {response.text for response in responses if not isinstance(response, Exception)}
+        passed &= check('process', calls == {'/translate': 1, '/chat/completions': 1} and len(bodies) == 1
+                        and all(response.status_code == 200 for response in responses),
+                        f"{args.callers} requests -> upstream calls {calls}, distinct responses {len(bodies)}")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        stub.shutdown()
+
+    # A leader that fails: every follower gets the same error from the one call
+    stub, stub_stats = start_stub(StubConfig(latency=args.latency, jitter=0.0, error_rate=1.0, error_status=400))
+    os.environ['SARVAM_BASE_URL'] = f"http://127.0.0.1:{stub.server_address[1]}"
+    # upstream.py opens its rate-limit database in the working directory
+    os.chdir(tempfile.mkdtemp(prefix='llc-single-flight-'))
+    import upstream
+
+    results = all_at_once(lambda index: upstream.sarvam_translate("ஒரு நிரல் எழுது", 'ta-IN', 'en-IN', use_cache=False),
+                          args.callers)
+    errors = {str(result) for result in results if isinstance(result, upstream.UpstreamError)}
+    passed &= check('error', stub_stats.snapshot().get('/translate', 0) == 1 and len(errors) == 1
+                    and all(isinstance(result, upstream.UpstreamError) for result in results),
+                    f"{args.callers} callers -> {stub_stats.snapshot().get('/translate', 0)} call, errors {errors}")
+    stub.shutdown()
+
+    # Followers that stop waiting for a slow leader
+    stub, stub_stats = start_stub(StubConfig(latency=args.latency, jitter=0.0))
+    client = upstream.ProviderClient('Sarvam', f"http://127.0.0.1:{stub.server_address[1]}", {})
+    flight = SingleFlight()
+    payload = {'input': "ஒரு நிரல் எழுது", 'source_language_code': 'ta-IN', 'target_language_code': 'en-IN'}
+
+    def call(index):
+        # Caller 0 is the leader (it waits for its result); the rest give up early
+        if index:
+            time.sleep(0.05)
+        return flight.do('translate', lambda: client.post_json('/translate', payload),
+                         timeout=None if index == 0 else args.latency / 5)
+
+    results = all_at_once(call, args.callers)
+    timeouts = sum(isinstance(result, SingleFlightTimeout) for result in results)
+    passed &= check('timeout', stub_stats.snapshot().get('/translate', 0) == 1 and isinstance(results[0], dict)
+                    and timeouts == args.callers - 1 and flight.stats()['timeouts'] == args.callers - 1,
+                    f"{args.callers} callers -> {stub_stats.snapshot().get('/translate', 0)} call, "
+                    f"leader got {type(results[0]).__name__}, {timeouts} followers timed out")
+    client.close()
+    stub.shutdown()
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Per-request storage cost as the user base grows: the user lookup every authenticated
+# request does, a history append and a history read, for the legacy whole-file JSON
+# store and the SQLite store. JSON is only measured up to --json-max users, since each
+# of its operations re-reads (and appends rewrite) every user's data.
+#
+# Usage (from backend/):
+#   python bench/storage_scale.py [--users 1000,10000,100000] [--json-max 10000]
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import HISTORY_LIMIT, JSONStorage, SQLiteStorage
+
+
+def make_user(index):
+    return {'name': f"User {index}", 'email': f"user{index}@example.com", 'password': 'x' * 100,
+            'created_at': '2025-07-18T15:38:20'}
+
+
+def make_entry(index):
+    return {'type': 'code', 'input': f"sort a list of numbers {index}", 'codeOutput': 'print(sorted(xs))\n' * 20,
+            'languageCode': 'en-IN', 'timestamp': '2025-07-18T15:38:20'}
+
+
+def populate(storage, users):
+    records = {f"user{index}@example.com": make_user(index) for index in range(users)}
+    if isinstance(storage, JSONStorage):
+        storage.save_users(records)
+        storage._write(storage.history_file, {email: [make_entry(0)] * 3 for email in records})
+        return
+    storage.save_users(records)
+    conn = storage._db.connect()
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany('INSERT INTO history (email, data) VALUES (?, ?)',
+                         [(email, json.dumps(make_entry(0))) for email in records for _ in range(3)])
+
+
+# Median seconds of fn(email) over `ops` random users
+def median_op(fn, users, ops):
+    timings = []
+    for _ in range(ops):
+        email = f"user{random.randrange(users)}@example.com"
+        started = time.perf_counter()
+        fn(email)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage latency per request against the number of users")
+    parser.add_argument('--users', default='1000,10000,100000', help="comma-separated user counts")
+    parser.add_argument('--json-max', type=int, default=10000, help="largest user count to run the JSON store at")
+    parser.add_argument('--ops', type=int, default=200, help="operations timed per measurement")
+    args = parser.parse_args()
+
+    print(f"{'backend':<8}{'users':>8}  {'get_user':>10}  {'append':>10}  {'get_history':>11}")
+    for users in (int(value) for value in args.users.split(',')):
+        workdir = Path(tempfile.mkdtemp(prefix='llc-storage-'))
+        backends = [('sqlite', SQLiteStorage(workdir / 'app_data.db'))]
+        if users <= args.json_max:
+            backends.insert(0, ('json', JSONStorage(workdir / 'users.json', workdir / 'generation_history.json')))
+        for name, storage in backends:
+            populate(storage, users)
+            ops = args.ops if name == 'sqlite' else max(5, args.ops // 20)
+            get_user = median_op(storage.get_user, users, ops)
+            append = median_op(lambda email: storage.append_history(email, make_entry(1), HISTORY_LIMIT), users, ops)
+            get_history = median_op(storage.get_history, users, ops)
+            print(f"{name:<8}{users:>8}  {get_user * 1000:>8.3f}ms  {append * 1000:>8.3f}ms  {get_history * 1000:>9.3f}ms")
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Time to first token of the streaming routes against a streaming stub Groq, next to
+# the total latency of the buffered route for the same request. The stub waits
+# --latency before its first token, then charges --token-interval per token, so a
+# buffered route answers only once the whole completion is done.
+#
+# Usage (from backend/):
+#   python bench/stream_ttft.py [--requests 10] [--words 400] [--token-interval 0.002]
+import argparse
+import time
+
+from loadtest import _free_port, _session, login, percentile, start_app
+from stubs import StubConfig, start_stub
+
+# name -> (buffered path, streaming path, first content event, request body)
+ROUTES = {
+    'process': ('/process', '/process/stream', 'code',
+                lambda index: {'user_input': f"write a function that sorts list {index}",
+                               'user_language_code': 'en-IN', 'choice': 'code', 'no_cache': True}),
+    'app_plan': ('/generate_app_plan', '/generate_app_plan/stream', 'app_plan',
+                 lambda index: {'user_input': f"A todo app with reminders {index}", 'user_language_code': 'en-US',
+                                'no_cache': True}),
+    'code_from_plan': ('/generate-code-from-plan', '/generate-code-from-plan/stream', 'code',
+                       lambda index: {'app_plan_text': f"A todo app {index} with tasks, reminders and a Flask API",
+                                      'no_cache': True}),
+}
+
+
+# Seconds to the first `event` event and to the end of the stream
+def stream_timings(url, headers, body, event):
+    started = time.perf_counter()
+    first = None
+    with _session().post(url, headers=headers, json=body, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if first is None and line == f"event: {event}":
+                first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first token of the streaming routes")
+    parser.add_argument('--requests', type=int, default=10, help="sequential requests per route and mode")
+    parser.add_argument('--latency', type=float, default=0.2, help="stub time to first token in seconds")
+    parser.add_argument('--words', type=int, default=400, help="stub completion tokens per reply")
+    parser.add_argument('--token-interval', type=float, default=0.002, help="stub seconds per completion token")
+    args = parser.parse_args()
+
+    stub, _ = start_stub(StubConfig(latency=args.latency, jitter=args.latency / 20, completion_words=args.words,
+                                    token_interval=args.token_interval, stream_chunks=50, stream_interval=0.0))
+    process, base_url = start_app(f"http://127.0.0.1:{stub.server_address[1]}", _free_port(),
+                                  {'PASSWORD_HASH_TARGET_MS': '10'})
+    try:
+        headers = {'Authorization': f"Bearer {login(base_url)}"}
+        for name, (buffered_path, stream_path, event, make_body) in ROUTES.items():
+            buffered = []
+            firsts = []
+            totals = []
+            for index in range(args.requests):
+                started = time.perf_counter()
+                _session().post(f"{base_url}{buffered_path}", headers=headers,
+                                json=make_body(f"b{index}")).raise_for_status()
+                buffered.append(time.perf_counter() - started)
+                first, total = stream_timings(f"{base_url}{stream_path}", headers, make_body(f"s{index}"), event)
+                firsts.append(first if first is not None else total)
+                totals.append(total)
+            for values in (buffered, firsts, totals):
+                values.sort()
+            print(f"{name:<15} buffered p50 {percentile(buffered, 0.5) * 1000:>7.1f}ms  "
+                  f"stream first '{event}' p50 {percentile(firsts, 0.5) * 1000:>7.1f}ms  "
+                  f"p95 {percentile(firsts, 0.95) * 1000:>7.1f}ms  stream total p50 {percentile(totals, 0.5) * 1000:>7.1f}ms")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# Fake Sarvam /translate and Groq /chat/completions servers for benchmarks
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, latency=0.05, jitter=0.01, error_rate=0.0, error_status=503,
+                 stream_chunks=20, stream_interval=0.01, completion_words=200, fail_paths=None,
+                 token_interval=0.0, malformed_rate=0.0, file_words=0, handshake_latency=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Path suffixes that error_rate applies to; None means every path
+        self.fail_paths = fail_paths
+        self.stream_chunks = stream_chunks
+        self.stream_interval = stream_interval
+        self.completion_words = completion_words
+        # Generation time per completion token, on top of latency (models decode serially)
+        self.token_interval = token_interval
+        # Share of combined code + explanation replies sent without section markers
+        self.malformed_rate = malformed_rate
+        # When set, code replies contain one file of this many words per markdown heading in
+        # the prompt, cut off at the request's max_tokens like a real completion
+        self.file_words = file_words
+        # Setup time for each new connection, standing in for TCP + TLS round trips to a remote host
+        self.handshake_latency = handshake_latency
+
+
+# Shared request counters, keyed by path, plus Groq token usage
+class StubStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.connections = 0
+        self.tokens = {'prompt': 0, 'completion': 0}
+
+    def record(self, path):
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def record_tokens(self, prompt, completion):
+        with self._lock:
+            self.tokens['prompt'] += prompt
+            self.tokens['completion'] += completion
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.calls)
+
+    def token_snapshot(self):
+        with self._lock:
+            return dict(self.tokens)
+
+
+def _make_handler(config, stats):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            stats.record_connection()
+            time.sleep(config.handshake_latency)
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _write_chunk(self, data):
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+
+        def _completion_text(self, messages, max_tokens=None):
+            prompt = messages[-1]['content'] if messages else ''
+            headings = [line.lstrip('#').strip() for line in prompt.splitlines() if line.startswith('#')]
+            if config.file_words and headings:
+                words = ' '.join(f"token{i}" for i in range(config.file_words))
+                files = [f"### File: {heading.lower().replace(' ', '_').replace('/', '_')}.py\n```python\n{words}\n```"
+                         for heading in headings]
+                tokens = '\n'.join(files).split(' ')
+                return ' '.join(tokens[:max_tokens] if max_tokens else tokens)
+            words = ' '.join(f"token{i}" for i in range(config.completion_words))
+            text = f"# Response for: {prompt[:80]}\n{words}"
+            system = messages[0]['content'] if messages else ''
+            if '<<<CODE>>>' in system and random.random() >= config.malformed_rate:
+                # Combined prompt: code and explanation sections, each as long as a single reply
+                return f"<<<CODE>>>\n{text}\n<<<EXPLANATION>>>\nExplanation {words}"
+            return text
+
+        # ~4 characters per prompt token, one token per completion word
+        def _usage(self, messages, text):
+            prompt_tokens = sum(len(message.get('content', '')) for message in messages) // 4
+            completion_tokens = len(text.split())
+            stats.record_tokens(prompt_tokens, completion_tokens)
+            return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens}
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            stats.record(self.path)
+            time.sleep(max(0.0, random.gauss(config.latency, config.jitter)))
+
+            failing = config.fail_paths is None or any(self.path.endswith(path) for path in config.fail_paths)
+            if failing and random.random() < config.error_rate:
+                self._send_json(config.error_status, {'error': {'message': 'stub failure'}})
+                return
+
+            if self.path.endswith('/translate'):
+                self._send_json(200, {
+                    'translated_text': f"[{body.get('target_language_code')}] {body.get('input', '')}"
+                })
+            elif self.path.endswith('/chat/completions'):
+                messages = body.get('messages', [])
+                text = self._completion_text(messages, body.get('max_tokens'))
+                usage = self._usage(messages, text)
+                if body.get('stream'):
+                    self._stream(text)
+                else:
+                    time.sleep(usage['completion_tokens'] * config.token_interval)
+                    self._send_json(200, {
+                        'choices': [{'message': {'role': 'assistant', 'content': text}}],
+                        'usage': usage
+                    })
+            else:
+                self._send_json(404, {'error': {'message': 'not found'}})
+
+        def _stream(self, text):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            words = text.split(' ')
+            step = max(1, len(words) // config.stream_chunks)
+            try:
+                for start in range(0, len(words), step):
+                    delta = ' '.join(words[start:start + step]) + ' '
+                    event = {'choices': [{'delta': {'content': delta}}]}
+                    self._write_chunk(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                    time.sleep(config.stream_interval + len(words[start:start + step]) * config.token_interval)
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up on the stream (e.g. an unparseable combined reply)
+                self.close_connection = True
+
+    return StubHandler
+
+
+# Start a stub server on a background thread; returns (server, stats)
+# The default listen backlog (5) drops connections when an async app opens dozens at once
+class StubServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+def start_stub(config=None, host='127.0.0.1', port=0):
+    stats = StubStats()
+    server = StubServer((host, port), _make_handler(config or StubConfig(), stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake Sarvam and Groq endpoints")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args()
+
+    server, _ = start_stub(StubConfig(args.latency, args.jitter, args.error_rate, args.error_status), port=args.port)
+    print(f"Stub upstreams on http://127.0.0.1:{args.port} (Sarvam: /translate, Groq: /chat/completions)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,70 @@
+# Microbenchmark: cost of the token_required decorator per authenticated request.
+#
+#   legacy    jwt.decode plus a full load_users() read of users.json (the old decorator)
+#   uncached  decode_token/get_user_record with both auth caches emptied before each call
+#   cached    the decorator as requests see it, with the token and user caches warm
+#
+# Usage (from backend/):
+#   python bench/token_required.py [--users 10000] [--number 2000]
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import jwt
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the token_required decorator before and after the auth caches")
+    parser.add_argument('--users', type=int, default=10000, help="users in the store")
+    parser.add_argument('--number', type=int, default=2000, help="calls timed per variant")
+    args = parser.parse_args()
+
+    # The app creates its databases in the working directory
+    os.chdir(tempfile.mkdtemp(prefix='llc-auth-'))
+    os.environ.setdefault('PASSWORD_HASH_TARGET_MS', '10')
+    import app as backend
+    from storage import JSONStorage
+
+    users = {f"user{index}@example.com": {'name': f"User {index}", 'passwordHash': 'x' * 120}
+             for index in range(args.users)}
+    email = 'user0@example.com'
+    legacy_store = JSONStorage('users.json', 'generation_history.json')
+    legacy_store.save_users(users)
+    backend.save_users(users)
+
+    flask_app = backend.create_app()
+    with flask_app.app_context():
+        token, _ = backend.issue_tokens(email)
+    secret = flask_app.config['SECRET_KEY']
+    view = backend.token_required(lambda current_user: current_user)
+
+    def legacy():
+        data = jwt.decode(token, secret, algorithms=["HS256"])
+        return legacy_store.load_users()[data['email']]
+
+    def uncached():
+        backend.token_cache.clear()
+        backend.user_cache.clear()
+        return view()
+
+    def cached():
+        return view()
+
+    with flask_app.test_request_context(headers={'Authorization': f"Bearer {token}"}):
+        assert cached()['email'] == email
+        for name, fn in (('legacy', legacy), ('uncached', uncached), ('cached', cached)):
+            number = args.number if name != 'legacy' else max(10, args.number // 100)
+            seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+            print(f"{name:<9} {seconds * 1e6:>10.1f}us per call")
+        print(f"token_cache {backend.token_cache.stats()}")
+        print(f"user_cache  {backend.user_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Translation latency against input size, against the stub Sarvam: chunks translated
+# one after another (TRANSLATION_PARALLELISM=1) and concurrently, plus /translate/batch
+# style batches with repeated strings against one call per string.
+#
+# Usage (from backend/):
+#   python bench/translation_size.py [--sizes 500,1000,2000,4000,8000] [--latency 0.15]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from stubs import StubConfig, start_stub
+
+SENTENCE = "இந்த நிரல் எண்களின் பட்டியலை வரிசைப்படுத்தி சராசரியைக் காட்டுகிறது. "
+
+
+def make_text(size, index):
+    text = f"{index}. " + SENTENCE * (size // len(SENTENCE) + 1)
+    return text[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Translation latency against input size")
+    parser.add_argument('--sizes', default='500,1000,2000,4000,8000', help="comma-separated input sizes in characters")
+    parser.add_argument('--repeat', type=int, default=3, help="translations timed per size and mode")
+    parser.add_argument('--latency', type=float, default=0.15, help="stub Sarvam latency in seconds")
+    parser.add_argument('--batch', type=int, default=20, help="strings per batch (half of them repeats)")
+    args = parser.parse_args()
+
+    stub, stub_stats = start_stub(StubConfig(latency=args.latency, jitter=args.latency / 10))
+    os.environ['SARVAM_BASE_URL'] = f"http://127.0.0.1:{stub.server_address[1]}"
+    # upstream.py opens its rate-limit database in the working directory
+    os.chdir(tempfile.mkdtemp(prefix='llc-translate-'))
+    import translation
+
+    parallelism = translation.TRANSLATION_PARALLELISM
+    print(f"{'chars':>6}  {'chunks':>6}  {'sequential':>10}  {'parallel x' + str(parallelism):>12}")
+    for size in (int(value) for value in args.sizes.split(',')):
+        timings = {}
+        for mode, limit in (('sequential', 1), ('parallel', parallelism)):
+            translation.TRANSLATION_PARALLELISM = limit
+            started = time.perf_counter()
+            for index in range(args.repeat):
+                translation.translate_text(make_text(size, f"{mode}{index}"), 'ta-IN', 'en-IN', use_cache=False)
+            timings[mode] = (time.perf_counter() - started) / args.repeat
+        chunks = len(translation.split_text(make_text(size, 0)))
+        print(f"{size:>6}  {chunks:>6}  {timings['sequential'] * 1000:>8.1f}ms  {timings['parallel'] * 1000:>10.1f}ms")
+    translation.TRANSLATION_PARALLELISM = parallelism
+
+    texts = [f"{SENTENCE} {index % (args.batch // 2)}" for index in range(args.batch)]
+    calls_before = stub_stats.snapshot().get('/translate', 0)
+    started = time.perf_counter()
+    for text in texts:
+        translation.translate_text(text, 'ta-IN', 'en-IN', use_cache=False)
+    one_by_one = time.perf_counter() - started
+    one_by_one_calls = stub_stats.snapshot().get('/translate', 0) - calls_before
+
+    calls_before = stub_stats.snapshot().get('/translate', 0)
+    started = time.perf_counter()
+    translation.translate_batch(texts, 'ta-IN', 'en-IN', use_cache=False)
+    batched = time.perf_counter() - started
+    batched_calls = stub_stats.snapshot().get('/translate', 0) - calls_before
+    print(f"batch of {args.batch}: one call per string {one_by_one * 1000:.1f}ms ({one_by_one_calls} Sarvam calls), "
+          f"translate_batch {batched * 1000:.1f}ms ({batched_calls} Sarvam calls)")
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
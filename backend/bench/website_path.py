@@ -0,0 +1,67 @@
+# Website path of /process (choice=website): latency and Sarvam calls per request, with
+# requests spread over a few languages so the boilerplate translation memory fills up
+# once per language. Point --backend-dir at another checkout to measure it the same way.
+#
+# Usage (from backend/):
+#   python bench/website_path.py
+#   git worktree add /tmp/before HEAD~1 && python bench/website_path.py --backend-dir /tmp/before/backend
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loadtest import BACKEND_DIR, _free_port, _session, login, percentile, start_app
+from stubs import StubConfig, start_stub
+
+LANGUAGES = ['ta-IN', 'hi-IN', 'te-IN', 'kn-IN', 'bn-IN']
+PROMPTS = {
+    'ta-IN': "ஒரு உணவகத்திற்கான இணையதளம்",
+    'hi-IN': "एक रेस्टोरेंट के लिए वेबसाइट",
+    'te-IN': "ఒక రెస్టారెంట్ కోసం వెబ్‌సైట్",
+    'kn-IN': "ಒಂದು ರೆಸ್ಟೋರೆಂಟ್‌ಗಾಗಿ ವೆಬ್‌ಸೈಟ್",
+    'bn-IN': "একটি রেস্টুরেন্টের জন্য ওয়েবসাইট",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Website path latency and Sarvam calls per request")
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.15, help="stub latency in seconds")
+    parser.add_argument('--backend-dir', default=str(BACKEND_DIR))
+    args = parser.parse_args()
+
+    stub, stub_stats = start_stub(StubConfig(latency=args.latency, jitter=args.latency / 10))
+    process, base_url = start_app(f"http://127.0.0.1:{stub.server_address[1]}", _free_port(),
+                                  {'PASSWORD_HASH_TARGET_MS': '10'}, backend_dir=args.backend_dir)
+    latencies = []
+    lock = threading.Lock()
+
+    def one(index):
+        language = LANGUAGES[index % len(LANGUAGES)]
+        started = time.perf_counter()
+        response = _session().post(f"{base_url}/process", headers=headers, json={
+            'user_input': f"{PROMPTS[language]} {index}", 'user_language_code': language, 'choice': 'website',
+            'no_cache': True
+        })
+        response.raise_for_status()
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        headers = {'Authorization': f"Bearer {login(base_url)}"}
+        calls_before = stub_stats.snapshot().get('/translate', 0)
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(one, range(args.requests)))
+        calls = stub_stats.snapshot().get('/translate', 0) - calls_before
+        latencies.sort()
+        print(f"website  p50 {percentile(latencies, 0.5) * 1000:.1f}ms  p95 {percentile(latencies, 0.95) * 1000:.1f}ms  "
+              f"Sarvam calls/req {calls / args.requests:.2f}")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# In-process and on-disk caches
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from storage import SQLiteConnections
+
+_MISSING = object()
+
+
+# Bounded LRU cache with per-entry expiry and hit/miss/eviction counters
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires_at = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    # ttl overrides the default lifetime; entries with ttl <= 0 are not stored
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+# Persistent cache tier in a SQLite file, evicting least recently used entries past max_bytes
+class DiskCache:
+    def __init__(self, db_file, max_bytes=256 * 1024 * 1024, ttl=86400):
+        self.db_file = str(db_file)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._db = SQLiteConnections(self.db_file)
+        self._lock = threading.Lock()
+        self._db.connect().execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.connect().execute('CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)')
+
+    # Forget connections (e.g. ones inherited across fork); new ones open lazily
+    def reset(self):
+        self._db.reset()
+
+    def get(self, key):
+        conn = self._db.connect()
+        now = time.time()
+        row = conn.execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+            return None
+        conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        conn = self._db.connect()
+        now = time.time()
+        encoded = json.dumps(value)
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+            (key, encoded, len(encoded), now + self.ttl, now)
+        )
+        with self._lock:
+            conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+            while total > self.max_bytes:
+                row = conn.execute('SELECT key, size FROM cache ORDER BY accessed_at LIMIT 1').fetchone()
+                if row is None:
+                    break
+                conn.execute('DELETE FROM cache WHERE key = ?', (row[0],))
+                total -= row[1]
+
+
+# Content-addressed cache for upstream responses: memory LRU in front of an optional disk tier
+class ResponseCache:
+    def __init__(self, maxsize=2048, ttl=3600, disk=None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk = disk
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Stable digest of the request parts that determine the response
+    @staticmethod
+    def make_key(*parts):
+        encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'memory': self.memory.stats()
+            }
@@ -0,0 +1,119 @@
+# Per-upstream circuit breaker over a rolling window of call outcomes
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+# Opens when, over the last `window` seconds (and at most the last `window_calls` calls),
+# with at least `min_calls` calls recorded, the share
+# of failed calls reaches failure_ratio or the share of calls slower than slow_call_seconds
+# reaches slow_ratio. While open, calls are rejected without touching the network. After
+# open_seconds a few probe calls are let through (half-open): a success closes the
+# circuit, a failure opens it again.
+class CircuitBreaker:
+    def __init__(self, name, window=60, window_calls=20, min_calls=10, failure_ratio=0.5, slow_call_seconds=30,
+                 slow_ratio=0.8, open_seconds=30, half_open_probes=1):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_ratio = slow_ratio
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        # (finished at, failed, slow) per call
+        self._calls = deque(maxlen=window_calls)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def _trim(self, now):
+        cutoff = now - self.window
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._probes = 0
+        self._calls.clear()
+        self.opened += 1
+
+    # Whether allow() would let a call through right now, without using up a probe
+    def available(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            cooling = time.monotonic() - self._opened_at < self.open_seconds
+            if self._state == OPEN:
+                return not cooling
+            return self._probes < self.half_open_probes or not cooling
+
+    # Whether a call may go ahead now; a rejected call should fail fast
+    def allow(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self._state = HALF_OPEN
+                self._opened_at = now
+                self._probes = 0
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    if now - self._opened_at < self.open_seconds:
+                        self.rejected += 1
+                        return False
+                    # The probes never reported back; let new ones through
+                    self._opened_at = now
+                    self._probes = 0
+                self._probes += 1
+            return True
+
+    # Record the outcome of a call that allow() let through
+    def record(self, success, duration):
+        now = time.monotonic()
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if success and not slow:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                return
+            if self._state == OPEN:
+                return
+
+            self._calls.append((now, not success, slow))
+            self._trim(now)
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, _, was_slow in self._calls if was_slow)
+            if failures / total >= self.failure_ratio or slow_calls / total >= self.slow_ratio:
+                self._open(now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': STATE_VALUES[self._state],
+                'window_calls': len(self._calls),
+                'opened': self.opened,
+                'rejected': self.rejected
+            }
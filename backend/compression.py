@@ -0,0 +1,68 @@
+# Negotiated gzip/brotli response compression and ETag helpers for conditional GETs
+import gzip
+import os
+
+# brotli is optional; without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+COMPRESSIBLE_TYPES = {'application/json', 'text/html', 'text/plain', 'text/markdown', 'text/css', 'application/javascript'}
+SKIPPED_STATUSES = {204, 206, 304}
+
+# Preferred first when the client accepts both equally
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+# Pick the best encoding from an Accept-Encoding header (werkzeug Accept object), or None
+def choose_encoding(accept_encodings):
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+# Compress a buffered response in place. Streamed responses (SSE) pass through
+# untouched so each event still reaches the client as soon as it is written.
+def compress_response(response, accept_encodings):
+    if (response.is_streamed or response.direct_passthrough or response.status_code < 200
+            or response.status_code in SKIPPED_STATUSES or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_BYTES:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(_compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # Each encoding is a different representation, so it needs its own strong ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+# The tag in If-None-Match that matches `etag` in any of its encodings, or None
+def matching_etag(if_none_match, etag):
+    for candidate in (etag, *(f"{etag}-{encoding}" for encoding in ENCODINGS)):
+        if candidate in if_none_match:
+            return candidate
+    return None
@@ -0,0 +1,73 @@
+# Shared worker pool for overlapping independent upstream calls within a request
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', 32))
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='fanout')
+        return _executor
+
+
+# Drop the pool (e.g. in a freshly forked worker); it is recreated lazily
+def reset_executor():
+    global _executor
+    with _lock:
+        _executor = None
+
+
+# Run fn on the shared pool, carrying over the caller's context variables
+def submit(fn, *args, **kwargs):
+    context = contextvars.copy_context()
+    return get_executor().submit(context.run, fn, *args, **kwargs)
+
+
+# Start every call at once and return the first successful result in preference order.
+# Each call is a (fn, args) pair; is_error decides whether a result counts as a failure.
+# If every call fails, the last result is returned.
+def first_success(calls, is_error):
+    futures = [submit(fn, *args) for fn, args in calls]
+    result = None
+    for index, future in enumerate(futures):
+        result = future.result()
+        if not is_error(result):
+            for pending in futures[index + 1:]:
+                pending.cancel()
+            return result
+    return result
+
+
+# Run fn over items on the shared pool with at most `limit` calls in flight; returns one
+# future per item, in item order. Workers pull the next item as they finish one, so the
+# caller doesn't block and no pool thread sits waiting for a slot.
+def bounded_map(fn, items, limit):
+    futures = [Future() for _ in items]
+    pending = iter(list(enumerate(items)))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                item = next(pending, None)
+            if item is None:
+                return
+            index, value = item
+            if not futures[index].set_running_or_notify_cancel():
+                continue
+            try:
+                futures[index].set_result(fn(value))
+            except Exception as e:
+                futures[index].set_exception(e)
+
+    for _ in range(min(limit, len(futures))):
+        submit(worker)
+    return futures
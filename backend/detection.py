@@ -0,0 +1,240 @@
+# Local script/language detection for prompts, so Sarvam is only asked to translate
+# text that actually needs it. Letters are bucketed by Unicode block (the Indic blocks
+# Sarvam supports, plus Latin); Latin-only text is checked with a small character
+# trigram model to tell English from romanized Indic ("mujhe ek program chahiye").
+import math
+import re
+from collections import Counter
+
+# Unicode blocks of the Indic scripts Sarvam translates, and the language each implies
+INDIC_BLOCKS = (
+    (0x0900, 0x097F, 'devanagari'),
+    (0x0980, 0x09FF, 'bengali'),
+    (0x0A00, 0x0A7F, 'gurmukhi'),
+    (0x0A80, 0x0AFF, 'gujarati'),
+    (0x0B00, 0x0B7F, 'oriya'),
+    (0x0B80, 0x0BFF, 'tamil'),
+    (0x0C00, 0x0C7F, 'telugu'),
+    (0x0C80, 0x0CFF, 'kannada'),
+    (0x0D00, 0x0D7F, 'malayalam'),
+)
+SCRIPT_LANGUAGES = {
+    'devanagari': ('hi-IN', 'mr-IN'),
+    'bengali': ('bn-IN',),
+    'gurmukhi': ('pa-IN',),
+    'gujarati': ('gu-IN',),
+    'oriya': ('od-IN',),
+    'tamil': ('ta-IN',),
+    'telugu': ('te-IN',),
+    'kannada': ('kn-IN',),
+    'malayalam': ('ml-IN',),
+}
+
+# Latin words allowed inside a translated span before it is split around them; longer
+# English runs are left as they are
+MAX_EMBEDDED_LATIN_WORDS = 3
+
+# Code that is never sent for translation: fenced blocks, `inline code`, and identifiers
+# that don't occur in prose (dotted names, calls, snake_case, camelCase)
+_CODE = (r'```.*?```|`[^`\n]+`'
+         r'|[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)+(?:\(\))?|[A-Za-z_]\w*\(\)'
+         r'|[A-Za-z]*_[A-Za-z0-9_]+|[a-z]+[A-Z][A-Za-z0-9]*')
+_TOKEN = re.compile(_CODE + r'|\S+|\s+', re.DOTALL)
+_CODE_TOKEN = re.compile(_CODE, re.DOTALL)
+_LATIN_WORD = re.compile(r"[a-z]+")
+
+# Training text for the trigram model: typical English requests, and the same kind of
+# request written in romanized Hindi, Tamil, Telugu, Bengali and Marathi. English
+# loanwords in the romanized sample are dropped before training (see TrigramModel)
+_ENGLISH_SAMPLE = """
+write a program that sorts a list of numbers and prints the result
+create a website for my restaurant with a menu page and a contact form
+build a simple calculator app that can add subtract multiply and divide
+generate a function to check whether a string is a palindrome
+make a todo list application where users can add edit and delete their tasks
+how do i read a file line by line and count the words in it
+please explain the code and show me an example with comments
+design a login page with email and password fields and validation
+the application should store the data in a database and show monthly reports
+find the largest number in an array without using built in functions
+convert the temperature from celsius to fahrenheit and back again
+i want a game where the player guesses a random number between one and hundred
+show the weather for my city using an api and refresh it every hour
+write a python script to download images from a url and save them in a folder
+sort the students by their marks and print the top three names
+add a button that changes the background color when it is clicked
+what is the difference between a class and an object explain with code
+create a chess game with a board pieces and a simple computer opponent
+make a chat application that shows messages in real time with notifications
+build a portfolio page that describes my projects skills and experience
+track daily expenses and draw a chart of spending for each category
+fetch the latest news headlines and display them as cards with images
+parse a csv file calculate the average salary and write a summary report
+"""
+_ROMANIZED_SAMPLE = """
+mujhe ek program chahiye jo numbers ko sort kare aur result dikhaye
+mere restaurant ke liye ek website banao jisme menu aur contact page ho
+kya aap bata sakte ho ki yeh code kaise kaam karta hai
+ek calculator app banaiye jo jod ghatav guna aur bhag kar sake
+list mein sabse bada number dhundho bina built in function ke
+enakku oru program venum athu numbers ai sort pannanum
+en kadaikku oru website seyyungal athil menu pakkam vendum
+intha code eppadi velai seigirathu endru sollungal
+naaku oka program kavali adi numbers ni sort cheyyali
+maa restaurant kosam oka website tayaru cheyandi
+amar ekta program dorkar jeta number gulo sajabe
+amar dokaner jonno ekti website baniye dao
+mala ek program pahije jo numbers sort karel
+ha code kasa chalto te mala sanga
+"""
+
+
+def script_of(char):
+    code = ord(char)
+    for start, end, script in INDIC_BLOCKS:
+        if start <= code <= end:
+            return script
+    if char.isalpha() and (code < 0x80 or 0xC0 <= code <= 0x24F):
+        return 'latin'
+    return None
+
+
+# Count letters (and Indic vowel signs) per script; other characters are ignored
+def script_histogram(text):
+    histogram = Counter()
+    for char in text:
+        script = script_of(char)
+        if script:
+            histogram[script] += 1
+    return histogram
+
+
+def _trigrams(word):
+    padded = f" {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+# Character trigram model with add-one smoothing, trained on the words of `sample`
+# that are not in `exclude`
+class TrigramModel:
+    def __init__(self, sample, exclude=()):
+        words = [word for word in _LATIN_WORD.findall(sample.lower()) if word not in exclude]
+        self.counts = Counter(trigram for word in words for trigram in _trigrams(word))
+        self.total = sum(self.counts.values())
+        # Every possible trigram over a-z and the word boundary, so unseen trigrams cost
+        # about the same under both models whatever their sample sizes
+        self.vocabulary = 27 ** 3
+
+    def log_probability(self, trigram):
+        return math.log((self.counts.get(trigram, 0) + 1) / (self.total + self.vocabulary))
+
+
+_english = TrigramModel(_ENGLISH_SAMPLE)
+_romanized = TrigramModel(_ROMANIZED_SAMPLE, exclude=set(_LATIN_WORD.findall(_ENGLISH_SAMPLE)))
+
+
+# Share of words that must read as romanized Indic for Latin text to need translating;
+# voting per word keeps English loanwords ("calculator") from outweighing the rest
+ROMANIZED_WORD_SHARE = 0.3
+
+
+def _reads_english(word):
+    return sum(_english.log_probability(trigram) - _romanized.log_probability(trigram) for trigram in _trigrams(word)) >= 0
+
+
+# Whether Latin-script text reads as English rather than romanized Indic
+def looks_english(text):
+    words = _LATIN_WORD.findall(text.lower())
+    if not words:
+        return True
+    romanized = sum(1 for word in words if not _reads_english(word))
+    return romanized < ROMANIZED_WORD_SHARE * len(words)
+
+
+# Translation decision for one prompt:
+#   decision         'skip' (already English or code only), 'full' or 'partial'
+#   source_language  language to translate from; follows the dominant Indic script when
+#                    it contradicts the language the client claimed
+#   segments         [(text, translate?)] covering the prompt, in order
+class TranslationPlan:
+    def __init__(self, decision, source_language, segments):
+        self.decision = decision
+        self.source_language = source_language
+        self.segments = segments
+
+    @property
+    def spans(self):
+        return [text for text, translate in self.segments if translate]
+
+
+def _kind(token):
+    if token.isspace():
+        return 'space'
+    scripts = script_histogram(token)
+    if any(script != 'latin' for script in scripts):
+        return 'indic'
+    if _CODE_TOKEN.search(token):
+        return 'code'
+    return 'latin' if scripts else 'other'
+
+
+# Group tokens into translated spans: each span runs from an Indic token to the last
+# Indic token reachable without crossing code or more than MAX_EMBEDDED_LATIN_WORDS
+# Latin words, so short loanwords ("program", "website") keep their context.
+def _segments(tokens, kinds):
+    translate = [False] * len(tokens)
+    start = None
+    last_indic = None
+    latin_words = 0
+    for index, kind in enumerate(kinds + ['code']):
+        if kind == 'indic':
+            if start is None:
+                start = index
+            last_indic = index
+            latin_words = 0
+        elif start is not None and (kind == 'code' or (kind == 'latin' and latin_words >= MAX_EMBEDDED_LATIN_WORDS)):
+            for position in range(start, last_indic + 1):
+                translate[position] = True
+            start = None
+            if kind == 'latin':
+                latin_words = 0
+        elif kind == 'latin':
+            latin_words += 1
+
+    segments = []
+    for token, flag in zip(tokens, translate):
+        if segments and segments[-1][1] == flag:
+            segments[-1] = (segments[-1][0] + token, flag)
+        else:
+            segments.append((token, flag))
+    return segments
+
+
+def _source_language(histogram, language_code):
+    indic = [(count, script) for script, count in histogram.items() if script != 'latin']
+    if not indic:
+        return language_code
+    script = max(indic)[1]
+    languages = SCRIPT_LANGUAGES[script]
+    return language_code if language_code in languages else languages[0]
+
+
+# Decide what, if anything, of `text` (claimed to be in language_code) needs translating
+def plan_translation(text, language_code):
+    tokens = _TOKEN.findall(text)
+    kinds = [_kind(token) for token in tokens]
+    histogram = script_histogram(''.join(token for token, kind in zip(tokens, kinds) if kind != 'code'))
+
+    if not any(kind == 'indic' for kind in kinds):
+        prose = ' '.join(token for token, kind in zip(tokens, kinds) if kind == 'latin')
+        if language_code.startswith('en') or looks_english(prose):
+            return TranslationPlan('skip', language_code, [(text, False)])
+        return TranslationPlan('full', language_code, [(text, True)])
+
+    source_language = _source_language(histogram, language_code)
+    segments = _segments(tokens, kinds)
+    untouched = [_kind(token) for segment, translate in segments if not translate for token in _TOKEN.findall(segment)]
+    if 'code' not in untouched and untouched.count('latin') <= MAX_EMBEDDED_LATIN_WORDS:
+        # Nothing worth keeping outside the spans; translate the prompt as a whole
+        return TranslationPlan('full', source_language, [(text, True)])
+    return TranslationPlan('partial', source_language, segments)
@@ -0,0 +1,42 @@
+# Production server settings: gunicorn -c gunicorn.conf.py wsgi:app
+# Async serving mode: gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5007)}"
+
+# Requests mostly wait on Sarvam/Groq, so each worker runs several threads (the threaded
+# mode only; uvicorn workers keep requests in flight on an event loop instead)
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# The app sizes per-worker pools (e.g. password hashing) from the worker count
+os.environ['WEB_CONCURRENCY'] = str(workers)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Import the app (storage, caches, migrations) once in the master before forking
+preload_app = True
+
+# Upstream generations can take a while; give in-flight requests time to finish on shutdown/reload
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+accesslog = '-'
+
+
+# Each worker gets its own upstream connection pools, thread pools and SQLite connections
+def post_fork(server, worker):
+    from app import reset_after_fork
+    reset_after_fork()
+
+
+# Write out queued history entries before the worker goes away
+def worker_exit(server, worker):
+    from app import history_sink
+    from upstream import reset_clients
+    history_sink.close()
+    reset_clients()
@@ -0,0 +1,334 @@
+# Write-behind history persistence. add_to_history() queues entries and a background
+# thread writes them in batches, so a request no longer waits on the history write.
+# Batches also go, as multi-row inserts, to a table with the Supabase generation_history
+# schema (supabase/migrations): a local SQLite stand-in, or Postgres via psycopg2.
+#
+# generation_history.user_id references auth.users, while users here are keyed by email,
+# so each batch looks up the auth user id of every email. Entries of accounts without
+# an auth user are skipped (and counted), since the foreign key would reject them.
+import logging
+import os
+import threading
+import time
+import uuid
+
+from cache import TTLCache
+from storage import SQLiteConnections
+
+# psycopg2 is optional; without it only the SQLite stand-in is available
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    psycopg2 = None
+
+logger = logging.getLogger(__name__)
+
+GENERATION_HISTORY_COLUMNS = ('id', 'user_id', 'type', 'input', 'output', 'translated_prompt', 'explanation',
+                              'language_code', 'created_at')
+GENERATION_TYPES = ('code', 'app_plan', 'website', 'code_from_plan')
+
+# SQLite allows 999 bound parameters per statement on older builds
+SQLITE_MAX_PARAMS = 999
+SQLITE_ROWS_PER_INSERT = SQLITE_MAX_PARAMS // len(GENERATION_HISTORY_COLUMNS)
+
+USER_ID_POSITION = GENERATION_HISTORY_COLUMNS.index('user_id')
+
+
+# Lowercased account emails of a batch of rows
+def row_emails(rows):
+    return sorted({row[USER_ID_POSITION].lower() for row in rows})
+
+
+# Rows come in GENERATION_HISTORY_COLUMNS order with the account email in the user_id
+# slot; swap in the auth user ids found for them and drop rows with no auth user
+def link_users(rows, user_ids):
+    linked = []
+    for row in rows:
+        user_id = user_ids.get(row[USER_ID_POSITION].lower())
+        if user_id is not None:
+            linked.append(row[:USER_ID_POSITION] + (user_id,) + row[USER_ID_POSITION + 1:])
+    if len(linked) < len(rows):
+        logger.warning(f"Skipping {len(rows) - len(linked)} generation_history rows of accounts without an auth user")
+    return linked
+
+
+# Local stand-in for the generation_history table, same columns and constraints. auth_users
+# stands in for Supabase's auth.users, so the user_id foreign key is enforced here too.
+class SQLiteHistoryTable:
+    def __init__(self, db_file='generation_history.db'):
+        self.db_file = str(db_file)
+        self._db = SQLiteConnections(self.db_file)
+        self._registered = TTLCache(maxsize=100000, ttl=float('inf'))
+        self.unlinked = 0
+        self._init_schema()
+
+    def reset(self):
+        self._db.reset()
+
+    def _init_schema(self):
+        types = ', '.join(f"'{name}'" for name in GENERATION_TYPES)
+        conn = self._db.connect()
+        # Stand-ins created before the foreign key keep their rows under another name
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'generation_history'").fetchone() \
+                and not conn.execute('PRAGMA foreign_key_list(generation_history)').fetchall():
+            conn.execute('ALTER TABLE generation_history RENAME TO generation_history_unlinked')
+            conn.execute('DROP INDEX IF EXISTS idx_generation_history_user')
+        conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS auth_users (
+                id TEXT PRIMARY KEY,
+                email TEXT NOT NULL UNIQUE COLLATE NOCASE
+            );
+            CREATE TABLE IF NOT EXISTS generation_history (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL REFERENCES auth_users (id) ON DELETE CASCADE,
+                type TEXT NOT NULL CHECK (type IN ({types})),
+                input TEXT NOT NULL,
+                output TEXT,
+                translated_prompt TEXT,
+                explanation TEXT,
+                language_code TEXT,
+                created_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_generation_history_user ON generation_history (user_id, created_at DESC);
+        """)
+
+    # Give an account its auth user, as Supabase Auth does at sign-up. Accounts seen
+    # before are remembered, so a login only writes when the account is new.
+    def register_user(self, email):
+        if self._registered.get(email):
+            return
+        conn = self._db.connect()
+        if not conn.execute('SELECT 1 FROM auth_users WHERE email = ?', (email,)).fetchone():
+            conn.execute('INSERT OR IGNORE INTO auth_users (id, email) VALUES (?, ?)', (str(uuid.uuid4()), email))
+        self._registered.set(email, True)
+
+    # Insert rows (see link_users) in one transaction; rows already present are skipped,
+    # so a retried batch is harmless
+    def insert_many(self, rows):
+        conn = self._db.connect()
+        placeholders = '(' + ', '.join('?' * len(GENERATION_HISTORY_COLUMNS)) + ')'
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            emails = row_emails(rows)
+            user_ids = {}
+            for start in range(0, len(emails), SQLITE_MAX_PARAMS):
+                chunk = emails[start:start + SQLITE_MAX_PARAMS]
+                user_ids.update(conn.execute(
+                    f"SELECT lower(email), id FROM auth_users WHERE email IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall())
+            linked = link_users(rows, user_ids)
+            for start in range(0, len(linked), SQLITE_ROWS_PER_INSERT):
+                chunk = linked[start:start + SQLITE_ROWS_PER_INSERT]
+                conn.execute(
+                    f"INSERT OR IGNORE INTO generation_history ({', '.join(GENERATION_HISTORY_COLUMNS)}) "
+                    f"VALUES {', '.join([placeholders] * len(chunk))}",
+                    [value for row in chunk for value in row]
+                )
+            conn.execute('COMMIT')
+            self.unlinked += len(rows) - len(linked)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def count(self):
+        return self._db.connect().execute('SELECT COUNT(*) FROM generation_history').fetchone()[0]
+
+
+# The real generation_history table (created by the Supabase migration). RLS there only
+# lets `authenticated` users insert their own rows, so HISTORY_SINK_URL must connect as a
+# role that bypasses RLS and can read auth.users: Supabase's `postgres` role (the table
+# owner) or `service_role` (BYPASSRLS). Other roles are refused on connect rather than
+# having every batch rejected. Supabase Auth creates auth users, so register_user is a no-op.
+class PostgresHistoryTable:
+    def __init__(self, dsn):
+        if psycopg2 is None:
+            raise RuntimeError("HISTORY_SINK=postgres requires the psycopg2 package")
+        self.dsn = dsn
+        self._conn = None
+        self.unlinked = 0
+
+    def reset(self):
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None or self._conn.closed:
+            conn = psycopg2.connect(self.dsn)
+            with conn.cursor() as cursor:
+                # The table owner also bypasses RLS, as the migration doesn't FORCE it
+                cursor.execute("""
+                    SELECT rolsuper OR rolbypassrls OR rolname = (
+                        SELECT tableowner FROM pg_tables
+                        WHERE schemaname = current_schema() AND tablename = 'generation_history')
+                    FROM pg_roles WHERE rolname = current_user
+                """)
+                row = cursor.fetchone()
+            conn.rollback()
+            if not row or not row[0]:
+                conn.close()
+                raise RuntimeError("HISTORY_SINK_URL must connect as a role that bypasses RLS "
+                                   "(e.g. postgres or service_role) to write generation_history")
+            self._conn = conn
+        return self._conn
+
+    def register_user(self, email):
+        pass
+
+    def insert_many(self, rows):
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT lower(email), id::text FROM auth.users WHERE lower(email) = ANY(%s)',
+                               (row_emails(rows),))
+                linked = link_users(rows, dict(cursor.fetchall()))
+                if linked:
+                    execute_values(
+                        cursor,
+                        f"INSERT INTO generation_history ({', '.join(GENERATION_HISTORY_COLUMNS)}) VALUES %s "
+                        f"ON CONFLICT (id) DO NOTHING",
+                        linked, page_size=len(linked)
+                    )
+            conn.commit()
+            self.unlinked += len(rows) - len(linked)
+        except Exception:
+            conn.rollback()
+            raise
+
+    def count(self):
+        with self._connect().cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM generation_history')
+            return cursor.fetchone()[0]
+
+
+# Table selected by HISTORY_SINK: 'sqlite' (stand-in), 'postgres' or 'off'. The mirror is
+# opt-in: it defaults to 'postgres' when HISTORY_SINK_URL is set and to 'off' otherwise.
+def create_history_table(backend=None):
+    backend = backend or os.environ.get('HISTORY_SINK') or ('postgres' if os.environ.get('HISTORY_SINK_URL') else 'off')
+    if backend == 'off':
+        return None
+    if backend == 'sqlite':
+        return SQLiteHistoryTable(os.environ.get('HISTORY_SINK_DB_FILE', 'generation_history.db'))
+    if backend == 'postgres':
+        return PostgresHistoryTable(os.environ['HISTORY_SINK_URL'])
+    raise ValueError(f"Unknown history sink: {backend}")
+
+
+# Buffers items and hands them to write(batch) on a background thread, batch_size at a
+# time or every flush_interval seconds, whichever comes first.
+#   Backpressure: with max_pending items waiting, put() blocks for up to put_timeout and
+#   then writes its item itself, so a stalled writer slows requests down instead of
+#   growing memory or losing entries.
+#   Failed batches are retried `retries` times with backoff, so write() must be idempotent.
+#   close() stops the thread after writing everything queued; call it on shutdown.
+class WriteBehindQueue:
+    def __init__(self, write, batch_size=100, flush_interval=1.0, max_pending=10000, put_timeout=1.0, retries=3):
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self.reset()
+
+    # Fresh state (e.g. after fork, where the writer thread doesn't survive)
+    def reset(self):
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._inflight = []
+        self._first_queued = 0.0
+        self._thread = None
+        self._closed = False
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+        self.blocked = 0
+        self.inline_writes = 0
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._thread.start()
+
+    def put(self, item):
+        with self._cond:
+            if not self._closed:
+                deadline = time.monotonic() + self.put_timeout
+                if len(self._buffer) >= self.max_pending:
+                    self.blocked += 1
+                while len(self._buffer) >= self.max_pending and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                if len(self._buffer) < self.max_pending:
+                    if not self._buffer:
+                        self._first_queued = time.monotonic()
+                    self._buffer.append(item)
+                    self._start()
+                    if len(self._buffer) >= self.batch_size:
+                        self._cond.notify_all()
+                    return
+            self.inline_writes += 1
+        self._write([item])
+
+    # Items queued or being written, oldest first
+    def pending(self):
+        with self._cond:
+            return self._inflight + self._buffer
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and (not self._buffer or (
+                        len(self._buffer) < self.batch_size
+                        and time.monotonic() - self._first_queued < self.flush_interval)):
+                    timeout = self.flush_interval - (time.monotonic() - self._first_queued) if self._buffer else None
+                    self._cond.wait(timeout)
+                if not self._buffer:
+                    return
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:self.batch_size]
+                self._first_queued = time.monotonic()
+                self._inflight = batch
+                self._cond.notify_all()
+            self._write(batch)
+            with self._cond:
+                self._inflight = []
+
+    def _write(self, batch):
+        for attempt in range(self.retries + 1):
+            try:
+                self.write(batch)
+                with self._cond:
+                    self.batches += 1
+                    self.written += len(batch)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f"Dropping {len(batch)} history entries after {attempt + 1} failed writes: {str(e)}")
+                    with self._cond:
+                        self.failed += len(batch)
+                    return
+                logger.warning(f"History write failed (attempt {attempt + 1}), retrying: {str(e)}")
+                time.sleep(0.1 * 2 ** attempt)
+
+    # Write out everything queued and stop the writer thread
+    def close(self, timeout=30):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            leftover, self._buffer = self._buffer, []
+        if leftover:
+            self._write(leftover)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self._buffer) + len(self._inflight),
+                'batches': self.batches,
+                'written': self.written,
+                'failed': self.failed,
+                'blocked': self.blocked,
+                'inline_writes': self.inline_writes
+            }
@@ -0,0 +1,204 @@
+# Background job queue for long generations
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from storage import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobLimitError(Exception):
+    pass
+
+
+# Runs generation functions on a worker pool. Job state lives in SQLite so that
+# any worker process can answer status polls and cancel queued jobs.
+class JobManager:
+    def __init__(self, db_file='jobs.db', max_workers=4, per_user_limit=2, retention=3600, heartbeat_interval=10):
+        self.db_file = str(db_file)
+        self.max_workers = max_workers
+        self.per_user_limit = per_user_limit
+        self.retention = retention
+        # Each process refreshes heartbeat_at on the jobs it holds; an active job whose
+        # heartbeat is older than stale_after belongs to a worker that died (killed after
+        # gunicorn's graceful timeout, or crashed) and is marked failed
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = heartbeat_interval * 3
+        self._db = SQLiteConnections(self.db_file)
+        self._executor_lock = threading.Lock()
+        self._reset_workers()
+        conn = self._db.connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                email TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                status_code INTEGER,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner INTEGER,
+                heartbeat_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_email_status ON jobs (email, status);
+        """)
+        # Databases created before jobs carried an owner and heartbeat
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+        for column, kind in (('owner', 'INTEGER'), ('heartbeat_at', 'REAL')):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {kind}')
+
+    def _reset_workers(self):
+        self._executor = None
+        self._held = set()
+        self._heartbeat = None
+        self._stopped = threading.Event()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, args=(self._stopped,),
+                                                   name='job-heartbeat', daemon=True)
+                self._heartbeat.start()
+            return self._executor
+
+    # Drop the worker pool and heartbeat (e.g. in a freshly forked worker); they are recreated lazily
+    def reset(self):
+        with self._executor_lock:
+            self._stopped.set()
+            self._reset_workers()
+        self._db.reset()
+
+    # Refresh the heartbeat of every job this process holds, until `stopped` is set
+    def _beat(self, stopped):
+        while not stopped.wait(self.heartbeat_interval):
+            with self._executor_lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                self._db.connect().execute(
+                    f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({', '.join('?' * len(held))})",
+                    (time.time(), *held)
+                )
+            except Exception as e:
+                logger.warning(f"Job heartbeat failed: {str(e)}")
+
+    # Mark active jobs whose worker stopped heartbeating as failed (just `job_id`, or all)
+    def _expire_stale(self, conn, job_id=None):
+        query = ("UPDATE jobs SET status = 'failed', status_code = 503, result = ?, updated_at = ? "
+                 "WHERE status IN (?, ?) AND COALESCE(heartbeat_at, updated_at) < ?")
+        now = time.time()
+        params = (json.dumps({'error': 'The job was interrupted because its worker stopped. Please submit it again.'}),
+                  now, *ACTIVE_STATUSES, now - self.stale_after)
+        if job_id is not None:
+            query += ' AND id = ?'
+            params += (job_id,)
+        expired = conn.execute(query, params).rowcount
+        if expired:
+            logger.warning(f"Marked {expired} stale job(s) as failed")
+
+    # Queue fn(*args) for user `email`; fn must return (response body, status code)
+    def submit(self, email, kind, fn, *args):
+        self.prune()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._db.connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            self._expire_stale(conn)
+            active = conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE email = ? AND status IN (?, ?)',
+                (email, *ACTIVE_STATUSES)
+            ).fetchone()[0]
+            if active >= self.per_user_limit:
+                raise JobLimitError(f"Too many active jobs (limit {self.per_user_limit})")
+            conn.execute(
+                'INSERT INTO jobs (id, email, kind, status, created_at, updated_at, owner, heartbeat_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, email, kind, 'queued', now, now, os.getpid(), now)
+            )
+        # Carry the caller's context (user, priority) into the worker thread
+        context = contextvars.copy_context()
+        executor = self._get_executor()
+        with self._executor_lock:
+            self._held.add(job_id)
+        executor.submit(context.run, self._run, job_id, fn, args)
+        logger.info(f"Queued {kind} job {job_id} for user {email}")
+        return self.get(job_id, email)
+
+    def _run(self, job_id, fn, args):
+        try:
+            conn = self._db.connect()
+            started = conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ?, heartbeat_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), time.time(), job_id)
+            ).rowcount
+            if not started:
+                # Cancelled while queued
+                return
+
+            interrupted = None
+            try:
+                body, status_code = fn(*args)
+            except BaseException as e:
+                # Includes SystemExit and the like, so the row never stays 'running'
+                logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+                body, status_code = {'error': f'An internal error occurred: {str(e)}'}, 500
+                if not isinstance(e, Exception):
+                    interrupted = e
+
+            status = 'succeeded' if status_code < 400 else 'failed'
+            conn.execute(
+                'UPDATE jobs SET status = ?, status_code = ?, result = ?, updated_at = ? WHERE id = ?',
+                (status, status_code, json.dumps(body), time.time(), job_id)
+            )
+            logger.info(f"Job {job_id} {status}")
+            if interrupted is not None:
+                raise interrupted
+        finally:
+            with self._executor_lock:
+                self._held.discard(job_id)
+
+    def get(self, job_id, email):
+        conn = self._db.connect()
+        self._expire_stale(conn, job_id)
+        row = conn.execute(
+            'SELECT id, kind, status, status_code, result, created_at, updated_at FROM jobs WHERE id = ? AND email = ?',
+            (job_id, email)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'kind': row[1],
+            'status': row[2],
+            'statusCode': row[3],
+            'result': json.loads(row[4]) if row[4] else None,
+            'createdAt': row[5],
+            'updatedAt': row[6]
+        }
+
+    # Cancel a queued job; returns False if it is already running or finished
+    def cancel(self, job_id, email):
+        return self._db.connect().execute(
+            "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND email = ? AND status = 'queued'",
+            (time.time(), job_id, email)
+        ).rowcount == 1
+
+    # Fail jobs stranded by a dead worker, and forget jobs untouched for longer than the retention period
+    def prune(self):
+        conn = self._db.connect()
+        self._expire_stale(conn)
+        conn.execute('DELETE FROM jobs WHERE updated_at < ?', (time.time() - self.retention,))
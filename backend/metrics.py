@@ -0,0 +1,142 @@
+# Latency metrics in Prometheus text format, plus size-capped payload logging
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# 'full' logs whole payloads, 'sampled' logs a capped fraction of them, 'off' logs none
+LOG_PAYLOADS = os.environ.get('LOG_PAYLOADS', 'sampled')
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+LOG_PAYLOAD_MAX_CHARS = int(os.environ.get('LOG_PAYLOAD_MAX_CHARS', 500))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+# Per-process metrics; each worker exposes its own series on /metrics
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'Time spent handling HTTP requests', ('route', 'method', 'status'))
+stage_duration = Histogram(
+    'stage_duration_seconds', 'Time spent in each request stage', ('route', 'stage'))
+upstream_request_duration = Histogram(
+    'upstream_request_duration_seconds', 'Upstream HTTP call latency per attempt', ('upstream', 'status'))
+upstream_requests = Counter(
+    'upstream_requests_total', 'Upstream HTTP calls per attempt', ('upstream', 'status'))
+combined_generations = Counter(
+    'combined_generations_total', 'Single-call code + explanation generations by outcome', ('outcome',))
+translation_plans = Counter(
+    'translation_plans_total', 'Prompt translations by local detection decision', ('decision',))
+
+REGISTRY = [http_request_duration, stage_duration, upstream_request_duration, upstream_requests, combined_generations,
+            translation_plans]
+
+# Route label for stage timings, set per request and carried into worker threads
+current_route = contextvars.ContextVar('current_route', default='')
+
+
+def set_route(route):
+    current_route.set(route)
+
+
+# Time a block of work as one stage of the current request
+@contextmanager
+def timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - started, route=current_route.get(), stage=stage)
+
+
+# Render all metrics plus gauges built from {name: {stat: value}} dictionaries
+def render(gauges=None):
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for group, stats in (gauges or {}).items():
+        for stat, value in stats.items():
+            if isinstance(value, (int, float)):
+                lines.append(f"{group}_{stat} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+# Log a payload according to LOG_PAYLOADS, truncated to LOG_PAYLOAD_MAX_CHARS
+def log_payload(logger, message, payload, level=logging.INFO):
+    if LOG_PAYLOADS == 'off':
+        return
+    if LOG_PAYLOADS == 'sampled':
+        if random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+            return
+        text = str(payload)
+        if len(text) > LOG_PAYLOAD_MAX_CHARS:
+            text = f"{text[:LOG_PAYLOAD_MAX_CHARS]}... ({len(text)} chars)"
+    else:
+        text = payload
+    logger.log(level, f"{message}: {text}")
@@ -0,0 +1,147 @@
+# Password hashing with scrypt, evaluated in a bounded process pool so that
+# CPU-heavy KDF runs never hold a request thread's GIL
+import base64
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Processes evaluating the KDF in each server worker; 0 hashes inline on the calling
+# thread. By default the host's CPUs are shared out over the WEB_CONCURRENCY workers.
+WEB_WORKERS = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS',
+                                           max(1, min(4, (os.cpu_count() or 1) // WEB_WORKERS))))
+# Calibration aims for this much time per hash; PASSWORD_SCRYPT_N skips calibration
+PASSWORD_HASH_TARGET_MS = float(os.environ.get('PASSWORD_HASH_TARGET_MS', 100))
+PASSWORD_SCRYPT_MIN_N = 2 ** 14
+PASSWORD_SCRYPT_MAX_N = int(os.environ.get('PASSWORD_SCRYPT_MAX_N', 2 ** 16))
+
+SCHEME = 'scrypt'
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# Current cost parameters; set by calibrate()
+scrypt_n = int(os.environ.get('PASSWORD_SCRYPT_N', PASSWORD_SCRYPT_MIN_N))
+scrypt_r = int(os.environ.get('PASSWORD_SCRYPT_R', 8))
+scrypt_p = int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+
+_executor = None
+_inline = False
+_lock = threading.Lock()
+_dummy_hash = None
+
+
+def _kdf(password, salt, n, r, p):
+    # scrypt needs 128 * n * r bytes; leave headroom over hashlib's 32 MiB default
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=HASH_BYTES)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            # Fork so children start without re-importing the app
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context('fork')
+            )
+        return _executor
+
+
+# Drop the pool (e.g. in a freshly forked worker); it is recreated lazily
+def reset_executor():
+    global _executor, _inline
+    with _lock:
+        _executor = None
+        _inline = False
+
+
+# Fork the pool's processes now. Call while the process runs no other threads (gunicorn
+# post_fork, or before the dev server starts): a child forked from a multi-threaded
+# process can hang on a lock another thread held at fork time.
+def start_executor():
+    if PASSWORD_HASH_WORKERS > 0:
+        get_executor().submit(int).result()
+
+
+def _run_kdf(password, salt, n, r, p):
+    global _inline
+    if PASSWORD_HASH_WORKERS <= 0 or _inline:
+        return _kdf(password, salt, n, r, p)
+    try:
+        return get_executor().submit(_kdf, password, salt, n, r, p).result()
+    except BrokenProcessPool:
+        # A child died (e.g. OOM-killed). Forking a new pool from this now multi-threaded
+        # worker could hang, so hash inline until the worker is recycled.
+        logger.warning("Password hash pool broke; hashing inline in this worker from now on")
+        with _lock:
+            _inline = True
+        get_executor().shutdown(wait=False, cancel_futures=True)
+        return _kdf(password, salt, n, r, p)
+
+
+# Pick the largest power-of-two N whose hash time stays within target_ms
+def calibrate(target_ms=PASSWORD_HASH_TARGET_MS):
+    global scrypt_n
+    if 'PASSWORD_SCRYPT_N' in os.environ:
+        return scrypt_n
+
+    n = PASSWORD_SCRYPT_MIN_N
+    salt = secrets.token_bytes(SALT_BYTES)
+    while n < PASSWORD_SCRYPT_MAX_N:
+        started = time.perf_counter()
+        _kdf(b'calibration', salt, n, scrypt_r, scrypt_p)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        # Cost is linear in N, so doubling N doubles the time
+        if elapsed_ms * 2 > target_ms:
+            break
+        n *= 2
+    scrypt_n = n
+    logger.info(f"Calibrated scrypt N={scrypt_n} r={scrypt_r} p={scrypt_p} for a {target_ms:.0f}ms target")
+    return scrypt_n
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+# Encoded as scrypt$N$r$p$salt$hash (base64)
+def hash_password(password):
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _run_kdf(password.encode('utf-8'), salt, scrypt_n, scrypt_r, scrypt_p)
+    return f"{SCHEME}${scrypt_n}${scrypt_r}${scrypt_p}${_b64(salt)}${_b64(digest)}"
+
+
+def _parse(encoded):
+    scheme, n, r, p, salt, digest = encoded.split('$')
+    if scheme != SCHEME:
+        raise ValueError(f"Unknown password hash scheme: {scheme}")
+    return int(n), int(r), int(p), base64.b64decode(salt), base64.b64decode(digest)
+
+
+# Check a password against an encoded hash. With encoded=None a throwaway hash is
+# still evaluated so unknown accounts take as long to reject as wrong passwords.
+def verify_password(password, encoded):
+    global _dummy_hash
+    if encoded is None:
+        if _dummy_hash is None:
+            _dummy_hash = hash_password(secrets.token_hex(16))
+        verify_password(password, _dummy_hash)
+        return False
+    n, r, p, salt, digest = _parse(encoded)
+    candidate = _run_kdf(password.encode('utf-8'), salt, n, r, p)
+    return hmac.compare_digest(candidate, digest)
+
+
+# True when the hash was made with a lower cost than the current parameters. Stronger
+# hashes are kept, so calibration noise between workers doesn't rehash on every login.
+def needs_rehash(encoded):
+    n, r, p, _, _ = _parse(encoded)
+    return n < scrypt_n or r < scrypt_r or p < scrypt_p
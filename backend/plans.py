@@ -0,0 +1,159 @@
+# Split an app plan (markdown from generate_app_plan_from_prompt) into independently
+# generated parts, and stitch the generated parts back into one multi-file bundle
+import re
+
+# Top-level sections that describe the whole app; they go into the context header
+# every part is generated with instead of becoming parts themselves
+CONTEXT_TITLES = ('introduction', 'overview', 'summary', 'purpose', 'goal', 'technolog', 'tech stack', 'stack',
+                  'requirement', 'implementation', 'steps')
+# Top-level sections with nothing to generate
+SKIPPED_TITLES = ('conclusion', 'timeline', 'roadmap', 'future', 'next steps')
+CONTEXT_MAX_CHARS = 2000
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)[\s#]*$')
+_FENCE = re.compile(r'^\s*(```|~~~)')
+# "### File: path" (or **File:** `path`) followed by a fenced block
+_FILE_BLOCK = re.compile(r'^[#*\s]*File:[*\s]*`?([^`*\s]+)`?[*\s]*\n\s*(```|~~~)([\w+-]*)[^\n]*\n(.*?)^\2[ \t]*$',
+                         re.MULTILINE | re.DOTALL | re.IGNORECASE)
+
+
+# One part of the plan to generate on its own
+class PlanSection:
+    def __init__(self, title, body):
+        self.title = title
+        self.body = body
+
+    def render(self):
+        return f"## {self.title}\n{self.body}".strip()
+
+
+# Headings outside code blocks as (level, title, body); text before the first heading
+# is returned with level 0
+def _headings(text):
+    nodes = [(0, '', [])]
+    fenced = False
+    for line in text.splitlines():
+        if _FENCE.match(line):
+            fenced = not fenced
+        match = None if fenced else _HEADING.match(line)
+        if match:
+            nodes.append((len(match.group(1)), match.group(2).strip().strip('*'), []))
+        else:
+            nodes[-1][2].append(line)
+    return [(level, title, '\n'.join(lines).strip()) for level, title, lines in nodes]
+
+
+def _matches(title, words):
+    lowered = title.lower()
+    return any(word in lowered for word in words)
+
+
+# Parse a plan into (title, context header, [PlanSection]). Each top-level section
+# becomes a part; one with two or more subsections (e.g. Architecture > Frontend,
+# Backend) becomes one part per subsection, each carrying the section's introduction.
+def parse_plan(text):
+    nodes = _headings(text)
+    title = ''
+    if len(nodes) > 1 and nodes[1][0] == 1 and not any(level == 1 for level, _, _ in nodes[2:]):
+        title = nodes[1][1]
+        nodes = [nodes[0]] + nodes[2:]
+    if len(nodes) == 1:
+        return title, text.strip(), []
+    top = min(level for level, _, _ in nodes[1:])
+
+    # Top-level sections as (title, own body, [(level, subtitle, body)])
+    groups = []
+    for level, heading, body in nodes[1:]:
+        if level == top or not groups:
+            groups.append((heading, body, []))
+        else:
+            groups[-1][2].append((level, heading, body))
+
+    context = [nodes[0][2]] if nodes[0][2] else []
+    sections = []
+    for heading, body, children in groups:
+        if _matches(heading, SKIPPED_TITLES):
+            continue
+        if _matches(heading, CONTEXT_TITLES):
+            nested = '\n'.join(f"{child}:\n{child_body}" for _, child, child_body in children)
+            context.append(f"{heading}:\n{body}\n{nested}".strip())
+            continue
+        nested = '\n'.join(f"{'#' * level} {child}\n{child_body}" for level, child, child_body in children)
+        child_level = min((level for level, _, _ in children), default=None)
+        direct = [index for index, (level, _, _) in enumerate(children) if level == child_level]
+        if len(direct) < 2:
+            sections.append(PlanSection(heading, f"{body}\n{nested}".strip()))
+            continue
+        for position, start in enumerate(direct):
+            end = direct[position + 1] if position + 1 < len(direct) else len(children)
+            _, child, child_body = children[start]
+            deeper = '\n'.join(f"{'#' * level} {name}\n{name_body}" for level, name, name_body in children[start + 1:end])
+            sections.append(PlanSection(f"{heading} / {child}", f"{body}\n\n{child_body}\n{deeper}".strip()))
+
+    header = '\n\n'.join(context)
+    if len(header) > CONTEXT_MAX_CHARS:
+        header = header[:CONTEXT_MAX_CHARS].rsplit('\n', 1)[0]
+    return title, header, sections
+
+
+# Merge adjacent sections so there are at most `limit` (keeps plan order)
+def merge_sections(sections, limit):
+    if len(sections) <= limit:
+        return sections
+    size, extra = divmod(len(sections), limit)
+    merged = []
+    start = 0
+    for index in range(limit):
+        end = start + size + (1 if index < extra else 0)
+        group = sections[start:end]
+        merged.append(PlanSection(' + '.join(section.title for section in group),
+                                  '\n\n'.join(section.render() for section in group)))
+        start = end
+    return merged
+
+
+# Files in one part's output as [(path, language, content)], plus any text that was not
+# part of a file
+def parse_files(output):
+    files = []
+    notes = []
+    position = 0
+    for match in _FILE_BLOCK.finditer(output):
+        notes.append(output[position:match.start()].strip())
+        files.append((match.group(1), match.group(3), match.group(4).rstrip('\n')))
+        position = match.end()
+    notes.append(output[position:].strip())
+    return files, '\n\n'.join(note for note in notes if note)
+
+
+# Stitch generated parts into one bundle, in plan order whatever order they finished in.
+# `outputs` is [(section title, output text or None if it failed)]. A path produced by
+# more than one part keeps its first position and gets the later content appended.
+# Returns (bundle markdown, [{'path', 'language', 'content', 'section'}]).
+def stitch_bundle(title, outputs):
+    files = {}
+    notes = []
+    missing = []
+    for section, output in outputs:
+        if output is None:
+            missing.append(section)
+            continue
+        section_files, section_notes = parse_files(output)
+        for path, language, content in section_files:
+            if path in files:
+                files[path]['content'] += f"\n\n{content}"
+            else:
+                files[path] = {'path': path, 'language': language, 'content': content, 'section': section}
+        if section_notes:
+            notes.append((section, section_notes))
+
+    parts = [f"# {title}" if title else "# Generated code"]
+    if files:
+        parts.append("Files:\n" + '\n'.join(f"- {path}" for path in files))
+    for file in files.values():
+        parts.append(f"### File: {file['path']}\n```{file['language']}\n{file['content']}\n```")
+    for section, text in notes:
+        parts.append(f"## {section}\n{text}")
+    if missing:
+        parts.append("Not generated (upstream error): " + ', '.join(missing))
+    return '\n\n'.join(parts) + '\n', list(files.values())
@@ -0,0 +1,214 @@
+# Prompt template registry. Each Groq prompt is defined once; its request body is
+# pre-encoded to bytes around the user-supplied fields, so a call only escapes and
+# splices in those fields instead of rebuilding and re-serializing the whole body.
+import string
+
+from upstream import ChatRequest, GROQ_MODEL, encode_json
+
+
+# Escape text for use inside a JSON string literal (without the surrounding quotes)
+def _escape(text):
+    return encode_json(text)[1:-1]
+
+
+class PromptTemplate:
+    def __init__(self, name, system, user, max_tokens, temperature=0.7, model=None):
+        self.name = name
+        self.system = system
+        self.user = user
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.model = model or GROQ_MODEL
+
+        # Segments of the body: bytes are static, strings name a field to splice in
+        segments = [b'{"model":' + encode_json(self.model) + b',"messages":[{"role":"system","content":"']
+        self._add_content(segments, system)
+        segments.append(b'"},{"role":"user","content":"')
+        self._add_content(segments, user)
+        segments.append(
+            b'"}],"temperature":' + encode_json(temperature) + b',"max_tokens":' + encode_json(max_tokens) + b'}'
+        )
+
+        self._segments = []
+        for segment in segments:
+            if isinstance(segment, bytes) and self._segments and isinstance(self._segments[-1], bytes):
+                self._segments[-1] += segment
+            else:
+                self._segments.append(segment)
+        self.fields = {segment for segment in self._segments if isinstance(segment, str)}
+        self._static_chars = sum(
+            len(literal) for content in (system, user) for literal, _, _, _ in string.Formatter().parse(content)
+        )
+
+    def _add_content(self, segments, content):
+        for literal, field, _, _ in string.Formatter().parse(content):
+            if literal:
+                segments.append(_escape(literal))
+            if field is not None:
+                segments.append(field)
+
+    # Build the ChatRequest for these field values
+    def render(self, **fields):
+        escaped = {name: _escape(str(fields[name])) for name in self.fields}
+        body = b''.join(segment if isinstance(segment, bytes) else escaped[segment] for segment in self._segments)
+        prompt_chars = self._static_chars + sum(
+            len(str(fields[segment])) for segment in self._segments if isinstance(segment, str)
+        )
+        return ChatRequest(body, self.max_tokens, prompt_chars)
+
+    # The equivalent messages list (for logging and comparison with chat_request)
+    def messages(self, **fields):
+        return [
+            {"role": "system", "content": self.system.format(**fields)},
+            {"role": "user", "content": self.user.format(**fields)}
+        ]
+
+
+# Markers separating the sections of a combined code + explanation response
+CODE_MARKER = '<<<CODE>>>'
+EXPLANATION_MARKER = '<<<EXPLANATION>>>'
+
+
+class SectionParseError(ValueError):
+    pass
+
+
+# Incremental parser for delimited responses: feed() deltas as they stream in and get
+# back (section, text) pieces that are safe to forward. Text that could be the start of
+# the next marker is held back until it is resolved. A response that does not open with
+# the first marker within preamble_limit characters raises SectionParseError, so a
+# streaming caller can give up before forwarding anything.
+class SectionParser:
+    def __init__(self, sections=(('code', CODE_MARKER), ('explanation', EXPLANATION_MARKER)), preamble_limit=200):
+        self._sections = list(sections)
+        self.preamble_limit = preamble_limit
+        self._index = -1
+        self._buffer = ''
+        self._preamble = 0
+        self._section_start = False
+        self.text = {name: '' for name, _ in self._sections}
+
+    def _next_marker(self):
+        if self._index + 1 < len(self._sections):
+            return self._sections[self._index + 1][1]
+        return None
+
+    def _emit(self, text, pieces):
+        if self._index < 0:
+            self._preamble += len(text)
+            if self._preamble > self.preamble_limit:
+                raise SectionParseError("Response does not start with a section marker")
+            return
+        if self._section_start:
+            # Drop the line break that follows a marker
+            text = text.lstrip('\n')
+            self._section_start = not text
+        if text:
+            name = self._sections[self._index][0]
+            self.text[name] += text
+            pieces.append((name, text))
+
+    def feed(self, delta):
+        pieces = []
+        self._buffer += delta
+        while True:
+            marker = self._next_marker()
+            if marker is None:
+                self._emit(self._buffer, pieces)
+                self._buffer = ''
+                return pieces
+            position = self._buffer.find(marker)
+            if position >= 0:
+                self._emit(self._buffer[:position], pieces)
+                self._buffer = self._buffer[position + len(marker):]
+                self._index += 1
+                self._section_start = True
+                continue
+            # Hold back the longest tail that could still grow into the marker
+            hold = next((size for size in range(min(len(marker) - 1, len(self._buffer)), 0, -1)
+                         if marker.startswith(self._buffer[-size:])), 0)
+            self._emit(self._buffer[:len(self._buffer) - hold], pieces)
+            self._buffer = self._buffer[len(self._buffer) - hold:]
+            return pieces
+
+    # Flush held-back text at the end of the response; returns the final pieces
+    def finish(self):
+        pieces = []
+        self._emit(self._buffer, pieces)
+        self._buffer = ''
+        return pieces
+
+    # Whether every section marker was seen
+    @property
+    def complete(self):
+        return self._index == len(self._sections) - 1
+
+    # Stripped text of every section
+    def result(self):
+        return {name: text.strip() for name, text in self.text.items()}
+
+
+# Parse a complete delimited response into {section: text}
+def parse_sections(text):
+    parser = SectionParser()
+    parser.feed(text)
+    parser.finish()
+    if not parser.complete:
+        raise SectionParseError("Response is missing sections")
+    sections = parser.result()
+    if not all(sections.values()):
+        raise SectionParseError("Response has an empty section")
+    return sections
+
+
+PROMPTS = {
+    'code': PromptTemplate(
+        'code',
+        "You are a helpful programming assistant. Generate clean, efficient, and well-documented code.",
+        "Write a Python code for: {prompt}. Include comments explaining the code.",
+        max_tokens=2000
+    ),
+    'explain': PromptTemplate(
+        'explain',
+        "You are a helpful programming assistant. Provide a clear and concise explanation of the code in {target_language}.",
+        "Explain the following code:\n{code}",
+        max_tokens=1000
+    ),
+    # Code and its explanation in one round trip (see SectionParser)
+    'code_with_explanation': PromptTemplate(
+        'code_with_explanation',
+        "You are a helpful programming assistant. Generate clean, efficient, and well-documented code, then explain it clearly and concisely in {target_language}. "
+        "Reply with exactly two sections and nothing else: a line containing only " + CODE_MARKER + " followed by the code, "
+        "then a line containing only " + EXPLANATION_MARKER + " followed by the explanation in {target_language}.",
+        "Write a Python code for: {prompt}. Include comments explaining the code.",
+        max_tokens=3000
+    ),
+    'app_plan': PromptTemplate(
+        'app_plan',
+        "You are an AI assistant specialized in creating detailed application blueprints in markdown format. Provide a clear structure including sections like Introduction, Features, Technologies, Architecture, and rough steps for implementation. The plan should be comprehensive and easy to understand.",
+        "Create an app plan for: {prompt}. Provide the output in markdown format.",
+        max_tokens=2000
+    ),
+    'code_from_plan': PromptTemplate(
+        'code_from_plan',
+        "You are an AI assistant specialized in generating code based on a provided application plan. Write the code based on the detailed blueprint. Provide clear and concise code.",
+        "Generate code based on the following app plan:\n\n{app_plan_text}",
+        max_tokens=4000
+    ),
+    # One part of a plan, generated alongside the others (see plans.py)
+    'code_for_plan_section': PromptTemplate(
+        'code_for_plan_section',
+        "You are an AI assistant specialized in generating code based on a provided application plan. The application is "
+        "built in parts that are written separately and combined afterwards, so write complete code for the part you are "
+        "given only, consistent with the shared context. Put each file under a line '### File: <relative path>' followed "
+        "by a single fenced code block.",
+        "Application: {title}\n\nShared context:\n{context}\n\nParts of the application: {parts}\n\n"
+        "Write the code for this part:\n\n{section}",
+        max_tokens=2000
+    )
+}
+
+# The website explanation is not sent to Groq; it is shown next to the generated page. Only
+# the lead is translated (once per language); the user's own words follow it
+WEBSITE_EXPLANATION_LEAD = "This website was generated based on your description"
+WEBSITE_EXPLANATION = WEBSITE_EXPLANATION_LEAD + ": {prompt}"
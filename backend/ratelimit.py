@@ -0,0 +1,155 @@
+# Upstream rate limiting: token buckets for requests/minute and tokens/minute,
+# with a priority queue and per-user fair share in front of them
+import itertools
+import threading
+import time
+from collections import deque
+
+from storage import SQLiteConnections
+
+# Call priorities; lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+# Token buckets kept in SQLite so every worker process draws from the same budget.
+# limits maps bucket name -> capacity per minute; a capacity of 0 disables that bucket.
+class SQLiteBuckets:
+    def __init__(self, db_file, limits):
+        self.db_file = str(db_file)
+        self.limits = {name: capacity for name, capacity in limits.items() if capacity > 0}
+        self._db = SQLiteConnections(self.db_file)
+        self._db.connect().execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    # Forget connections (e.g. ones inherited across fork); new ones open lazily
+    def reset(self):
+        self._db.reset()
+
+    @property
+    def enabled(self):
+        return bool(self.limits)
+
+    # Take `costs` from every bucket atomically. Returns 0 on success, otherwise the
+    # number of seconds until the scarcest bucket could cover its cost.
+    def try_acquire(self, costs):
+        conn = self._db.connect()
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            levels = {}
+            wait = 0
+            for name, capacity in self.limits.items():
+                row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE name = ?', (name,)).fetchone()
+                tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * capacity / 60)
+                # A single call larger than the bucket can never fit; charge it the full bucket instead
+                cost = min(costs.get(name, 0), capacity)
+                levels[name] = tokens - cost
+                if tokens < cost:
+                    wait = max(wait, (cost - tokens) * 60 / capacity)
+            if wait:
+                return wait
+            conn.executemany(
+                'INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)',
+                [(name, level, now) for name, level in levels.items()]
+            )
+        return 0
+
+
+# Orders waiting calls by priority, then by how many calls the user was granted
+# recently, then by arrival; only the head of the queue draws from the buckets.
+class Scheduler:
+    def __init__(self, buckets, max_wait=30, fair_window=60):
+        self.buckets = buckets
+        self.max_wait = max_wait
+        self.fair_window = fair_window
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._recent = {}
+        self._pruned_at = time.monotonic()
+        self.granted = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+    def _recent_grants(self, user):
+        grants = self._recent.get(user)
+        if not grants:
+            return 0
+        cutoff = time.monotonic() - self.fair_window
+        while grants and grants[0] < cutoff:
+            grants.popleft()
+        if not grants:
+            del self._recent[user]
+        return len(grants)
+
+    # Forget users with no grants in the fair window, at most once per window
+    def _prune_recent(self):
+        now = time.monotonic()
+        if now - self._pruned_at < self.fair_window:
+            return
+        self._pruned_at = now
+        for user in list(self._recent):
+            self._recent_grants(user)
+
+    def _head(self):
+        return min(self._waiters, key=lambda waiter: (waiter[0], self._recent_grants(waiter[2]), waiter[1]))
+
+    # Block until the call may proceed; raises RateLimitTimeout after max_wait seconds
+    def acquire(self, estimated_tokens, priority=PRIORITY_INTERACTIVE, user=None):
+        if not self.buckets.enabled:
+            return
+
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        waiter = (priority, next(self._seq), user)
+        with self._cond:
+            self._waiters.append(waiter)
+        try:
+            while True:
+                with self._cond:
+                    while self._head() is not waiter:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RateLimitTimeout("Timed out waiting for upstream rate limit")
+                        self._cond.wait(remaining)
+
+                wait = self.buckets.try_acquire({'requests': 1, 'tokens': estimated_tokens})
+                if not wait:
+                    break
+                if time.monotonic() + wait > deadline:
+                    raise RateLimitTimeout("Upstream rate limit budget exhausted")
+                time.sleep(wait)
+
+            with self._cond:
+                self._prune_recent()
+                self._recent.setdefault(user, deque()).append(time.monotonic())
+                self.granted += 1
+                self.wait_seconds += time.monotonic() - started
+        except RateLimitTimeout:
+            with self._cond:
+                self.timeouts += 1
+            raise
+        finally:
+            with self._cond:
+                self._waiters.remove(waiter)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queued': len(self._waiters),
+                'granted': self.granted,
+                'timeouts': self.timeouts,
+                'wait_seconds': round(self.wait_seconds, 3)
+            }
+
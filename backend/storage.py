@@ -0,0 +1,427 @@
+# Storage backends for users and generation history
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Number of generations kept per user
+HISTORY_LIMIT = 10
+
+
+# Per-thread connections to one SQLite file, opened with the settings every SQLite store
+# here shares: WAL (readers proceed while a writer commits), synchronous=NORMAL, a 30s
+# busy timeout and enforced foreign keys
+class SQLiteConnections:
+    def __init__(self, db_file):
+        self.db_file = str(db_file)
+        self.reset()
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    # Forget connections (e.g. ones inherited across fork); new ones open lazily
+    def reset(self):
+        self._local = threading.local()
+
+
+# Legacy backend: whole-file JSON documents (users.json / generation_history.json)
+class JSONStorage:
+    def __init__(self, users_file='users.json', history_file='generation_history.json'):
+        self.users_file = Path(users_file)
+        self.history_file = Path(history_file)
+        # Serializes read-modify-write cycles within this process
+        self._lock = threading.RLock()
+
+    def _read(self, path):
+        if not path.exists():
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, path, data):
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        pass
+
+    def load_users(self):
+        with self._lock:
+            return self._read(self.users_file)
+
+    def save_users(self, users):
+        with self._lock:
+            self._write(self.users_file, users)
+
+    def get_user(self, email):
+        return self.load_users().get(email)
+
+    def create_user(self, email, user):
+        with self._lock:
+            users = self._read(self.users_file)
+            if email in users:
+                return False
+            users[email] = user
+            self._write(self.users_file, users)
+            return True
+
+    def update_user(self, email, user):
+        with self._lock:
+            users = self._read(self.users_file)
+            users[email] = user
+            self._write(self.users_file, users)
+
+    def load_history(self):
+        with self._lock:
+            return self._read(self.history_file)
+
+    def get_history(self, email):
+        return self.load_history().get(email, [])
+
+    def append_history(self, email, entry, limit=HISTORY_LIMIT):
+        with self._lock:
+            history = self._read(self.history_file)
+            history[email] = [entry] + history.get(email, [])[:limit - 1]
+            self._write(self.history_file, history)
+
+
+# Default backend: SQLite in WAL mode, keyed by email
+class SQLiteStorage:
+    def __init__(self, db_file='app_data.db'):
+        self.db_file = str(db_file)
+        self._db = SQLiteConnections(self.db_file)
+        self._init_schema()
+
+    # Forget connections (e.g. ones inherited across fork); new ones open lazily
+    def reset(self):
+        self._db.reset()
+
+    def _init_schema(self):
+        conn = self._db.connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS users (
+                email TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_email_id ON history (email, id DESC);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def load_users(self):
+        rows = self._db.connect().execute('SELECT email, data FROM users')
+        return {email: json.loads(data) for email, data in rows}
+
+    def save_users(self, users):
+        conn = self._db.connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT OR REPLACE INTO users (email, data) VALUES (?, ?)',
+                [(email, json.dumps(user)) for email, user in users.items()]
+            )
+
+    def get_user(self, email):
+        row = self._db.connect().execute('SELECT data FROM users WHERE email = ?', (email,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def create_user(self, email, user):
+        cursor = self._db.connect().execute(
+            'INSERT OR IGNORE INTO users (email, data) VALUES (?, ?)',
+            (email, json.dumps(user))
+        )
+        return cursor.rowcount == 1
+
+    def update_user(self, email, user):
+        self._db.connect().execute(
+            'INSERT OR REPLACE INTO users (email, data) VALUES (?, ?)',
+            (email, json.dumps(user))
+        )
+
+    def load_history(self):
+        history = {}
+        rows = self._db.connect().execute('SELECT email, data FROM history ORDER BY email, id DESC')
+        for email, data in rows:
+            history.setdefault(email, []).append(json.loads(data))
+        return history
+
+    def get_history(self, email, limit=HISTORY_LIMIT):
+        rows = self._db.connect().execute(
+            'SELECT data FROM history WHERE email = ? ORDER BY id DESC LIMIT ?',
+            (email, limit)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def append_history(self, email, entry, limit=HISTORY_LIMIT):
+        conn = self._db.connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO history (email, data) VALUES (?, ?)', (email, json.dumps(entry)))
+            # Enforce the per-user cap inside the same transaction
+            conn.execute("""
+                DELETE FROM history WHERE email = ? AND id NOT IN (
+                    SELECT id FROM history WHERE email = ? ORDER BY id DESC LIMIT ?
+                )
+            """, (email, email, limit))
+
+    # One-shot import of the legacy JSON files; later calls are no-ops
+    def migrate_from_json(self, users_file='users.json', history_file='generation_history.json'):
+        conn = self._db.connect()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return False
+
+        legacy = JSONStorage(users_file, history_file)
+        users = legacy.load_users()
+        history = legacy.load_history()
+
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            # Another process may have migrated while the JSON files were being read
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                return False
+            conn.executemany(
+                'INSERT OR IGNORE INTO users (email, data) VALUES (?, ?)',
+                [(email, json.dumps(user)) for email, user in users.items()]
+            )
+            for email, entries in history.items():
+                # Stored most recent first; insert oldest first so ids follow time order
+                conn.executemany(
+                    'INSERT INTO history (email, data) VALUES (?, ?)',
+                    [(email, json.dumps(entry)) for entry in reversed(entries[:HISTORY_LIMIT])]
+                )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', '1')")
+
+        logger.info(f"Migrated {len(users)} users and {len(history)} history lists from JSON to {self.db_file}")
+        return True
+
+
+# History backend: one append-only JSON-lines file per user, compacted back to the
+# cap once enough entries pile up. Reading a user's history touches only their shard.
+class ShardedLogHistory:
+    def __init__(self, root_dir='history_log', compact_factor=3):
+        self.root_dir = Path(root_dir)
+        self.compact_factor = compact_factor
+        # Appends since the last compaction, per email (approximate across processes)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    def reset(self):
+        pass
+
+    def _paths(self, email):
+        digest = hashlib.sha256(email.encode('utf-8')).hexdigest()
+        shard_dir = self.root_dir / digest[:2]
+        return shard_dir / f"{digest}.jsonl", shard_dir / f"{digest}.lock"
+
+    # Locks live in a separate file that is never replaced, so compaction's atomic
+    # rename cannot strand a writer on the old inode
+    def _locked(self, lock_path, mode):
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(lock_path, 'a')
+        fcntl.flock(lock_file, mode)
+        return lock_file
+
+    def _read_entries(self, log_path):
+        if not log_path.exists():
+            return []
+        entries = []
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Ignore a torn trailing line
+                    continue
+        return entries
+
+    def get_history(self, email, limit=HISTORY_LIMIT):
+        log_path, lock_path = self._paths(email)
+        with self._locked(lock_path, fcntl.LOCK_SH):
+            entries = self._read_entries(log_path)
+        return list(reversed(entries[-limit:]))
+
+    def append_history(self, email, entry, limit=HISTORY_LIMIT):
+        log_path, lock_path = self._paths(email)
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._locked(lock_path, fcntl.LOCK_EX):
+            if not log_path.exists():
+                # Record the owner so shards can be mapped back to emails
+                log_path.with_suffix('.owner').write_text(email, encoding='utf-8')
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+            with self._pending_lock:
+                pending = self._pending.get(email)
+                if pending is None:
+                    pending = len(self._read_entries(log_path))
+                else:
+                    pending += 1
+                self._pending[email] = pending
+
+            if pending > limit * self.compact_factor:
+                self._compact(log_path, limit)
+                with self._pending_lock:
+                    self._pending[email] = limit
+
+    # Rewrite the shard with only the newest `limit` entries; caller holds the lock
+    def _compact(self, log_path, limit):
+        entries = self._read_entries(log_path)[-limit:]
+        tmp_path = log_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        os.replace(tmp_path, log_path)
+
+    # Full dump of every user's history (slow; for export only)
+    def load_history(self):
+        history = {}
+        for owner_path in self.root_dir.glob('*/*.owner'):
+            email = owner_path.read_text(encoding='utf-8')
+            history[email] = self.get_history(email)
+        return history
+
+
+# Content-addressed store for large history bodies: zlib-compressed JSON files named
+# by the sha256 of their content, so identical generations are stored once
+class BlobStore:
+    def __init__(self, root_dir='history_blobs', level=6):
+        self.root_dir = Path(root_dir)
+        self.level = level
+        self._next_claim = 0.0
+
+    def reset(self):
+        self._next_claim = 0.0
+
+    def _path(self, digest):
+        return self.root_dir / digest[:2] / digest
+
+    # Store a JSON-serializable body; returns its content hash
+    def put(self, data):
+        encoded = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(encoded).hexdigest()
+        path = self._path(digest)
+        if path.exists():
+            # Refresh the mtime so a concurrent collect() treats it as new
+            os.utime(path)
+            return digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(zlib.compress(encoded, self.level))
+        os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest):
+        try:
+            return json.loads(zlib.decompress(self._path(digest).read_bytes()))
+        except FileNotFoundError:
+            return None
+
+    # Delete blobs not in `live` that are older than min_age seconds; returns how many
+    def collect(self, live, min_age=3600):
+        cutoff = time.time() - min_age
+        removed = 0
+        for path in self.root_dir.glob('*/*'):
+            if path.name in live or path.suffix == '.tmp' or path.stat().st_mtime > cutoff:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    # Claim the next scheduled collection: True in at most one process per `interval`
+    # seconds, tracked by the mtime of a marker file that is only touched under its lock
+    def claim_collection(self, interval):
+        now = time.monotonic()
+        if now < self._next_claim:
+            return False
+        self._next_claim = now + min(interval, 60)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        marker = self.root_dir / '.collected'
+        with open(marker, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            if time.time() - marker.stat().st_mtime < interval:
+                return False
+            os.utime(marker)
+            return True
+
+
+# Blob hashes referenced by any stored history entry
+def referenced_blobs(history_store):
+    return {entry['blob'] for entries in history_store.load_history().values() for entry in entries if 'blob' in entry}
+
+
+# Build the storage backend selected by STORAGE_BACKEND ('sqlite' or 'json')
+def create_storage(backend=None):
+    backend = backend or os.environ.get('STORAGE_BACKEND', 'sqlite')
+    users_file = os.environ.get('USERS_DB_FILE', 'users.json')
+    history_file = os.environ.get('HISTORY_DB_FILE', 'generation_history.json')
+
+    if backend == 'json':
+        return JSONStorage(users_file, history_file)
+    if backend == 'sqlite':
+        storage = SQLiteStorage(os.environ.get('STORAGE_DB_FILE', 'app_data.db'))
+        storage.migrate_from_json(users_file, history_file)
+        return storage
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+# History store selected by HISTORY_BACKEND: 'log' for per-user sharded files,
+# otherwise history stays in the main storage backend
+def create_history_store(storage, backend=None):
+    backend = backend or os.environ.get('HISTORY_BACKEND', 'storage')
+    if backend == 'log':
+        return ShardedLogHistory(os.environ.get('HISTORY_LOG_DIR', 'history_log'))
+    if backend == 'storage':
+        return storage
+    raise ValueError(f"Unknown history backend: {backend}")
+
+
+def create_blob_store():
+    return BlobStore(os.environ.get('HISTORY_BLOB_DIR', 'history_blobs'))
+
+
+# Usage: python storage.py migrate [users.json] [generation_history.json] [app_data.db]
+#        python storage.py gc-blobs    (delete history blobs no entry refers to now; the
+#                                       app also does this every HISTORY_BLOB_GC_INTERVAL)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) >= 2 and sys.argv[1] == 'gc-blobs':
+        live = referenced_blobs(create_history_store(create_storage()))
+        print(f"Removed {create_blob_store().collect(live)} unreferenced blobs")
+        sys.exit(0)
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print("Usage: python storage.py migrate [users.json] [generation_history.json] [app_data.db]")
+        print("       python storage.py gc-blobs")
+        sys.exit(1)
+    args = sys.argv[2:] + [None] * 3
+    target = SQLiteStorage(args[2] or 'app_data.db')
+    if not target.migrate_from_json(args[0] or 'users.json', args[1] or 'generation_history.json'):
+        print("JSON data was already migrated")
@@ -0,0 +1,122 @@
+# Refresh-token rotation and revocation index
+import threading
+import time
+
+from cache import TTLCache
+from storage import SQLiteConnections
+
+
+# Tracks consumed refresh-token ids (jti) and revoked token families. Each login
+# starts a family; every refresh consumes one refresh token and issues the next
+# in the same family. Presenting an already consumed refresh token means it was
+# copied, so the whole family is revoked - unless it comes back within
+# reuse_grace seconds of being consumed, as when two tabs refresh at once.
+#
+# SQLite is the source of truth shared by all workers and kept across restarts;
+# memory holds recently consumed ids and the revoked families, synced every
+# sync_interval seconds, so the access-token path never touches the database.
+class TokenIndex:
+    def __init__(self, db_file='tokens.db', sync_interval=5, prune_interval=3600, maxsize=100000, reuse_grace=10):
+        self.db_file = str(db_file)
+        self.sync_interval = sync_interval
+        self.reuse_grace = reuse_grace
+        self.prune_interval = prune_interval
+        self._db = SQLiteConnections(self.db_file)
+        self._lock = threading.Lock()
+        self._used = TTLCache(maxsize=maxsize, ttl=float('inf'))
+        self._revoked = {}
+        self._synced_at = 0.0
+        self._pruned_at = 0.0
+        self.revocations = 0
+        self.grace_reuses = 0
+        conn = self._db.connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS used_refresh_tokens (
+                jti TEXT PRIMARY KEY,
+                family TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                consumed_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS revoked_families (
+                family TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            );
+        """)
+        # Databases created before consumed tokens carried a consumption time
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(used_refresh_tokens)')}
+        if 'consumed_at' not in columns:
+            conn.execute('ALTER TABLE used_refresh_tokens ADD COLUMN consumed_at REAL')
+
+    # Forget connections and memory state (e.g. in a freshly forked worker)
+    def reset(self):
+        self._db.reset()
+        self._used.clear()
+        with self._lock:
+            self._revoked = {}
+            self._synced_at = 0.0
+
+    def _sync(self):
+        now = time.time()
+        with self._lock:
+            if now - self._synced_at < self.sync_interval:
+                return
+            self._synced_at = now
+        rows = self._db.connect().execute('SELECT family, expires_at FROM revoked_families WHERE expires_at > ?', (now,))
+        revoked = dict(rows.fetchall())
+        with self._lock:
+            self._revoked = revoked
+
+    def is_revoked(self, family):
+        self._sync()
+        with self._lock:
+            expires_at = self._revoked.get(family)
+        return expires_at is not None and expires_at > time.time()
+
+    # Mark a refresh token as used. Returns False if it had already been used more
+    # than reuse_grace seconds ago.
+    def consume(self, jti, family, expires_at):
+        consumed_at = self._used.get(jti)
+        if consumed_at is None:
+            now = time.time()
+            if now - self._pruned_at > self.prune_interval:
+                self.prune()
+            conn = self._db.connect()
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO used_refresh_tokens (jti, family, expires_at, consumed_at) VALUES (?, ?, ?, ?)',
+                (jti, family, expires_at, now)
+            )
+            if cursor.rowcount == 1:
+                self._used.set(jti, now, ttl=expires_at - now)
+                return True
+            # Consumed by another worker; rows from before consumed_at count as old
+            row = conn.execute('SELECT consumed_at FROM used_refresh_tokens WHERE jti = ?', (jti,)).fetchone()
+            consumed_at = row[0] if row and row[0] is not None else 0.0
+            self._used.set(jti, consumed_at, ttl=expires_at - now)
+        if time.time() - consumed_at > self.reuse_grace:
+            return False
+        with self._lock:
+            self.grace_reuses += 1
+        return True
+
+    # Revoke every token in a family until the newest of them could have expired
+    def revoke_family(self, family, expires_at):
+        self._db.connect().execute(
+            'INSERT OR REPLACE INTO revoked_families (family, expires_at) VALUES (?, ?)',
+            (family, expires_at)
+        )
+        with self._lock:
+            self._revoked[family] = expires_at
+            self.revocations += 1
+
+    # Forget ids and families whose tokens have expired anyway
+    def prune(self):
+        now = self._pruned_at = time.time()
+        conn = self._db.connect()
+        conn.execute('DELETE FROM used_refresh_tokens WHERE expires_at <= ?', (now,))
+        conn.execute('DELETE FROM revoked_families WHERE expires_at <= ?', (now,))
+
+    def stats(self):
+        with self._lock:
+            revoked = len(self._revoked)
+        return {'used_cached': self._used.stats()['size'], 'revoked_families': revoked, 'revocations': self.revocations,
+                'grace_reuses': self.grace_reuses}
@@ -0,0 +1,216 @@
+# Chunked and batched translation on top of sarvam_translate
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from detection import plan_translation
+from metrics import translation_plans
+from upstream import sarvam_translate, UpstreamError
+
+# Sarvam mayura:v1 accepts at most 1000 characters per request
+SARVAM_CHAR_LIMIT = 1000
+# Chunks translated at once for a single call, and the pool shared by all calls
+TRANSLATION_PARALLELISM = int(os.environ.get('TRANSLATION_PARALLELISM', 4))
+TRANSLATION_WORKERS = int(os.environ.get('TRANSLATION_WORKERS', 16))
+
+# Split points: after sentence terminators (including the Devanagari danda) and line breaks
+_SENTENCE_END = re.compile(r'(?<=[.!?।॥\n])')
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS, thread_name_prefix='translate')
+        return _executor
+
+
+def reset_executor():
+    global _executor
+    with _lock:
+        _executor = None
+
+
+# Break an overlong run at the last whitespace before the limit, or hard-cut if there is none
+def _split_long(segment, limit):
+    pieces = []
+    while len(segment) > limit:
+        cut = max(segment.rfind(' ', 0, limit), segment.rfind('\n', 0, limit))
+        if cut <= 0:
+            cut = limit
+        pieces.append(segment[:cut])
+        segment = segment[cut:]
+    pieces.append(segment)
+    return pieces
+
+
+# Split text into chunks of at most `limit` characters on sentence boundaries.
+# Concatenating the chunks gives back the original text.
+def split_text(text, limit=SARVAM_CHAR_LIMIT):
+    if len(text) <= limit:
+        return [text]
+
+    chunks = []
+    current = ''
+    for sentence in _SENTENCE_END.split(text):
+        for piece in _split_long(sentence, limit):
+            if current and len(current) + len(piece) > limit:
+                chunks.append(current)
+                current = ''
+            current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Split a piece into (leading whitespace, body, trailing whitespace); only the body goes
+# to Sarvam and the whitespace is put back around its translation
+def strip_piece(piece):
+    body = piece.strip()
+    if not body:
+        return piece, '', ''
+    return piece[:len(piece) - len(piece.lstrip())], body, piece[len(piece.rstrip()):]
+
+
+# Join translated pieces; raises the first UpstreamError among them
+def join_pieces(results):
+    for result in results:
+        if isinstance(result, UpstreamError):
+            raise result
+    return ''.join(results)
+
+
+# Translate pieces concurrently, at most TRANSLATION_PARALLELISM in flight.
+# Returns one entry per piece: the translation or the UpstreamError raised for it.
+def _translate_pieces(pieces, source_language_code, target_language_code, use_cache=True):
+    results = [None] * len(pieces)
+    slots = threading.BoundedSemaphore(TRANSLATION_PARALLELISM)
+
+    def translate_piece(index, piece):
+        try:
+            leading, body, trailing = strip_piece(piece)
+            if not body:
+                results[index] = piece
+                return
+            translated = sarvam_translate(body, source_language_code, target_language_code, use_cache=use_cache)
+            results[index] = f"{leading}{translated}{trailing}"
+        except UpstreamError as e:
+            results[index] = e
+        finally:
+            slots.release()
+
+    if len(pieces) == 1:
+        slots.acquire()
+        translate_piece(0, pieces[0])
+        return results
+
+    futures = []
+    for index, piece in enumerate(pieces):
+        slots.acquire()
+        futures.append(get_executor().submit(translate_piece, index, piece))
+    for future in futures:
+        future.result()
+    return results
+
+
+# Translate text of any length; raises UpstreamError if any chunk fails
+def translate_text(text, source_language_code, target_language_code, use_cache=True):
+    return join_pieces(_translate_pieces(split_text(text), source_language_code, target_language_code, use_cache))
+
+
+# Translate many strings in one go, translating each distinct string once.
+# Returns a list aligned with `texts`; entries that failed are None.
+def translate_batch(texts, source_language_code, target_language_code, use_cache=True):
+    unique_texts = list(dict.fromkeys(texts))
+
+    pieces = []
+    spans = {}
+    for text in unique_texts:
+        chunks = split_text(text)
+        spans[text] = (len(pieces), len(pieces) + len(chunks))
+        pieces.extend(chunks)
+
+    results = _translate_pieces(pieces, source_language_code, target_language_code, use_cache)
+
+    translations = {}
+    for text, (start, end) in spans.items():
+        parts = results[start:end]
+        if any(isinstance(part, UpstreamError) for part in parts):
+            translations[text] = None
+        else:
+            translations[text] = ''.join(parts)
+    return [translations[text] for text in texts]
+
+
+# Translate a prompt after local script detection: English (or code-only) prompts are
+# returned as-is, and in mixed prompts only the Indic spans are sent, so inline code
+# and English runs come back untouched. Raises UpstreamError if any span fails.
+def translate_detected(text, source_language_code, target_language_code, use_cache=True):
+    plan = plan_translation(text, source_language_code)
+    translation_plans.inc(decision=plan.decision)
+    if plan.decision == 'skip':
+        return text
+    if plan.decision == 'full':
+        return translate_text(text, plan.source_language, target_language_code, use_cache)
+
+    results = _translate_pieces(detected_pieces(plan), plan.source_language, target_language_code, use_cache)
+    return join_detected(plan, results)
+
+
+# The pieces of a mixed prompt's translation plan that go to Sarvam, in order
+def detected_pieces(plan):
+    pieces = []
+    for segment, translate in plan.segments:
+        if translate:
+            pieces.extend(split_text(segment))
+    return pieces
+
+
+# Put a mixed prompt back together from its untranslated segments and the results for
+# detected_pieces(plan); raises the first UpstreamError among them
+def join_detected(plan, results):
+    results = iter(results)
+    parts = []
+    for segment, translate in plan.segments:
+        if not translate:
+            parts.append(segment)
+            continue
+        for _ in split_text(segment):
+            result = next(results)
+            if isinstance(result, UpstreamError):
+                raise result
+            parts.append(result)
+    return ''.join(parts)
+
+
+# Translations of fixed boilerplate per target language, kept for the life of the process
+# so each string goes to Sarvam once instead of with every request that shows it
+class TranslationMemory:
+    def __init__(self, source_language_code='en-IN'):
+        self.source_language_code = source_language_code
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Raises UpstreamError if the string isn't known yet and can't be translated
+    def translate(self, text, target_language_code):
+        key = (text, target_language_code)
+        with self._lock:
+            translated = self._entries.get(key)
+            if translated is not None:
+                self.hits += 1
+                return translated
+            self.misses += 1
+        translated = translate_text(text, self.source_language_code, target_language_code)
+        with self._lock:
+            self._entries[key] = translated
+        return translated
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,404 @@
+# Shared HTTP client layer for the Sarvam and Groq APIs
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import DiskCache, ResponseCache
+from circuitbreaker import CircuitBreaker
+from metrics import upstream_request_duration, upstream_requests, log_payload
+from ratelimit import SQLiteBuckets, Scheduler, RateLimitTimeout, PRIORITY_INTERACTIVE
+from singleflight import SingleFlight, SingleFlightTimeout
+
+# Optional faster JSON codec for request bodies
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+SARVAM_BASE_URL = os.environ.get('SARVAM_BASE_URL', 'https://api.sarvam.ai')
+GROQ_BASE_URL = os.environ.get('GROQ_BASE_URL', 'https://api.groq.com/openai/v1')
+GROQ_MODEL = os.environ.get('GROQ_MODEL', 'llama3-70b-8192')
+
+# Connection pool and timeout tuning
+POOL_CONNECTIONS = int(os.environ.get('UPSTREAM_POOL_CONNECTIONS', 4))
+POOL_MAXSIZE = int(os.environ.get('UPSTREAM_POOL_MAXSIZE', 32))
+CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 60))
+
+# Retries with jittered exponential backoff on throttling and server errors
+MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', 2))
+BACKOFF_BASE = float(os.environ.get('UPSTREAM_BACKOFF_BASE', 0.5))
+BACKOFF_MAX = float(os.environ.get('UPSTREAM_BACKOFF_MAX', 8))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Circuit breakers: fail fast while an upstream keeps failing or timing out
+def _breaker(name, slow_call_seconds):
+    return CircuitBreaker(
+        name,
+        window=float(os.environ.get('CIRCUIT_WINDOW', 60)),
+        window_calls=int(os.environ.get('CIRCUIT_WINDOW_CALLS', 20)),
+        min_calls=int(os.environ.get('CIRCUIT_MIN_CALLS', 10)),
+        failure_ratio=float(os.environ.get('CIRCUIT_FAILURE_RATIO', 0.5)),
+        slow_call_seconds=slow_call_seconds,
+        slow_ratio=float(os.environ.get('CIRCUIT_SLOW_RATIO', 0.8)),
+        open_seconds=float(os.environ.get('CIRCUIT_OPEN_SECONDS', 30))
+    )
+
+breakers = {
+    'sarvam': _breaker('Sarvam', float(os.environ.get('SARVAM_SLOW_CALL_SECONDS', 5))),
+    'groq': _breaker('Groq', float(os.environ.get('GROQ_SLOW_CALL_SECONDS', 30)))
+}
+
+# Response cache for translations and completions; the disk tier is enabled by RESPONSE_CACHE_DISK_FILE
+RESPONSE_CACHE_DISK_FILE = os.environ.get('RESPONSE_CACHE_DISK_FILE')
+response_cache = ResponseCache(
+    maxsize=int(os.environ.get('RESPONSE_CACHE_SIZE', 2048)),
+    ttl=int(os.environ.get('RESPONSE_CACHE_TTL', 3600)),
+    disk=DiskCache(
+        RESPONSE_CACHE_DISK_FILE,
+        max_bytes=int(os.environ.get('RESPONSE_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024)),
+        ttl=int(os.environ.get('RESPONSE_CACHE_DISK_TTL', 86400))
+    ) if RESPONSE_CACHE_DISK_FILE else None
+)
+
+# Identical concurrent requests share one upstream call; followers give up after this many seconds
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', 120))
+single_flight = SingleFlight()
+
+# Groq rate limits (requests and estimated tokens per minute; 0 disables), shared across workers via SQLite
+groq_scheduler = Scheduler(
+    SQLiteBuckets(os.environ.get('RATE_LIMIT_DB_FILE', 'ratelimit.db'), {
+        'requests': int(os.environ.get('GROQ_RPM_LIMIT', 30)),
+        'tokens': int(os.environ.get('GROQ_TPM_LIMIT', 60000))
+    }),
+    max_wait=float(os.environ.get('RATE_LIMIT_MAX_WAIT', 30))
+)
+
+# Who an upstream call is made for, and how urgent it is; set per request
+call_user = contextvars.ContextVar('call_user', default=None)
+call_priority = contextvars.ContextVar('call_priority', default=PRIORITY_INTERACTIVE)
+
+# API keys, set by configure()
+_api_keys = {'sarvam': None, 'groq': None}
+_clients = {}
+
+
+class UpstreamError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Raised without a network call while the upstream's circuit is open
+class CircuitOpenError(UpstreamError):
+    def __init__(self, name):
+        super().__init__(f"{name} is temporarily unavailable", 503)
+
+
+# Serialize a request body to compact JSON bytes, using orjson when it is installed
+def encode_json(obj):
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson rejects some values the stdlib accepts (e.g. lone surrogates)
+            pass
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+# A serialized Groq chat completion body, plus the cache key and token estimate
+# the cache and rate limiter need, so neither has to re-serialize the messages
+class ChatRequest:
+    def __init__(self, body, max_tokens, prompt_chars):
+        self.body = body
+        self.max_tokens = max_tokens
+        # ~4 characters per prompt token plus the completion budget
+        self.estimated_tokens = prompt_chars // 4 + max_tokens
+        self.cache_key = hashlib.sha256(b'chat/completions\n' + body).hexdigest()
+
+    # The same body with streaming switched on
+    @property
+    def stream_body(self):
+        return self.body[:-1] + b',"stream":true}'
+
+
+# Build a ChatRequest from a messages list (see prompts.py for the precompiled templates)
+def chat_request(messages, max_tokens, temperature=0.7, model=None):
+    body = encode_json({
+        "model": model or GROQ_MODEL,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    })
+    return ChatRequest(body, max_tokens, sum(len(message['content']) for message in messages))
+
+
+# Retry policy and call accounting shared by the blocking client below and the async
+# one in async_upstream.py
+class BaseProviderClient:
+    def __init__(self, name, base_url, breaker=None, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES):
+        self.name = name
+        self.breaker = breaker
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+        # Full jitter: sleep a random fraction of the exponential ceiling
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    def _record(self, started, status, failed=False):
+        duration = time.perf_counter() - started
+        upstream_request_duration.observe(duration, upstream=self.name, status=status)
+        upstream_requests.inc(upstream=self.name, status=status)
+        if self.breaker is not None:
+            self.breaker.record(not failed, duration)
+
+
+# One pooled keep-alive session per upstream host
+class ProviderClient(BaseProviderClient):
+    def __init__(self, name, base_url, headers, breaker=None, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES):
+        super().__init__(name, base_url, breaker, connect_timeout, read_timeout, max_retries)
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount(self.base_url, adapter)
+
+    # POST a JSON payload (or pre-encoded JSON bytes), retrying transient failures;
+    # returns the successful response. acquire() is called before every attempt, so a
+    # rate limiter is charged for retries too.
+    def _send(self, path, payload, stream=False, acquire=None):
+        url = f"{self.base_url}{path}"
+        body = {'data': payload} if isinstance(payload, bytes) else {'json': payload}
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            if self.breaker is not None and not self.breaker.allow():
+                raise CircuitOpenError(self.name)
+            if acquire is not None:
+                acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session.post(url, timeout=self.timeout, stream=stream, **body)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(started, 'error', failed=True)
+                if last_attempt:
+                    raise UpstreamError(f"{self.name} request failed: {e}")
+                delay = self._backoff(attempt)
+                logger.warning(f"{self.name} request error ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            # Throttling and server errors count against the circuit; client errors do not
+            self._record(started, response.status_code, failed=response.status_code in RETRY_STATUSES)
+
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                delay = self._backoff(attempt, response)
+                logger.warning(f"{self.name} returned {response.status_code}, retrying in {delay:.2f}s")
+                response.close()
+                time.sleep(delay)
+                continue
+
+            if response.status_code != 200:
+                logger.error(f"{self.name} API Error {response.status_code}: {response.text[:500]}")
+                response.close()
+                raise UpstreamError(f"API returned status code {response.status_code}", response.status_code)
+            return response
+
+    # POST a JSON payload and return the parsed JSON body
+    def post_json(self, path, payload, acquire=None):
+        response = self._send(path, payload, acquire=acquire)
+        try:
+            return response.json()
+        except ValueError:
+            raise UpstreamError(f"{self.name} returned a non-JSON response", response.status_code)
+
+    # POST a JSON payload and return the open response for incremental reading
+    def post_stream(self, path, payload, acquire=None):
+        return self._send(path, payload, stream=True, acquire=acquire)
+
+    def close(self):
+        self.session.close()
+
+
+def configure(sarvam_api_key=None, groq_api_key=None):
+    _api_keys['sarvam'] = sarvam_api_key
+    _api_keys['groq'] = groq_api_key
+    reset_clients()
+
+
+# Drop pooled connections (e.g. after fork); clients are recreated lazily
+def reset_clients():
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
+
+
+# Display name, base URL and request headers of an upstream
+def provider_config(name):
+    if name == 'sarvam':
+        return 'Sarvam', SARVAM_BASE_URL, {
+            "api-subscription-key": _api_keys['sarvam'] or '',
+            "Content-Type": "application/json"
+        }
+    if name == 'groq':
+        return 'Groq', GROQ_BASE_URL, {
+            "Authorization": f"Bearer {_api_keys['groq'] or ''}",
+            "Content-Type": "application/json"
+        }
+    raise ValueError(f"Unknown upstream: {name}")
+
+
+def get_client(name):
+    client = _clients.get(name)
+    if client is None:
+        display_name, base_url, headers = provider_config(name)
+        client = ProviderClient(display_name, base_url, headers, breakers[name])
+        _clients[name] = client
+    return client
+
+
+def set_call_context(user=None, priority=PRIORITY_INTERACTIVE):
+    call_user.set(user)
+    call_priority.set(priority)
+
+
+# Wait for a Groq rate limit slot for one request attempt
+def acquire_groq_slot(estimated_tokens):
+    try:
+        groq_scheduler.acquire(estimated_tokens, call_priority.get(), call_user.get())
+    except RateLimitTimeout as e:
+        raise UpstreamError(str(e), 429)
+
+
+# Whether calls to an upstream are currently let through (its circuit is not open)
+def upstream_available(name):
+    return breakers[name].available()
+
+
+# Share one upstream call among concurrent identical requests. While the upstream's
+# circuit is open, a cached result is served even if the caller asked to bypass the cache.
+def coalesce(key, fetch):
+    try:
+        return single_flight.do(key, fetch, timeout=SINGLE_FLIGHT_TIMEOUT)
+    except SingleFlightTimeout as e:
+        raise UpstreamError(str(e))
+    except CircuitOpenError:
+        cached = response_cache.get(key)
+        if cached is None:
+            raise
+        logger.warning("Upstream circuit open; serving a cached response")
+        return cached
+
+
+# Translate text with Sarvam; returns the translated text or raises UpstreamError
+def sarvam_translate(text, source_language_code, target_language_code, use_cache=True):
+    cache_key = ResponseCache.make_key('translate', text, source_language_code, target_language_code)
+    if use_cache:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    def fetch():
+        response_json = get_client('sarvam').post_json('/translate', {
+            "input": text,
+            "source_language_code": source_language_code,
+            "target_language_code": target_language_code
+        })
+        log_payload(logger, "Sarvam API Response", response_json)
+        if 'translated_text' not in response_json:
+            raise UpstreamError(f"Unexpected API response format: {response_json}")
+        response_cache.set(cache_key, response_json['translated_text'])
+        return response_json['translated_text']
+
+    return coalesce(cache_key, fetch)
+
+
+# Run a Groq chat completion; returns the message content or raises UpstreamError
+def groq_chat(messages, max_tokens, temperature=0.7, model=None, use_cache=True):
+    return groq_complete(chat_request(messages, max_tokens, temperature, model), use_cache)
+
+
+# Run a prepared ChatRequest; returns the message content or raises UpstreamError
+def groq_complete(chat, use_cache=True):
+    if use_cache:
+        cached = response_cache.get(chat.cache_key)
+        if cached is not None:
+            return cached
+
+    def fetch():
+        response_json = get_client('groq').post_json('/chat/completions', chat.body,
+                                                     acquire=lambda: acquire_groq_slot(chat.estimated_tokens))
+        log_payload(logger, "Groq API Response", response_json)
+        if 'error' in response_json:
+            raise UpstreamError(response_json['error'].get('message', 'Unknown error'))
+        if not response_json.get('choices'):
+            raise UpstreamError("Unexpected API response format")
+        content = response_json['choices'][0]['message']['content']
+        response_cache.set(chat.cache_key, content)
+        return content
+
+    return coalesce(chat.cache_key, fetch)
+
+
+# Stream a Groq chat completion, yielding content deltas as they arrive; raises UpstreamError
+def groq_chat_stream(messages, max_tokens, temperature=0.7, model=None, use_cache=True):
+    return groq_complete_stream(chat_request(messages, max_tokens, temperature, model), use_cache)
+
+
+# Stream a prepared ChatRequest, yielding content deltas as they arrive; raises UpstreamError
+def groq_complete_stream(chat, use_cache=True):
+    if use_cache:
+        cached = response_cache.get(chat.cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    try:
+        response = get_client('groq').post_stream('/chat/completions', chat.stream_body,
+                                                  acquire=lambda: acquire_groq_slot(chat.estimated_tokens))
+    except CircuitOpenError:
+        cached = response_cache.get(chat.cache_key)
+        if cached is None:
+            raise
+        logger.warning("Groq circuit open; serving a cached completion")
+        yield cached
+        return
+    response.encoding = 'utf-8'
+    parts = []
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[len('data:'):].strip()
+            if data == '[DONE]':
+                # Keep reading to the end of the body so the connection goes back to the pool
+                continue
+            chunk = json.loads(data)
+            if 'error' in chunk:
+                raise UpstreamError(chunk['error'].get('message', 'Unknown error'))
+            choices = chunk.get('choices') or []
+            delta = choices[0].get('delta', {}).get('content') if choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+    except (requests.RequestException, ValueError) as e:
+        raise UpstreamError(f"Groq stream failed: {e}")
+    finally:
+        response.close()
+    response_cache.set(chat.cache_key, ''.join(parts))
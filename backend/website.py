@@ -0,0 +1,19 @@
+# Website output for /process (choice=website). Templates under templates/ are compiled
+# once at import and autoescape HTML, so prompt text can't inject markup into the page.
+import os
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+_environment = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(['html']),
+    undefined=StrictUndefined,
+    auto_reload=False
+)
+WEBSITE_TEMPLATE = _environment.get_template('website.html')
+
+
+def render_website(prompt):
+    return WEBSITE_TEMPLATE.render(prompt=prompt)
@@ -108,10 +108,10 @@ const Profile = () => {
             {history.length > 0 ? (
               <ul className="space-y-4">
                 {history.map((item, index) => (
-                  <li key={index} className="bg-gray-50 p-4 rounded-lg border border-gray-200">
+                  <li key={item.id || index} className="bg-gray-50 p-4 rounded-lg border border-gray-200">
                     <div className="flex justify-between items-center mb-2">
                       <span className="text-sm font-medium text-gray-900 capitalize">{item.type || 'Generation'}</span>
-                      <span className="text-xs text-gray-500 flex items-center"><Clock className="mr-1" size={12} />{formatTimestamp(item.created_at)}</span>
+                      <span className="text-xs text-gray-500 flex items-center"><Clock className="mr-1" size={12} />{formatTimestamp(item.created_at || item.timestamp)}</span>
                     </div>
                     {item.input && (
                          <div className="mb-2">
@@ -125,11 +125,11 @@ const Profile = () => {
                              <p className="text-sm text-gray-800 whitespace-pre-wrap break-words line-clamp-2">{item.explanation}</p>
                         </div>
                     )}
-                     {item.output && (
+                     {(item.output || item.preview) && (
                          <div>
                               <p className="text-xs font-medium text-gray-600">Output:</p>
                               {/* Display truncated output with option to view full if needed */}
-                              <p className="text-sm text-gray-800 whitespace-pre-wrap break-words line-clamp-3">{item.output}</p>
+                              <p className="text-sm text-gray-800 whitespace-pre-wrap break-words line-clamp-3">{item.output || item.preview}</p>
                          </div>
                      )}
                      {/* Add more details here if available in history item */}